@@ -0,0 +1,246 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/benchmarks/data.py
+
+import random
+
+import frappe
+from frappe.utils import add_days, getdate
+
+# Every synthetic record name starts with this prefix so leftovers can be removed
+BENCH_PREFIX = "BENCH"
+
+PARK_LOCATION_TYPES = ["National Park", "Marine Park", "Conservancy"]
+SEASON_TYPES = ["Low", "Shoulder", "High", "Peak"]
+DEPARTURE_TIMES = ["05:30:00", "07:00:00", "08:30:00", "14:00:00", "19:30:00"]
+HOTELS = ["Serena Beach", "Voyager Resort", "Sarova Whitesands", "Bahari Beach", "PrideInn Paradise",
+          "Nyali Sun Africa", "Severin Sea Lodge", "Travellers Beach", "Mombasa Continental", "Tamarind Village"]
+
+class BenchmarkDataGenerator:
+    """
+    Synthetic data generator for the excursion benchmark suite
+
+    Creates packages with rate configurations, seasons, parks, guides,
+    vehicles and bookings at a given scale. Records from other apps
+    (National Park, Safari Guide, Vehicle) are only created when the
+    doctype is installed, with mandatory and link checks skipped since
+    only the fields excursion code reads matter here.
+    """
+
+    def __init__(self, bookings=100, packages=None, seed=42, start_date=None):
+        self.booking_count = bookings
+        self.package_count = packages or max(5, bookings // 20)
+        self.guide_count = max(3, bookings // 10)
+        self.vehicle_count = max(3, bookings // 10)
+        self.park_count = 5
+        self.start_date = getdate(start_date) if start_date else add_days(getdate(), 1)
+        self.random = random.Random(seed)
+        self.run_id = f"{BENCH_PREFIX}{seed}{bookings}"
+
+        self.seasons = []
+        self.parks = []
+        self.guides = []
+        self.vehicles = []
+        self.packages = []
+        self.bookings = []
+
+    def generate(self):
+        """Create the full synthetic dataset and return a summary"""
+        frappe.flags.mute_emails = True
+
+        self.make_seasons()
+        self.make_parks()
+        self.make_guides()
+        self.make_vehicles()
+        self.make_packages()
+        self.make_bookings()
+
+        return {
+            "seasons": len(self.seasons),
+            "parks": len(self.parks),
+            "guides": len(self.guides),
+            "vehicles": len(self.vehicles),
+            "packages": len(self.packages),
+            "bookings": len(self.bookings)
+        }
+
+    def insert(self, doc):
+        """Insert a document without validations, links or permission checks"""
+        doc = frappe.get_doc(doc)
+        doc.flags.ignore_permissions = True
+        doc.flags.ignore_mandatory = True
+        doc.flags.ignore_links = True
+        doc.flags.ignore_validate = True
+        doc.insert()
+        return doc
+
+    def filter_fields(self, doctype, values):
+        """Drop values for fields the installed doctype doesn't have"""
+        meta = frappe.get_meta(doctype)
+        return {key: value for key, value in values.items() if key == "doctype" or meta.has_field(key)}
+
+    def make_seasons(self):
+        """Split the booking window into consecutive seasons"""
+        season_start = add_days(self.start_date, -30)
+        for i, season_type in enumerate(SEASON_TYPES * 2):
+            season_end = add_days(season_start, 45)
+            season = self.insert({
+                "doctype": "Excursion Season",
+                "season_name": f"{self.run_id} {season_type} {i}",
+                "season_type": season_type,
+                "start_date": season_start,
+                "end_date": season_end,
+                "is_active": 1
+            })
+            self.seasons.append(season)
+            season_start = add_days(season_end, 1)
+
+    def make_parks(self):
+        if not frappe.db.exists("DocType", "National Park"):
+            return
+
+        for i in range(self.park_count):
+            park = self.insert(self.filter_fields("National Park", {
+                "doctype": "National Park",
+                "park_name": f"{self.run_id} Park {i}",
+                "is_active": 1
+            }))
+            self.parks.append(park.name)
+
+    def make_guides(self):
+        if not frappe.db.exists("DocType", "Safari Guide"):
+            return
+
+        for i in range(self.guide_count):
+            guide = self.insert(self.filter_fields("Safari Guide", {
+                "doctype": "Safari Guide",
+                "guide_name": f"{self.run_id} Guide {i}",
+                "is_active": 1,
+                "availability_status": "Available"
+            }))
+            self.guides.append(guide.name)
+
+    def make_vehicles(self):
+        if not frappe.db.exists("DocType", "Vehicle"):
+            return
+
+        for i in range(self.vehicle_count):
+            vehicle = self.insert(self.filter_fields("Vehicle", {
+                "doctype": "Vehicle",
+                "license_plate": f"{self.run_id}-{i:04d}",
+                "make": "Toyota",
+                "model": "Land Cruiser",
+                "status": "Available",
+                "capacity": self.random.choice([7, 9, 14])
+            }))
+            self.vehicles.append(vehicle.name)
+
+    def make_packages(self):
+        category = f"{self.run_id} Category"
+        if not frappe.db.exists("Excursion Category", category):
+            self.insert({"doctype": "Excursion Category", "category_name": category})
+
+        for i in range(self.package_count):
+            destinations = []
+            for park in self.random.sample(range(self.park_count), 2):
+                destinations.append({
+                    "location_name": f"{self.run_id} Park {park}",
+                    "location_type": self.random.choice(PARK_LOCATION_TYPES),
+                    "duration_hours": 3
+                })
+
+            package = self.insert({
+                "doctype": "Excursion Package",
+                "package_name": f"{self.run_id} Package {i}",
+                "package_code": f"{self.run_id}-{i:04d}",
+                "excursion_category": category,
+                "package_status": "Active",
+                "is_published": 1,
+                "duration_hours": self.random.choice([4, 6, 8, 10]),
+                "max_capacity": self.random.choice([10, 20, 40]),
+                "pickup_required": 1,
+                "departure_times": [{"departure_time": t} for t in DEPARTURE_TIMES[:3]],
+                "destination_locations": destinations
+            })
+
+            rate_configuration = self.insert({
+                "doctype": "Excursion Rate Configuration",
+                "excursion_package": package.name,
+                "pricing_model": "Per Person",
+                "has_group_discounts": 1,
+                "group_discount_tiers": [
+                    {"minimum_group_size": 6, "discount_percentage": 5},
+                    {"minimum_group_size": 12, "discount_percentage": 10}
+                ],
+                "local_rates": self.make_rates(package.name, "KES", 3000),
+                "international_rates": self.make_rates(package.name, "USD", 60)
+            })
+
+            frappe.db.set_value("Excursion Package", package.name, "rate_configuration",
+                                rate_configuration.name, update_modified=False)
+            self.packages.append(package.name)
+
+    def make_rates(self, package, currency, base_rate):
+        rates = []
+        for season in self.seasons:
+            rates.append({
+                "season": season.name,
+                "excursion_package": package,
+                "currency": currency,
+                "adult_rate": base_rate * self.random.uniform(0.8, 1.6),
+                "holiday_surcharges": [{
+                    "holiday_name": "Festive",
+                    "start_date": add_days(season.start_date, 10),
+                    "end_date": add_days(season.start_date, 14),
+                    "surcharge_type": "Percentage of Base Rate",
+                    "adult_surcharge": 15
+                }]
+            })
+        return rates
+
+    def make_bookings(self):
+        """Spread bookings over the first week, submitted without running hooks"""
+        for i in range(self.booking_count):
+            adults = self.random.randint(1, 8)
+            children = self.random.randint(0, 3)
+            excursion_date = add_days(self.start_date, self.random.randint(0, 6))
+            individual_pickups = self.random.random() < 0.4
+
+            booking = self.insert({
+                "doctype": "Excursion Booking",
+                "booking_date": getdate(),
+                "booking_status": "Confirmed",
+                "customer_name": f"{self.run_id} Customer {i}",
+                "customer_phone": f"+2547{i:08d}",
+                "excursion_package": self.random.choice(self.packages),
+                "excursion_date": excursion_date,
+                "departure_time": self.random.choice(DEPARTURE_TIMES),
+                "duration_hours": self.random.choice([4, 6, 8]),
+                "adult_count": adults,
+                "child_count": children,
+                "total_guests": adults + children,
+                "residence_type": self.random.choice(["Local", "International"]),
+                "currency": "USD",
+                "total_amount": (adults + children * 0.7) * 60,
+                "payment_status": "Unpaid",
+                "pickup_required": 1,
+                "pickup_type": "Individual Hotel Pickups" if individual_pickups else "Central Pickup Point",
+                "guests": [{
+                    "guest_name": f"{self.run_id} Guest {i}-{g}",
+                    "age_category": "Adult" if g < adults else "Child",
+                    "age": 35 if g < adults else self.random.randint(3, 15)
+                } for g in range(adults + children)]
+            })
+
+            # Mark as submitted directly so on_submit transport/park/email hooks stay out of the data setup
+            frappe.db.set_value("Excursion Booking", booking.name, "docstatus", 1, update_modified=False)
+            self.bookings.append(booking.name)
+
+    def make_guest_locations(self, count):
+        """Synthetic pickup locations in the shape optimize_pickup_route expects"""
+        return [{
+            "guest_name": f"{self.run_id} Guest {i}",
+            "location_type": "Hotel",
+            "location_name": self.random.choice(HOTELS),
+            "address": f"{self.random.randint(1, 500)} Beach Road",
+            "gps_coordinates": f"{-4.0 - self.random.random() * 0.1:.5f},{39.6 + self.random.random() * 0.1:.5f}",
+            "contact_phone": f"+2547{i:08d}"
+        } for i in range(count)]
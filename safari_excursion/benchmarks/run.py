@@ -0,0 +1,181 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/benchmarks/run.py
+#
+# Usage (against a scratch site - all synthetic data is rolled back):
+#   bench --site test.local execute safari_excursion.benchmarks.run.run
+#   bench --site test.local execute safari_excursion.benchmarks.run.run --kwargs "{'scales': [10, 100, 1000], 'output': '/tmp/bench.json'}"
+
+import json
+import platform
+import subprocess
+import time
+
+import frappe
+from frappe.utils import add_days, cint
+
+from safari_excursion.benchmarks.data import BenchmarkDataGenerator
+from safari_excursion.utils.instrumentation import measure
+
+DEFAULT_SCALES = [10, 100, 1000]
+DEFAULT_REPEAT = 3
+
+REPORTS = [
+    "today_s_excursions",
+    "excursion_booking_report",
+    "guide_assignment_status",
+    "excursion_transport_status",
+    "excursion_profitability"
+]
+
+class ExcursionBenchmark:
+    """
+    Times hot pricing, assignment, pickup and reporting paths on one dataset
+
+    Each case runs `repeat` times and reports the median wall time plus
+    the query count, query time and cache usage of the median run.
+    """
+
+    def __init__(self, generator, repeat=DEFAULT_REPEAT):
+        self.generator = generator
+        self.repeat = max(cint(repeat), 1)
+        self.results = []
+
+    def run(self):
+        data = self.generator
+        sample_package = data.packages[0]
+        sample_booking = data.bookings[0]
+        report_filters = {"from_date": data.start_date, "to_date": add_days(data.start_date, 6)}
+
+        self.bench("pricing_utils.get_excursion_pricing", self.get_excursion_pricing, sample_package)
+        self.bench("pricing_calculator.generate_excursion_quote", self.generate_excursion_quote, sample_package)
+        self.bench("parks_integration.calculate_park_fees", self.calculate_park_fees, sample_booking)
+        self.bench("multiple_pickup_transport.optimize_pickup_route", self.optimize_pickup_route, sample_booking)
+        self.bench("automation.auto_assign_resources", self.auto_assign_resources)
+
+        for report in REPORTS:
+            self.bench(f"report.{report}", self.execute_report, report, report_filters)
+
+        return self.results
+
+    def bench(self, name, fn, *args):
+        """Run a case `repeat` times, keeping the median run"""
+        runs = []
+        error = None
+
+        for _ in range(self.repeat):
+            frappe.db.savepoint("excursion_benchmark")
+
+            try:
+                with measure(name) as stats:
+                    fn(*args)
+            except Exception as e:
+                error = str(e)
+            finally:
+                # Cases that write (auto assignment) must see the same data on every run
+                frappe.db.rollback(save_point="excursion_benchmark")
+
+            runs.append(stats.as_dict())
+
+        runs.sort(key=lambda run: run["wall_ms"])
+        result = runs[len(runs) // 2]
+        result.update({
+            "name": name,
+            "runs": len(runs),
+            "min_wall_ms": runs[0]["wall_ms"],
+            "max_wall_ms": runs[-1]["wall_ms"],
+            "error": error
+        })
+        self.results.append(result)
+
+    def get_excursion_pricing(self, package):
+        from safari_excursion.safari_excursion.utils.pricing_utils import get_excursion_pricing
+
+        for offset in range(0, 60, 3):
+            get_excursion_pricing(package, add_days(self.generator.start_date, offset), 2, [8, 12])
+
+    def generate_excursion_quote(self, package):
+        from safari_excursion.utils.pricing_calculator import generate_excursion_quote
+
+        result = generate_excursion_quote(package, 2, 1)
+        if result.get("status") == "error":
+            raise Exception(result.get("message"))
+
+    def calculate_park_fees(self, booking):
+        from safari_excursion.utils.parks_integration import ExcursionParkFeeCalculator
+
+        ExcursionParkFeeCalculator(booking).calculate_park_fees()
+
+    def optimize_pickup_route(self, booking):
+        from safari_excursion.utils.multiple_pickup_transport import MultiplePickupManager
+
+        manager = MultiplePickupManager(booking)
+        manager.optimize_pickup_route(self.generator.make_guest_locations(12))
+
+    def auto_assign_resources(self):
+        from safari_excursion.utils.automation import auto_assign_resources
+
+        result = auto_assign_resources()
+        if result.get("status") == "error":
+            raise Exception(result.get("message"))
+
+    def execute_report(self, report, filters):
+        execute = frappe.get_attr(f"safari_excursion.safari_excursion.report.{report}.{report}.execute")
+        execute(frappe._dict(filters))
+
+def get_git_revision():
+    """Commit the benchmark ran against, for comparing result files"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=frappe.get_app_path("safari_excursion", ".."),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def run(scales=None, repeat=DEFAULT_REPEAT, seed=42, output=None):
+    """Run the benchmark suite at each scale and emit the results as JSON
+
+    Args:
+        scales: list of booking counts to generate (default 10, 100, 1000)
+        repeat: runs per case, the median is reported
+        seed: random seed so datasets are identical across commits
+        output: optional file path to write the JSON to
+    """
+    if isinstance(scales, str):
+        scales = json.loads(scales)
+
+    report = {
+        "app": "safari_excursion",
+        "revision": get_git_revision(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": cint(repeat),
+        "seed": cint(seed),
+        "scales": []
+    }
+
+    for scale in scales or DEFAULT_SCALES:
+        try:
+            generator = BenchmarkDataGenerator(bookings=cint(scale), seed=cint(seed))
+
+            start = time.perf_counter()
+            dataset = generator.generate()
+            setup_ms = (time.perf_counter() - start) * 1000
+
+            results = ExcursionBenchmark(generator, repeat).run()
+            report["scales"].append({
+                "bookings": cint(scale),
+                "dataset": dataset,
+                "setup_ms": setup_ms,
+                "results": results
+            })
+        finally:
+            # Synthetic data never outlives the run
+            frappe.db.rollback()
+            frappe.clear_cache()
+
+    if output:
+        with open(output, "w") as f:
+            f.write(json.dumps(report, indent=2, default=str))
+
+    return report
@@ -85,31 +85,132 @@ doc_events = {
         "on_submit": [
             "safari_excursion.utils.transport_integration.create_excursion_transport",
             "safari_excursion.utils.parks_integration.create_excursion_park_booking",
-            "safari_excursion.utils.notifications.send_booking_confirmation"
+            "safari_excursion.utils.notifications.send_booking_confirmation",
+            "safari_excursion.utils.waitlist.on_booking_submit"
         ],
         "on_cancel": [
             "safari_excursion.utils.transport_integration.cancel_excursion_transport",
-            "safari_excursion.utils.parks_integration.cancel_excursion_park_booking"
+            "safari_excursion.utils.parks_integration.cancel_excursion_park_booking",
+            "safari_excursion.utils.dispatch_board.on_booking_change",
+            "safari_excursion.utils.resource_calendar.sync_resource_calendar",
+            "safari_excursion.utils.waitlist.on_booking_release"
         ],
-        "validate": "safari_excursion.safari_excursion.doctype.excursion_booking.excursion_booking.validate_capacity_and_timing"
+        "validate": "safari_excursion.safari_excursion.doctype.excursion_booking.excursion_booking.validate_capacity_and_timing",
+        "on_update": [
+            "safari_excursion.utils.dispatch_board.on_booking_change",
+            "safari_excursion.utils.resource_calendar.sync_resource_calendar"
+        ],
+        "on_update_after_submit": [
+            "safari_excursion.utils.dispatch_board.on_booking_change",
+            "safari_excursion.utils.resource_calendar.sync_resource_calendar"
+        ],
+        "on_trash": [
+            "safari_excursion.utils.dispatch_board.on_booking_change",
+            "safari_excursion.utils.resource_calendar.sync_resource_calendar",
+            "safari_excursion.utils.waitlist.on_booking_release"
+        ]
     },
     "Excursion Operation": {
         "validate": "safari_excursion.safari_excursion.doctype.excursion_operation.excursion_operation.validate_guide_assignment",
-        "on_submit": "safari_excursion.utils.notifications.send_operation_start_notification"
+        "on_submit": "safari_excursion.utils.notifications.send_operation_start_notification",
+        "on_update": "safari_excursion.utils.dispatch_board.on_operation_change",
+        "on_update_after_submit": "safari_excursion.utils.dispatch_board.on_operation_change",
+        "on_cancel": "safari_excursion.utils.dispatch_board.on_operation_change",
+        "on_trash": "safari_excursion.utils.dispatch_board.on_operation_change"
+    },
+    "Excursion Package": {
+        "on_update": [
+            "safari_excursion.utils.gazetteer.clear_gazetteer_cache",
+            "safari_excursion.utils.waitlist.on_package_update",
+            "safari_excursion.utils.catalog_index.on_package_change",
+            "safari_excursion.utils.package_cards.on_package_change"
+        ],
+        "on_trash": [
+            "safari_excursion.utils.catalog_index.on_package_change",
+            "safari_excursion.utils.package_cards.on_package_change"
+        ]
+    },
+    "Excursion Rate Configuration": {
+        "on_update": [
+            "safari_excursion.utils.catalog_index.on_rate_configuration_change",
+            "safari_excursion.utils.package_cards.on_rate_configuration_change"
+        ],
+        "on_trash": [
+            "safari_excursion.safari_excursion.utils.rate_card.clear_rate_card_cache",
+            "safari_excursion.utils.catalog_index.on_rate_configuration_change",
+            "safari_excursion.utils.package_cards.on_rate_configuration_change"
+        ]
+    },
+    "Excursion Season": {
+        "on_update": "safari_excursion.safari_excursion.utils.rate_card.clear_rate_card_cache",
+        "on_trash": "safari_excursion.safari_excursion.utils.rate_card.clear_rate_card_cache"
+    },
+    "Accommodation": {
+        "on_update": "safari_excursion.utils.gazetteer.clear_gazetteer_cache",
+        "on_trash": "safari_excursion.utils.gazetteer.clear_gazetteer_cache"
+    },
+    # Sibling apps' bookings feed the resource calendar
+    "Safari Booking": {
+        "on_update": "safari_excursion.utils.resource_calendar.sync_resource_calendar",
+        "on_update_after_submit": "safari_excursion.utils.resource_calendar.sync_resource_calendar",
+        "on_cancel": "safari_excursion.utils.resource_calendar.sync_resource_calendar",
+        "on_trash": "safari_excursion.utils.resource_calendar.sync_resource_calendar"
+    },
+    "Transport Booking": {
+        "on_update": "safari_excursion.utils.resource_calendar.sync_resource_calendar",
+        "on_update_after_submit": "safari_excursion.utils.resource_calendar.sync_resource_calendar",
+        "on_cancel": "safari_excursion.utils.resource_calendar.sync_resource_calendar",
+        "on_trash": "safari_excursion.utils.resource_calendar.sync_resource_calendar"
     }
 }
 
+# Resource Calendar
+# -----------------
+# Documents that occupy guides or vehicles, see utils.resource_calendar.ResourceSource
+
+excursion_resource_sources = [
+    {
+        "doctype": "Excursion Booking",
+        "resources": {"Safari Guide": "assigned_guide", "Vehicle": "assigned_vehicle"},
+        "start_date": "excursion_date",
+        "start_time": "departure_time",
+        "duration_hours": "duration_hours",
+        "status_field": "booking_status",
+        "active_statuses": ["Confirmed", "In Progress"]
+    },
+    {
+        "doctype": "Safari Booking",
+        "resources": {"Safari Guide": "guide", "Vehicle": "vehicle"},
+        "start_date": "start_date",
+        "end_date": "end_date",
+        "status_field": "status",
+        "active_statuses": ["Confirmed", "In Progress"]
+    },
+    {
+        "doctype": "Transport Booking",
+        "resources": {"Vehicle": "vehicle", "Safari Guide": "driver_guide"},
+        "start_date": "pickup_date",
+        "status_field": "status",
+        "active_statuses": ["Confirmed", "In Progress"],
+        "mirror_field": "is_excursion_transport"
+    }
+]
+
 # Scheduled Tasks
 # ---------------
 
 scheduler_events = {
     "hourly": [
         "safari_excursion.utils.automation.send_pre_excursion_reminders",
-        "safari_excursion.utils.automation.update_excursion_status"
+        "safari_excursion.utils.automation.update_excursion_status",
+        "safari_excursion.utils.waitlist.expire_waitlist_holds"
     ],
     "daily": [
         "safari_excursion.utils.automation.daily_excursion_summary",
-        "safari_excursion.utils.automation.vehicle_availability_check"
+        "safari_excursion.utils.automation.vehicle_availability_check",
+        "safari_excursion.utils.travel_time.learn_travel_times",
+        "safari_excursion.utils.breadcrumbs.compact_breadcrumbs",
+        "safari_excursion.utils.park_permits.file_park_permits"
     ],
     "weekly": [
         "safari_excursion.utils.automation.weekly_excursion_report"
@@ -0,0 +1,7 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/patches/backfill_resource_calendar.py
+
+from safari_excursion.utils.resource_calendar import rebuild_resource_calendar
+
+def execute():
+    """Fill the resource calendar from current and future bookings of all apps"""
+    rebuild_resource_calendar()
@@ -1,10 +1,17 @@
 # ~/frappe-bench/apps/safari_excursion/safari_excursion/safari_excursion/doctype/excursion_booking/excursion_booking.py
 
+import hashlib
+import json
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import flt, getdate, add_to_date, time_diff_in_hours, get_time, now_datetime
+from frappe.utils import cint, flt, getdate, add_to_date, time_diff_in_hours, get_time, now_datetime
 from safari_excursion.safari_excursion.utils.pricing_utils import get_excursion_pricing
+from safari_excursion.utils.booking_numbers import next_booking_number
+from safari_excursion.utils.parks_integration import ExcursionParkFeeCalculator
+from safari_excursion.utils.resource_calendar import day_window, is_resource_available
+from safari_excursion.utils.transport_zones import get_zone_matcher
 
 class ExcursionBooking(Document):
     """
@@ -18,9 +25,8 @@ class ExcursionBooking(Document):
     def autoname(self):
         """Set booking number automatically"""
         if not self.booking_number:
-            # Generate format: EXB-YYYY-MM-#####
-            from frappe.model.naming import make_autoname
-            self.name = make_autoname("EXB-.YYYY.-.MM.-.#####")
+            # Generate format: EXB-YYYY-MM-#####, from a per-worker block of the series
+            self.name = next_booking_number()
             self.booking_number = self.name
     
     def validate(self):
@@ -101,14 +107,22 @@ class ExcursionBooking(Document):
                 frappe.throw(_("Pickup Time is required when pickup is enabled"))
     
     def calculate_pricing(self):
-        """Calculate total pricing for the excursion"""
+        """Calculate total pricing for the excursion
+        
+        Skipped when the pricing inputs haven't changed since the stored
+        breakdown was priced, so operational saves don't re-price.
+        """
         if not self.excursion_package or not self.excursion_date:
             return
         
+        fingerprint = self.get_pricing_fingerprint()
+        if fingerprint == self.pricing_fingerprint and self.pricing_breakdown:
+            return
+        
         # Get children ages from guests table
         children_ages = []
         if self.guests:
-            children_ages = [guest.age for guest in self.guests if guest.guest_type == "Child"]
+            children_ages = [guest.age for guest in self.guests if guest.age_category == "Child"]
         
         # Calculate group size for discounts
         group_size = self.adult_count + self.child_count
@@ -130,9 +144,89 @@ class ExcursionBooking(Document):
             self.group_discount = pricing.get("group_discount_amount", 0)
             self.total_amount = pricing.get("total", 0)
             
+            if pricing.get("error"):
+                return
+            
+            self.pricing_breakdown = json.dumps({
+                "pricing": pricing,
+                "park_fees": self.calculate_park_fees()
+            }, default=str)
+            self.pricing_fingerprint = fingerprint
+            
         except Exception as e:
             frappe.msgprint(f"Error calculating pricing: {str(e)}", indicator="red")
     
+    def get_pricing_fingerprint(self):
+        """Hash of every input the priced breakdown depends on"""
+        pickup_zone = None
+        if self.pickup_required and self.pickup_location:
+            zone = get_zone_matcher().match(self.pickup_location)
+            pickup_zone = zone.name if zone else None
+        
+        inputs = [
+            self.excursion_package,
+            str(getdate(self.excursion_date)),
+            str(get_time(self.departure_time)) if self.departure_time else None,
+            cint(self.adult_count),
+            cint(self.child_count),
+            sorted((guest.age_category or "", cint(guest.age)) for guest in self.guests or []),
+            self.residence_type,
+            pickup_zone,
+            # Park fees depend on the party's residence, the vehicle type and the guide
+            self.booking_party,
+            self.assigned_vehicle,
+            self.assigned_guide,
+            self.get_pricing_source_versions()
+        ]
+        
+        return hashlib.sha1(json.dumps(inputs, default=str).encode()).hexdigest()
+    
+    def get_pricing_source_versions(self):
+        """Last change and row count of the rates, seasons and parks pricing reads
+        
+        Taken from the database rather than the cache versions, which are
+        lost on a Redis flush and would then let a stale breakdown match.
+        The counts catch deleted rows, which leave no modified behind.
+        """
+        settings = frappe.get_cached_doc("Excursion Settings")
+        
+        # Parks come from the optional parks app, only read when it is installed and in use
+        parks = """
+            UNION ALL
+            SELECT MAX(modified), COUNT(*) FROM `tabNational Park`
+        """ if cint(settings.enable_parks_integration) and frappe.db.table_exists("National Park") else ""
+        
+        versions = frappe.db.sql(f"""
+            SELECT MAX(modified), COUNT(*) FROM `tabExcursion Rate Configuration` WHERE excursion_package = %(package)s
+            UNION ALL
+            SELECT MAX(modified), COUNT(*) FROM `tabExcursion Season`
+            UNION ALL
+            SELECT modified, 1 FROM `tabExcursion Package` WHERE name = %(package)s
+            {parks}
+        """, {"package": self.excursion_package})
+        
+        # Settings carry the pricing rules
+        settings_modified = settings.modified
+        
+        return [[str(modified), cint(count)] for modified, count in versions] + [str(settings_modified)]
+    
+    def calculate_park_fees(self):
+        """Park fee breakdown, or None when it couldn't be calculated"""
+        try:
+            return ExcursionParkFeeCalculator(self).calculate_park_fees()
+        except Exception as e:
+            frappe.log_error(f"Park fee calculation error: {str(e)}")
+            return None
+    
+    def get_priced_park_fees(self, park_calculator):
+        """Park fees from the stored breakdown, priced again only if missing"""
+        if self.pricing_breakdown and self.pricing_fingerprint == self.get_pricing_fingerprint():
+            park_fees = json.loads(self.pricing_breakdown).get("park_fees")
+            if park_fees is not None:
+                return park_fees
+        
+        return park_calculator.calculate_park_fees()
+    
     def set_estimated_times(self):
         """Set estimated pickup and return times"""
         if self.departure_time and self.duration_hours:
@@ -187,11 +281,12 @@ class ExcursionBooking(Document):
                     frappe.msgprint(_("Park booking {0} created successfully").format(
                         park_booking))
                     
-                    # Update pricing with park fees
-                    park_fees = park_calculator.calculate_park_fees()
+                    # Update pricing with park fees priced at validate
+                    park_fees = self.get_priced_park_fees(park_calculator)
                     if park_fees["total_fees"] > 0:
                         self.additional_charges = (self.additional_charges or 0) + park_fees["total_fees"]
-                        self.total_amount = (self.base_amount or 0) - (self.child_discount or 0) - (self.group_discount or 0) + self.additional_charges
+                        # On top of the priced total, which already carries supplements and surcharges
+                        self.total_amount = (self.total_amount or 0) + park_fees["total_fees"]
                         self.balance_due = self.total_amount - (self.deposit_amount or 0)
                         
                         frappe.msgprint(_("Park fees of ${0} added to booking").format(
@@ -345,30 +440,18 @@ class ExcursionBooking(Document):
             frappe.log_error(f"Cancellation notification error: {str(e)}")
     
     def update_pickup_status(self, status, notes=None):
-        """Update pickup confirmation status"""
-        valid_statuses = ["Pending", "Confirmed", "Guest Located", "In Transit", "Completed"]
+        """Update pickup confirmation status
         
-        if status not in valid_statuses:
-            frappe.throw(_("Invalid pickup status: {0}").format(status))
-            
-        old_status = self.pickup_confirmation_status
-        self.pickup_confirmation_status = status
+        Updates the status columns in place instead of saving, so the
+        booking isn't re-validated; notifications are sent in the background.
+        """
+        from safari_excursion.utils.pickup_status import patch_pickup_status
         
-        if status == "In Transit":
-            self.excursion_status = "In Progress"
-        elif status == "Completed":
-            self.excursion_status = "Completed"
-            
-        if notes:
-            if not self.transport_notes:
-                self.transport_notes = notes
-            else:
-                self.transport_notes += f"\n\nStatus Update: {notes}"
-                
-        self.save()
+        change = patch_pickup_status(self.name, status, notes=notes)
         
-        # Send status update notifications
-        self.send_status_update_notification(old_status, status)
+        self.pickup_confirmation_status = change["pickup_confirmation_status"]
+        self.excursion_status = change["excursion_status"]
+        self.modified = change["modified"]
     
     def send_status_update_notification(self, old_status, new_status):
         """Send status update notifications"""
@@ -454,28 +537,14 @@ class ExcursionBooking(Document):
             transport_doc.save()
     
     def is_guide_available(self, guide):
-        """Check if guide is available on excursion date"""
-        # Check for conflicting assignments
-        conflicts = frappe.db.count("Excursion Booking", {
-            "assigned_guide": guide,
-            "excursion_date": self.excursion_date,
-            "booking_status": ["in", ["Confirmed", "In Progress"]],
-            "name": ["!=", self.name]
-        })
-        
-        return conflicts == 0
+        """Check if guide is available on excursion date, across all apps' bookings"""
+        return is_resource_available("Safari Guide", guide, *day_window(self.excursion_date),
+                                     exclude=(self.doctype, self.name))
     
     def is_vehicle_available(self, vehicle):
-        """Check if vehicle is available on excursion date"""
-        # Check for conflicting assignments
-        conflicts = frappe.db.count("Excursion Booking", {
-            "assigned_vehicle": vehicle,
-            "excursion_date": self.excursion_date,
-            "booking_status": ["in", ["Confirmed", "In Progress"]],
-            "name": ["!=", self.name]
-        })
-        
-        return conflicts == 0
+        """Check if vehicle is available on excursion date, across all apps' bookings"""
+        return is_resource_available("Vehicle", vehicle, *day_window(self.excursion_date),
+                                     exclude=(self.doctype, self.name))
     
     @frappe.whitelist()
     def send_reminder_notification(self):
@@ -0,0 +1,33 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/safari_excursion/doctype/excursion_gazetteer_place/excursion_gazetteer_place.py
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+from safari_excursion.utils.pickup_clustering import parse_coordinates
+
+class ExcursionGazetteerPlace(Document):
+    """
+    DocType controller for Excursion Gazetteer Place
+
+    Places are matched against free-text pickup locations by the local
+    gazetteer to find coordinates and a transport zone.
+    """
+
+    def validate(self):
+        """Validate document before saving"""
+        if self.gps_coordinates and not parse_coordinates(self.gps_coordinates):
+            frappe.throw(_("GPS Coordinates must be in the format latitude,longitude"))
+
+        if self.transport_zone:
+            zones = [zone.zone_name for zone in frappe.get_single("Excursion Settings").transport_zones]
+            if self.transport_zone not in zones:
+                frappe.throw(_("Transport Zone {0} is not configured in Excursion Settings").format(self.transport_zone))
+
+    def on_update(self):
+        from safari_excursion.utils.gazetteer import clear_gazetteer_cache
+        clear_gazetteer_cache()
+
+    def on_trash(self):
+        from safari_excursion.utils.gazetteer import clear_gazetteer_cache
+        clear_gazetteer_cache()
@@ -4,6 +4,7 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import getdate, now_datetime, time_diff_in_hours, get_time
+from safari_excursion.utils.resource_calendar import day_window, is_resource_available
 
 class ExcursionOperation(Document):
     """
@@ -85,28 +86,15 @@ class ExcursionOperation(Document):
                 self.operation_status = "Completed"
     
     def is_guide_available(self, guide):
-        """Check if guide is available for this operation"""
-        # Check if guide has any conflicting operations on the same date
-        conflicting_ops = frappe.get_all("Excursion Operation", {
-            "assigned_guide": guide,
-            "operation_date": self.operation_date,
-            "name": ["!=", self.name],
-            "operation_status": ["in", ["Scheduled", "In Progress"]]
-        })
-        
-        return len(conflicting_ops) == 0
+        """Check if guide is available for this operation, across all apps' bookings"""
+        # The operation's own booking holds its guide in the resource calendar
+        return is_resource_available("Safari Guide", guide, *day_window(self.operation_date),
+                                     exclude=("Excursion Booking", self.excursion_booking))
     
     def is_vehicle_available(self, vehicle):
-        """Check if vehicle is available for this operation"""
-        # Check if vehicle has any conflicting operations on the same date
-        conflicting_ops = frappe.get_all("Excursion Operation", {
-            "assigned_vehicle": vehicle,
-            "operation_date": self.operation_date,
-            "name": ["!=", self.name],
-            "operation_status": ["in", ["Scheduled", "In Progress"]]
-        })
-        
-        return len(conflicting_ops) == 0
+        """Check if vehicle is available for this operation, across all apps' bookings"""
+        return is_resource_available("Vehicle", vehicle, *day_window(self.operation_date),
+                                     exclude=("Excursion Booking", self.excursion_booking))
     
     def on_submit(self):
         """Handle operation submission"""
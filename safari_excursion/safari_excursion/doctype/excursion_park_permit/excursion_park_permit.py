@@ -0,0 +1,23 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/safari_excursion/doctype/excursion_park_permit/excursion_park_permit.py
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint
+
+class ExcursionParkPermit(Document):
+    """
+    DocType controller for Excursion Park Permit
+
+    Permits are kept by safari_excursion.utils.park_permits: one per park,
+    visit date (and vehicle, if configured) with a manifest row for every
+    excursion booking visiting, and a single Park Booking filed for all.
+    """
+
+    def validate(self):
+        """Recompute totals from the manifest"""
+        entries = [entry for entry in self.entries if not entry.cancelled]
+
+        self.booking_count = len(entries)
+        self.total_adults = sum(cint(entry.adult_count) for entry in entries)
+        self.total_children = sum(cint(entry.child_count) for entry in entries)
+        self.total_guests = self.total_adults + self.total_children
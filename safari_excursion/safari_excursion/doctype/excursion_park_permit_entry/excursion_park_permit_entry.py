@@ -0,0 +1,7 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/safari_excursion/doctype/excursion_park_permit_entry/excursion_park_permit_entry.py
+
+import frappe
+from frappe.model.document import Document
+
+class ExcursionParkPermitEntry(Document):
+    pass
@@ -31,27 +31,19 @@ class ExcursionRateConfiguration(Document):
     
     def validate_group_discount_tiers(self):
         if self.has_group_discounts and self.group_discount_tiers:
-            # Check for overlapping group sizes
-            group_sizes = []
+            # Each tier starts at a minimum group size and applies until the next tier
+            sizes = set()
             for tier in self.group_discount_tiers:
-                group_sizes.append({
-                    'min_size': tier.min_group_size,
-                    'max_size': tier.max_group_size,
-                    'discount_percentage': tier.discount_percentage
-                })
-            
-            # Sort by min_size
-            group_sizes.sort(key=lambda x: x['min_size'])
-            
-            # Check for gaps or overlaps
-            for i in range(len(group_sizes) - 1):
-                current = group_sizes[i]
-                next_tier = group_sizes[i + 1]
+                if tier.minimum_group_size in sizes:
+                    frappe.throw(f"Duplicate minimum group size: {tier.minimum_group_size}")
+                sizes.add(tier.minimum_group_size)
                 
-                if current['max_size'] + 1 != next_tier['min_size']:
-                    frappe.throw(f"Group size tiers must be consecutive without gaps. "
-                               f"Current tier ends at {current['max_size']}, "
-                               f"next tier starts at {next_tier['min_size']}")
+                if tier.discount_percentage < 0 or tier.discount_percentage > 100:
+                    frappe.throw("Discount percentage must be between 0 and 100")
+    
+    def on_update(self):
+        from safari_excursion.safari_excursion.utils.rate_card import clear_rate_card_cache
+        clear_rate_card_cache()
     
     def on_submit(self):
         # Create rate tables if they don't exist
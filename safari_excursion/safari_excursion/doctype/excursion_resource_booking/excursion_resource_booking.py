@@ -0,0 +1,19 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/safari_excursion/doctype/excursion_resource_booking/excursion_resource_booking.py
+
+import frappe
+from frappe.model.document import Document
+
+class ExcursionResourceBooking(Document):
+    """
+    DocType controller for Excursion Resource Booking
+
+    Rows are written by safari_excursion.utils.resource_calendar from the
+    bookings that occupy a guide or vehicle, never by hand.
+    """
+
+    pass
+
+def on_doctype_update():
+    """Index the availability range query and the per-source resync"""
+    frappe.db.add_index("Excursion Resource Booking", ["resource_type", "from_datetime", "to_datetime"])
+    frappe.db.add_index("Excursion Resource Booking", ["source_doctype", "source_name"])
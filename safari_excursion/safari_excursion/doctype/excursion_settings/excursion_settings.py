@@ -5,6 +5,9 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 
+from safari_excursion.utils.pricing_rules import clear_pricing_rule_cache
+from safari_excursion.utils.transport_zones import clear_transport_zone_cache, parse_geofence
+
 class ExcursionSettings(Document):
     def validate(self):
         """Validate settings before saving"""
@@ -69,6 +72,14 @@ class ExcursionSettings(Document):
             
             if zone.additional_charge < 0:
                 frappe.throw(_("Additional charge cannot be negative"))
+            
+            if zone.geofence_type and not parse_geofence(zone.as_dict()):
+                frappe.throw(_("Geofence for zone {0} is incomplete: a radius needs a center and radius, a polygon at least three latitude,longitude points").format(zone.zone_name))
+    
+    def on_update(self):
+        """Recompile settings-driven lookups on every worker"""
+        clear_transport_zone_cache()
+        clear_pricing_rule_cache()
 
 @frappe.whitelist()
 def get_excursion_settings():
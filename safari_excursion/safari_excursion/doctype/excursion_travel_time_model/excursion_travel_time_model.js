@@ -0,0 +1,21 @@
+// ~/frappe-bench/apps/safari_excursion/safari_excursion/safari_excursion/doctype/excursion_travel_time_model/excursion_travel_time_model.js
+
+frappe.ui.form.on('Excursion Travel Time Model', {
+    refresh: function(frm) {
+        frm.add_custom_button(__('Retrain Now'), function() {
+            frappe.call({
+                method: 'safari_excursion.utils.travel_time.train_travel_time_model',
+                freeze: true,
+                freeze_message: __('Learning travel times from completed pickups...'),
+                callback: function(r) {
+                    if (r.message && r.message.status === 'success') {
+                        frappe.show_alert({message: r.message.message, indicator: 'green'});
+                        frm.reload_doc();
+                    } else if (r.message) {
+                        frappe.msgprint(r.message.message);
+                    }
+                }
+            });
+        });
+    }
+});
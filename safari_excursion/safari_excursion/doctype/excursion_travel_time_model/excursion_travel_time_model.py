@@ -0,0 +1,26 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/safari_excursion/doctype/excursion_travel_time_model/excursion_travel_time_model.py
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+class ExcursionTravelTimeModel(Document):
+    """
+    Travel and dwell times learned from completed pickups
+
+    The model is rebuilt nightly by safari_excursion.utils.travel_time and
+    read by the pickup scheduler through a cached copy.
+    """
+
+    def validate(self):
+        """Validate training settings"""
+        if self.lookback_days is not None and self.lookback_days < 1:
+            frappe.throw(_("Lookback must be at least one day"))
+
+        if self.min_samples is not None and self.min_samples < 1:
+            frappe.throw(_("Minimum samples must be at least 1"))
+
+    def on_update(self):
+        """Drop the cached model so schedulers pick up the new version"""
+        from safari_excursion.utils.travel_time import clear_travel_time_cache
+        clear_travel_time_cache()
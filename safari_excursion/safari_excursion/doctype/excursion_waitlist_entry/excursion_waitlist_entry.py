@@ -0,0 +1,30 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/safari_excursion/doctype/excursion_waitlist_entry/excursion_waitlist_entry.py
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import cint
+
+from safari_excursion.utils.waitlist import get_waitlist_key
+
+class ExcursionWaitlistEntry(Document):
+    """
+    DocType controller for Excursion Waitlist Entry
+
+    Entries wait in safari_excursion.utils.waitlist's queue for their
+    departure until released seats are offered to them as a held draft
+    Excursion Booking.
+    """
+
+    def validate(self):
+        """Validate party and set the departure key"""
+        self.party_size = cint(self.adult_count) + cint(self.child_count)
+        if self.party_size <= 0:
+            frappe.throw(_("Party size must be greater than 0"))
+
+        self.waitlist_key = get_waitlist_key(self.excursion_package, self.excursion_date, self.departure_time)
+
+def on_doctype_update():
+    """Index the per-departure queue and the booking lookup of hooks"""
+    frappe.db.add_index("Excursion Waitlist Entry", ["waitlist_key", "status"])
+    frappe.db.add_index("Excursion Waitlist Entry", ["excursion_booking"])
@@ -0,0 +1,103 @@
+// ~/frappe-bench/apps/safari_excursion/safari_excursion/safari_excursion/page/excursion_performance/excursion_performance.js
+
+frappe.pages['excursion-performance'].on_page_load = function(wrapper) {
+    let page = frappe.ui.make_app_page({
+        parent: wrapper,
+        title: __('Excursion Performance'),
+        single_column: true
+    });
+
+    let hours_field = page.add_field({
+        fieldname: 'hours',
+        label: __('Last Hours'),
+        fieldtype: 'Select',
+        options: ['1', '6', '24', '48'],
+        default: '24',
+        change: function() {
+            load_stats(page, hours_field.get_value());
+        }
+    });
+
+    page.set_primary_action(__('Refresh'), function() {
+        load_stats(page, hours_field.get_value());
+    }, 'refresh');
+
+    if (frappe.user.has_role('System Manager')) {
+        page.add_menu_item(__('Reset Stats'), function() {
+            frappe.confirm(__('Clear all collected instrumentation stats?'), function() {
+                frappe.call({
+                    method: 'safari_excursion.utils.instrumentation.reset_instrumentation_stats',
+                    callback: function() {
+                        load_stats(page, hours_field.get_value());
+                    }
+                });
+            });
+        });
+    }
+
+    page.stats_wrapper = $('<div class="excursion-performance-stats"></div>').appendTo(page.body);
+    load_stats(page, '24');
+};
+
+function load_stats(page, hours) {
+    frappe.call({
+        method: 'safari_excursion.utils.instrumentation.get_instrumentation_stats',
+        args: { hours: hours },
+        callback: function(r) {
+            if (r.message) {
+                render_stats(page, r.message);
+            }
+        }
+    });
+}
+
+function render_stats(page, data) {
+    let html = '';
+
+    if (!data.enabled) {
+        html += `<div class="alert alert-warning">
+            ${__('Instrumentation is disabled for this site. Set "excursion_instrumentation": 1 in site_config.json to start collecting stats.')}
+        </div>`;
+    }
+
+    if (!data.stats.length) {
+        html += `<p class="text-muted">${__('No calls recorded in this period.')}</p>`;
+        page.stats_wrapper.html(html);
+        return;
+    }
+
+    html += `<table class="table table-bordered table-condensed">
+        <thead>
+            <tr>
+                <th>${__('Endpoint / Hook')}</th>
+                <th class="text-right">${__('Calls')}</th>
+                <th class="text-right">${__('Errors')}</th>
+                <th class="text-right">${__('Slow')}</th>
+                <th class="text-right">${__('Avg ms')}</th>
+                <th class="text-right">${__('Total ms')}</th>
+                <th class="text-right">${__('Avg Queries')}</th>
+                <th class="text-right">${__('Avg DB ms')}</th>
+                <th class="text-right">${__('Cache Hit %')}</th>
+                <th class="text-right">${__('Emails')}</th>
+            </tr>
+        </thead>
+        <tbody>`;
+
+    data.stats.forEach(function(row) {
+        html += `<tr>
+            <td>${frappe.utils.escape_html(row.name)}</td>
+            <td class="text-right">${row.calls}</td>
+            <td class="text-right">${row.errors}</td>
+            <td class="text-right">${row.slow_calls}</td>
+            <td class="text-right">${row.avg_wall_ms}</td>
+            <td class="text-right">${row.wall_ms}</td>
+            <td class="text-right">${row.avg_db_queries}</td>
+            <td class="text-right">${row.avg_db_ms}</td>
+            <td class="text-right">${row.cache_hit_rate}</td>
+            <td class="text-right">${row.emails}</td>
+        </tr>`;
+    });
+
+    html += '</tbody></table>';
+    page.stats_wrapper.html(html);
+}
@@ -0,0 +1,134 @@
+import frappe
+from frappe import _
+from frappe.utils import add_days, getdate
+from safari_excursion.utils.profitability import ExcursionProfitabilityEngine, GROUP_BY_FIELDS
+
+GROUP_BY_OPTIONS = {
+    "Package": ("Excursion Package", 200),
+    "Guide": ("Safari Guide", 150),
+    "Vehicle": ("Vehicle", 120)
+}
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    group_by = filters.get("group_by") or "Package"
+
+    columns = get_columns(group_by)
+    data = get_data(filters, group_by)
+    return columns, data
+
+def get_columns(group_by):
+    link_doctype, width = GROUP_BY_OPTIONS[group_by]
+
+    return [
+        {
+            "fieldname": "month",
+            "label": _("Month"),
+            "fieldtype": "Date",
+            "width": 100
+        },
+        {
+            "fieldname": "group_value",
+            "label": _(group_by),
+            "fieldtype": "Link",
+            "options": link_doctype,
+            "width": width
+        },
+        {
+            "fieldname": "bookings",
+            "label": _("Bookings"),
+            "fieldtype": "Int",
+            "width": 90
+        },
+        {
+            "fieldname": "total_guests",
+            "label": _("Guests"),
+            "fieldtype": "Int",
+            "width": 80
+        },
+        {
+            "fieldname": "revenue",
+            "label": _("Revenue"),
+            "fieldtype": "Currency",
+            "width": 120
+        },
+        {
+            "fieldname": "guide_cost",
+            "label": _("Guide Cost"),
+            "fieldtype": "Currency",
+            "width": 110
+        },
+        {
+            "fieldname": "vehicle_cost",
+            "label": _("Vehicle Cost"),
+            "fieldtype": "Currency",
+            "width": 110
+        },
+        {
+            "fieldname": "fuel_cost",
+            "label": _("Fuel Cost"),
+            "fieldtype": "Currency",
+            "width": 100
+        },
+        {
+            "fieldname": "park_fees",
+            "label": _("Park Fees"),
+            "fieldtype": "Currency",
+            "width": 110
+        },
+        {
+            "fieldname": "other_costs",
+            "label": _("Other Costs"),
+            "fieldtype": "Currency",
+            "width": 110
+        },
+        {
+            "fieldname": "total_costs",
+            "label": _("Total Costs"),
+            "fieldtype": "Currency",
+            "width": 120
+        },
+        {
+            "fieldname": "profit",
+            "label": _("Profit"),
+            "fieldtype": "Currency",
+            "width": 120
+        },
+        {
+            "fieldname": "profit_margin",
+            "label": _("Margin %"),
+            "fieldtype": "Percent",
+            "width": 90
+        },
+        {
+            "fieldname": "fuel_consumption",
+            "label": _("Fuel Used"),
+            "fieldtype": "Float",
+            "width": 90
+        },
+        {
+            "fieldname": "tips_received",
+            "label": _("Tips"),
+            "fieldtype": "Currency",
+            "width": 100
+        }
+    ]
+
+def get_data(filters, group_by):
+    from_date = filters.get("from_date") or add_days(getdate(), -30)
+    to_date = filters.get("to_date") or getdate()
+
+    engine = ExcursionProfitabilityEngine(
+        from_date,
+        to_date,
+        filters={field: filters.get(field) for field in GROUP_BY_FIELDS.values()}
+    )
+
+    data = engine.summarize(group_by)
+
+    # Highlight loss-making groups
+    for row in data:
+        if row.profit < 0:
+            row['_style'] = 'background-color: #ffe6e6;'
+
+    return data
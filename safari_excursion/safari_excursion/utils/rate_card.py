@@ -0,0 +1,383 @@
+import copy
+import frappe
+from bisect import bisect_right
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from frappe.utils import cint, flt, getdate
+
+from safari_excursion.utils.cache_utils import WorkerCache, bump_cache_version
+
+RATE_CARD_CACHE = "rate_cards"
+
+RATE_TABLES = {
+    "Local": {
+        "rates": "Excursion Local Per Person Rate",
+        "supplements": "Seasonal Supplement",
+        "holidays": "Holiday Surcharge Period",
+        "currency": "KES"
+    },
+    "International": {
+        "rates": "Excursion International Per Person Rate",
+        "supplements": "International Seasonal Supplement",
+        "holidays": "International Holiday Surcharge Period",
+        "currency": "USD"
+    }
+}
+
+PERCENTAGE = "Percentage of Base Rate"
+
+def flatten_intervals(intervals):
+    """Sort (start, end, value) intervals and clip overlaps so earlier starts win
+
+    Returns parallel start/end/value lists that can be searched with bisect.
+    """
+    starts, ends, values = [], [], []
+
+    for start, end, value in sorted(intervals, key=lambda interval: interval[0]):
+        if ends and start <= ends[-1]:
+            start = ends[-1] + timedelta(days=1)
+        if start > end:
+            continue
+
+        starts.append(start)
+        ends.append(end)
+        values.append(value)
+
+    return starts, ends, values
+
+def find_interval(starts, ends, values, day):
+    """Value of the interval containing a date, in O(log n)"""
+    i = bisect_right(starts, day) - 1
+    if i >= 0 and day <= ends[i]:
+        return values[i]
+    return None
+
+def encode_price_bands(from_date, values, key=None):
+    """Run-length encode one value per day into (from_date, to_date, value) bands"""
+    key = key or (lambda value: value)
+    bands = []
+
+    for offset, value in enumerate(values):
+        day = from_date + timedelta(days=offset)
+        if bands and key(bands[-1][2]) == key(value):
+            bands[-1][1] = day
+        else:
+            bands.append([day, day, value])
+
+    return [tuple(band) for band in bands]
+
+class Adjustment:
+    """Signed fixed and percentage amounts for adults and children"""
+
+    __slots__ = ["adult_fixed", "child_fixed", "adult_percent", "child_percent", "label"]
+
+    def __init__(self, label=None):
+        self.adult_fixed = self.child_fixed = self.adult_percent = self.child_percent = 0.0
+        self.label = label
+
+    def add(self, adjustment_type, adult_amount, child_amount, sign=1):
+        if adjustment_type == PERCENTAGE:
+            self.adult_percent += sign * flt(adult_amount)
+            self.child_percent += sign * flt(child_amount)
+        else:
+            self.adult_fixed += sign * flt(adult_amount)
+            self.child_fixed += sign * flt(child_amount)
+        return self
+
+    def adult(self, rate):
+        return self.adult_fixed + rate * self.adult_percent / 100
+
+    def child(self, rate):
+        return self.child_fixed + rate * self.child_percent / 100
+
+class CompiledRateCard:
+    """
+    Rate configuration for one package compiled for fast evaluation
+
+    Seasons and holiday periods become sorted, non-overlapping interval
+    arrays searched with bisect; seasonal supplements are pre-summed per
+    residence and season; child brackets and group tiers are sorted
+    arrays. Everything is loaded with a handful of set-based queries when
+    the card is built, so pricing a date does no database work.
+    """
+
+    def __init__(self, excursion_package: str):
+        self.excursion_package = excursion_package
+        self.config = frappe.db.get_value(
+            "Excursion Rate Configuration",
+            {"excursion_package": excursion_package},
+            ["name", "has_child_rates", "child_rate_type", "has_seasonal_supplements",
+             "has_holiday_surcharges", "has_group_discounts"],
+            as_dict=True
+        )
+
+        self.rates = {}
+        self.supplements = {}
+        self.holidays = {}
+
+        if not self.config:
+            return
+
+        self.compile_seasons()
+        self.compile_child_brackets()
+        self.compile_group_tiers()
+        for residence_type in RATE_TABLES:
+            self.compile_rates(residence_type)
+
+    def compile_seasons(self):
+        seasons = frappe.get_all("Excursion Season",
+                                 filters={"is_active": 1},
+                                 fields=["name", "start_date", "end_date"])
+
+        self.season_windows = {season.name: (getdate(season.start_date), getdate(season.end_date))
+                               for season in seasons}
+        self.set_seasons(self.season_windows)
+    
+    def set_seasons(self, season_windows):
+        self.season_starts, self.season_ends, self.season_names = flatten_intervals(
+            (start, end, name) for name, (start, end) in season_windows.items()
+        )
+
+    def compile_child_brackets(self):
+        brackets = []
+        if self.config.has_child_rates and frappe.db.table_exists("Child Age Bracket"):
+            brackets = frappe.get_all("Child Age Bracket",
+                                      filters={"parent": self.config.name,
+                                               "parenttype": "Excursion Rate Configuration"},
+                                      fields=["min_age", "max_age", "rate_value"],
+                                      order_by="min_age")
+
+        self.child_min_ages = [cint(bracket.min_age) for bracket in brackets]
+        self.child_brackets = brackets
+
+    def compile_group_tiers(self):
+        tiers = []
+        if self.config.has_group_discounts:
+            tiers = frappe.get_all("Excursion Group Discount Tier",
+                                   filters={"parent": self.config.name,
+                                            "parenttype": "Excursion Rate Configuration"},
+                                   fields=["minimum_group_size", "discount_percentage"],
+                                   order_by="minimum_group_size")
+
+        self.tier_sizes = [cint(tier.minimum_group_size) for tier in tiers]
+        self.tier_discounts = [flt(tier.discount_percentage) for tier in tiers]
+
+    def compile_rates(self, residence_type):
+        tables = RATE_TABLES[residence_type]
+        rates = frappe.get_all(tables["rates"],
+                               filters={"excursion_package": self.excursion_package},
+                               fields=["name", "season", "adult_rate", "currency"])
+
+        self.rates[residence_type] = {
+            rate.season: frappe._dict({
+                "adult_rate": flt(rate.adult_rate),
+                "currency": rate.currency or tables["currency"]
+            }) for rate in rates
+        }
+
+        rate_seasons = {rate.name: rate.season for rate in rates}
+        supplements = {}
+        holidays = []
+
+        if rate_seasons and self.config.has_seasonal_supplements:
+            for row in frappe.get_all(tables["supplements"],
+                                      filters={"parent": ["in", list(rate_seasons)]},
+                                      fields=["parent", "supplement_name", "supplement_type",
+                                              "adult_supplement", "child_supplement", "is_reduction"]):
+                season = rate_seasons[row.parent]
+                supplements.setdefault(season, Adjustment(row.supplement_name)).add(
+                    row.supplement_type, row.adult_supplement, row.child_supplement,
+                    -1 if row.is_reduction else 1
+                )
+
+        if rate_seasons and self.config.has_holiday_surcharges:
+            for row in frappe.get_all(tables["holidays"],
+                                      filters={"parent": ["in", list(rate_seasons)]},
+                                      fields=["holiday_name", "start_date", "end_date", "surcharge_type",
+                                              "adult_surcharge", "child_surcharge"]):
+                adjustment = Adjustment(row.holiday_name).add(
+                    row.surcharge_type, row.adult_surcharge, row.child_surcharge
+                )
+                holidays.append((getdate(row.start_date), getdate(row.end_date), adjustment))
+
+        self.supplements[residence_type] = supplements
+        self.holidays[residence_type] = flatten_intervals(holidays)
+
+    def with_changes(self, rates: List[Dict] = None, seasons: List[Dict] = None) -> "CompiledRateCard":
+        """Copy of the card with proposed adult rates and season windows applied
+
+        The cached card is left untouched, so proposals can be evaluated
+        without saving anything.
+        """
+        card = copy.copy(self)
+        if not self.config:
+            return card
+        
+        card.rates = {residence_type: dict(rates_by_season) for residence_type, rates_by_season in self.rates.items()}
+        for change in rates or []:
+            residence_type = change.get("residence_type") if change.get("residence_type") in RATE_TABLES else "International"
+            current = card.rates[residence_type].get(change.get("season"))
+            card.rates[residence_type][change.get("season")] = frappe._dict({
+                "adult_rate": flt(change.get("adult_rate")),
+                "currency": current.currency if current else RATE_TABLES[residence_type]["currency"]
+            })
+        
+        if seasons:
+            card.season_windows = dict(self.season_windows)
+            for season in seasons:
+                card.season_windows[season.get("season")] = (getdate(season.get("start_date")),
+                                                            getdate(season.get("end_date")))
+            card.set_seasons(card.season_windows)
+        
+        return card
+    
+    def get_season(self, excursion_date: date) -> Optional[str]:
+        return find_interval(self.season_starts, self.season_ends, self.season_names, getdate(excursion_date))
+
+    def get_child_rate(self, age: int, adult_rate: float) -> float:
+        """Child rate for an age from the sorted brackets"""
+        i = bisect_right(self.child_min_ages, cint(age)) - 1
+        if i < 0 or cint(age) > cint(self.child_brackets[i].max_age):
+            return 0.0
+
+        bracket = self.child_brackets[i]
+        if self.config.child_rate_type == "Fixed Rate":
+            return flt(bracket.rate_value)
+        if self.config.child_rate_type == "Percentage of Adult Rate":
+            return adult_rate * flt(bracket.rate_value) / 100
+        return 0.0
+
+    def get_group_discount(self, group_size: int) -> float:
+        """Discount percentage of the largest tier the group qualifies for"""
+        i = bisect_right(self.tier_sizes, cint(group_size)) - 1
+        return self.tier_discounts[i] if i >= 0 else 0.0
+
+    def price(self, excursion_date: date, residence_type: str, adults: int,
+              children: List[int] = None, group_size: int = None, season: str = None,
+              holiday=False) -> Dict:
+        """Price one date
+
+        Range evaluation passes the season and holiday it already found;
+        holiday=None then means no holiday applies.
+        """
+        if not self.config:
+            return {"error": "No rate configuration found"}
+
+        residence_type = residence_type if residence_type in RATE_TABLES else "International"
+        excursion_date = getdate(excursion_date)
+
+        season = season or self.get_season(excursion_date)
+        if not season:
+            frappe.throw(f"No season found for date {excursion_date}")
+
+        rate = self.rates[residence_type].get(season)
+        if not rate:
+            return {"error": "No base rate found for the season"}
+
+        children = children or []
+        adult_rate = rate.adult_rate
+        child_rates = [self.get_child_rate(age, adult_rate) for age in children]
+
+        adult_total = adults * adult_rate
+        child_total = sum(child_rates)
+
+        supplement = self.supplements[residence_type].get(season)
+        seasonal_supplement = 0.0
+        if supplement:
+            seasonal_supplement = (adults * supplement.adult(adult_rate) +
+                                   sum(supplement.child(child_rate) for child_rate in child_rates))
+
+        if holiday is False:
+            holiday = find_interval(*self.holidays[residence_type], excursion_date)
+        holiday_surcharge = 0.0
+        if holiday:
+            holiday_surcharge = (adults * holiday.adult(adult_rate) +
+                                 sum(holiday.child(child_rate) for child_rate in child_rates))
+
+        subtotal = adult_total + child_total + seasonal_supplement + holiday_surcharge
+
+        group_size = cint(group_size) or adults + len(children)
+        discount_percentage = self.get_group_discount(group_size)
+        group_discount = subtotal * discount_percentage / 100
+
+        return {
+            "currency": rate.currency,
+            "season": season,
+            "adult_rate": adult_rate,
+            "adult_total": adult_total,
+            "child_total": child_total,
+            "seasonal_supplement": seasonal_supplement,
+            "holiday": holiday.label if holiday else None,
+            "holiday_surcharge": holiday_surcharge,
+            "group_discount_percentage": discount_percentage,
+            "group_discount_amount": group_discount,
+            "total": subtotal - group_discount
+        }
+
+    def price_range(self, from_date: date, to_date: date, residence_type: str, adults: int,
+                    children: List[int] = None, group_size: int = None) -> List[Dict]:
+        """Price every date in a range with one linear walk over seasons and holidays"""
+        if not self.config:
+            return []
+
+        residence_type = residence_type if residence_type in RATE_TABLES else "International"
+        from_date, to_date = getdate(from_date), getdate(to_date)
+        holiday_starts, holiday_ends, holiday_values = self.holidays[residence_type]
+
+        season_index = max(bisect_right(self.season_starts, from_date) - 1, 0)
+        holiday_index = max(bisect_right(holiday_starts, from_date) - 1, 0)
+        prices = []
+        day = from_date
+
+        while day <= to_date:
+            while season_index < len(self.season_ends) and self.season_ends[season_index] < day:
+                season_index += 1
+            while holiday_index < len(holiday_ends) and holiday_ends[holiday_index] < day:
+                holiday_index += 1
+
+            season = None
+            if season_index < len(self.season_starts) and self.season_starts[season_index] <= day:
+                season = self.season_names[season_index]
+
+            holiday = None
+            if holiday_index < len(holiday_starts) and holiday_starts[holiday_index] <= day:
+                holiday = holiday_values[holiday_index]
+
+            if season and season in self.rates[residence_type]:
+                price = self.price(day, residence_type, adults, children, group_size, season, holiday)
+            else:
+                price = {"error": "No season or base rate for this date"}
+
+            price["date"] = day
+            prices.append(price)
+            day += timedelta(days=1)
+
+        return prices
+
+    def price_curve(self, from_date: date, to_date: date, residence_type: str, adults: int,
+                    children: List[int] = None, group_size: int = None) -> List[Dict]:
+        """Price bands for a date range: consecutive days with the same price merged"""
+        from_date = getdate(from_date)
+        prices = self.price_range(from_date, to_date, residence_type, adults, children, group_size)
+        bands = encode_price_bands(from_date, prices, key=lambda price: (
+            price.get("season"), price.get("holiday"), round(flt(price.get("total")), 2), price.get("error")
+        ))
+
+        curve = []
+        for start, end, price in bands:
+            price = dict(price, from_date=start, to_date=end, days=(end - start).days + 1)
+            price.pop("date", None)
+            curve.append(price)
+
+        return curve
+
+_rate_cards = WorkerCache(RATE_CARD_CACHE, CompiledRateCard)
+
+def get_rate_card(excursion_package: str) -> CompiledRateCard:
+    """Compiled rate card for a package, cached per worker"""
+    return _rate_cards.get(excursion_package)
+
+def clear_rate_card_cache(doc=None, method=None):
+    """Recompile rate cards on every worker (also used as a doc event)"""
+    bump_cache_version(RATE_CARD_CACHE)
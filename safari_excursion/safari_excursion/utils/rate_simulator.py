@@ -0,0 +1,191 @@
+import frappe
+import json
+from frappe import _
+from frappe.utils import cint, flt, getdate, today
+from typing import Dict, List
+
+from safari_excursion.safari_excursion.utils.rate_card import RATE_TABLES, get_rate_card
+from safari_excursion.utils.instrumentation import instrument
+
+# Dimensions the revenue delta is broken down by
+SIMULATION_DIMENSIONS = {
+    "by_package": "excursion_package",
+    "by_season": "season",
+    "by_residence_type": "residence_type",
+    "by_agent": "agent"
+}
+
+class RateChangeSimulator:
+    """
+    Revenue impact of proposed rate and season changes on future bookings
+
+    Pricing inputs of all future bookings are loaded into columns with two
+    queries. Every distinct input combination (package, date, residence,
+    adults, child ages, group size) is priced once against the current
+    and the proposed rate card, and the totals are mapped back onto the
+    booking columns. Nothing is written: proposed cards are in-memory
+    copies of the cached ones.
+    """
+
+    def __init__(self, rates: List[Dict] = None, seasons: List[Dict] = None,
+                 from_date=None, to_date=None, excursion_package: str = None):
+        self.rates = rates or []
+        self.seasons = seasons or []
+        self.from_date = getdate(from_date or today())
+        self.to_date = getdate(to_date) if to_date else None
+        self.excursion_package = excursion_package
+
+    def load_columns(self) -> Dict[str, list]:
+        """Pricing inputs of future bookings as parallel columns"""
+        conditions = ["eb.docstatus < 2", "eb.booking_status != 'Cancelled'", "eb.excursion_date >= %(from_date)s"]
+        values = {"from_date": self.from_date}
+
+        if self.to_date:
+            conditions.append("eb.excursion_date <= %(to_date)s")
+            values["to_date"] = self.to_date
+        if self.excursion_package:
+            conditions.append("eb.excursion_package = %(excursion_package)s")
+            values["excursion_package"] = self.excursion_package
+
+        rows = frappe.db.sql("""
+            SELECT eb.name, eb.excursion_package, eb.excursion_date, eb.residence_type,
+                COALESCE(eb.adult_count, 0), COALESCE(eb.child_count, 0), COALESCE(eb.agent, '')
+            FROM `tabExcursion Booking` eb
+            WHERE {conditions}
+            ORDER BY eb.excursion_package, eb.excursion_date
+        """.format(conditions=" AND ".join(conditions)), values)
+
+        names, packages, dates, residence_types, adults, children, agents = (
+            [list(column) for column in zip(*rows)] if rows else [[] for i in range(7)]
+        )
+        child_ages = self.load_child_ages(names)
+
+        return {
+            "booking": names,
+            "excursion_package": packages,
+            "excursion_date": [getdate(d) for d in dates],
+            "residence_type": [r if r in RATE_TABLES else "International" for r in residence_types],
+            "adults": [cint(a) for a in adults],
+            "child_ages": [child_ages.get(name, ()) for name in names],
+            "group_size": [cint(a) + cint(c) for a, c in zip(adults, children)],
+            "agent": agents
+        }
+
+    def load_child_ages(self, bookings: List[str]) -> Dict[str, tuple]:
+        """Child ages per booking, as the booking itself prices them"""
+        if not bookings:
+            return {}
+
+        ages = {}
+        for parent, age in frappe.db.sql("""
+            SELECT parent, age FROM `tabExcursion Booking Guest`
+            WHERE parenttype = 'Excursion Booking' AND age_category = 'Child' AND parent IN %(bookings)s
+            ORDER BY parent, idx
+        """, {"bookings": tuple(bookings)}):
+            ages.setdefault(parent, []).append(cint(age))
+
+        return {parent: tuple(values) for parent, values in ages.items()}
+
+    def get_cards(self, packages) -> Dict[str, tuple]:
+        """Current and proposed rate card per package"""
+        cards = {}
+        for package in set(packages):
+            current = get_rate_card(package)
+            package_rates = [rate for rate in self.rates if rate.get("excursion_package") == package]
+            cards[package] = (current, current.with_changes(package_rates, self.seasons))
+
+        return cards
+
+    def price_column(self, columns, cards, which: int):
+        """Totals, seasons and currencies for every booking against one set of cards"""
+        memo = {}
+        totals, seasons, currencies = [], [], []
+
+        for key in zip(columns["excursion_package"], columns["excursion_date"], columns["residence_type"],
+                       columns["adults"], columns["child_ages"], columns["group_size"]):
+            if key not in memo:
+                package, excursion_date, residence_type, adults, ages, group_size = key
+                card = cards[package][which]
+                pricing = {}
+                if card.config and card.get_season(excursion_date):
+                    pricing = card.price(excursion_date, residence_type, adults, list(ages), group_size)
+
+                memo[key] = (flt(pricing.get("total")), pricing.get("season"),
+                             pricing.get("currency") or RATE_TABLES[residence_type]["currency"])
+
+            total, season, currency = memo[key]
+            totals.append(total)
+            seasons.append(season)
+            currencies.append(currency)
+
+        return totals, seasons, currencies, len(memo)
+
+    def run(self) -> Dict:
+        columns = self.load_columns()
+        cards = self.get_cards(columns["excursion_package"])
+
+        current, columns["season"], columns["currency"], distinct = self.price_column(columns, cards, 0)
+        proposed, proposed_seasons, _currencies, _distinct = self.price_column(columns, cards, 1)
+        delta = [p - c for p, c in zip(proposed, current)]
+        unpriced = sum(1 for season in columns["season"] if not season)
+
+        # Bookings with no current season are grouped by their proposed one
+        columns["season"] = [c or p for c, p in zip(columns["season"], proposed_seasons)]
+
+        result = {
+            "booking_count": len(columns["booking"]),
+            "distinct_price_inputs": distinct,
+            "unpriced_current": unpriced,
+            "totals": self.aggregate(columns["currency"], columns, current, proposed, delta, with_key=False)
+        }
+
+        for output, dimension in SIMULATION_DIMENSIONS.items():
+            result[output] = self.aggregate(columns[dimension], columns, current, proposed, delta)
+
+        return result
+
+    def aggregate(self, keys, columns, current, proposed, delta, with_key=True) -> List[Dict]:
+        """Sum the revenue columns per key and currency, largest change first"""
+        groups = {}
+        for key, currency, c, p, d in zip(keys, columns["currency"], current, proposed, delta):
+            group = groups.get((key, currency))
+            if group is None:
+                group = groups[(key, currency)] = [0, 0.0, 0.0, 0.0]
+            group[0] += 1
+            group[1] += c
+            group[2] += p
+            group[3] += d
+
+        rows = []
+        for (key, currency), (count, c, p, d) in groups.items():
+            row = {"currency": currency, "bookings": count, "current_revenue": c,
+                   "proposed_revenue": p, "revenue_delta": d,
+                   "delta_percentage": (d / c * 100) if c else 0}
+            if with_key:
+                row["key"] = key or _("Not Set")
+            rows.append(row)
+
+        return sorted(rows, key=lambda row: abs(row["revenue_delta"]), reverse=True)
+
+@frappe.whitelist()
+@instrument()
+def simulate_rate_change(rates=None, seasons=None, from_date=None, to_date=None, excursion_package=None):
+    """Revenue impact of proposed rates and season windows on future bookings
+
+    rates: [{"excursion_package", "season", "residence_type", "adult_rate"}]
+    seasons: [{"season", "start_date", "end_date"}]
+    """
+    frappe.only_for(["Safari Manager", "Excursion Manager", "System Manager"])
+
+    try:
+        if isinstance(rates, str):
+            rates = json.loads(rates)
+        if isinstance(seasons, str):
+            seasons = json.loads(seasons)
+
+        simulator = RateChangeSimulator(rates, seasons, from_date, to_date, excursion_package)
+        return {"status": "success", "simulation": simulator.run()}
+
+    except Exception as e:
+        frappe.log_error(f"Rate change simulation error: {str(e)}")
+        return {"status": "error", "message": str(e)}
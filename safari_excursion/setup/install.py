@@ -2,6 +2,7 @@
 
 import frappe
 from frappe import _
+from safari_excursion.utils.resource_calendar import rebuild_resource_calendar
 
 def before_install():
     """Check dependencies before installation"""
@@ -13,6 +14,7 @@ def after_install():
     setup_custom_fields()
     setup_roles_and_permissions()
     setup_notification_templates()
+    rebuild_resource_calendar()
 
 def check_dependencies():
     """Check if required apps are installed"""
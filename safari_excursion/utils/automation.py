@@ -4,6 +4,8 @@ import frappe
 from frappe import _
 from frappe.utils import getdate, add_days, now_datetime, get_datetime, add_to_date
 from safari_excursion.utils.transport_integration import ExcursionTransportAutomation
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.rostering import GuideRoster
 
 def send_pre_excursion_reminders():
     """Send reminders to customers and guides before excursions"""
@@ -411,6 +413,7 @@ def send_weekly_report(report_data, start_date, end_date, managers):
     )
 
 @frappe.whitelist()
+@instrument()
 def get_excursion_dashboard_data():
     """Get dashboard data for excursion management"""
     try:
@@ -464,6 +467,7 @@ def get_excursion_dashboard_data():
         return {"status": "error", "message": str(e)}
 
 @frappe.whitelist()
+@instrument()
 def auto_assign_resources():
     """Automatically assign guides and vehicles based on availability"""
     try:
@@ -482,12 +486,18 @@ def auto_assign_resources():
         
         assignments_made = 0
         
+        # Plan all of tomorrow's guides at once so caps, languages and load are respected;
+        # only these bookings, so drafts and waitlist holds don't take guides from them
+        roster = GuideRoster(tomorrow, days=1,
+                             excursion_bookings=[booking.name for booking in unassigned_bookings]).solve()
+        planned_guides = {row["excursion_booking"]: row["guide"] for row in roster["assignments"]}
+        
         for booking_data in unassigned_bookings:
             booking = frappe.get_doc("Excursion Booking", booking_data.name)
             
             # Auto-assign guide if not assigned
             if not booking.assigned_guide:
-                available_guide = find_available_guide(tomorrow, booking.departure_time)
+                available_guide = planned_guides.get(booking.name)
                 if available_guide:
                     booking.assigned_guide = available_guide
                     assignments_made += 1
@@ -561,6 +571,7 @@ def find_available_vehicle(date, guest_count):
     return None
 
 @frappe.whitelist()
+@instrument()
 def send_mass_reminders():
     """Send reminders to all customers with excursions tomorrow"""
     try:
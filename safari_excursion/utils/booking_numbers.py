@@ -0,0 +1,118 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/booking_numbers.py
+
+import threading
+
+import frappe
+from frappe.utils import cint, getdate
+
+BOOKING_NUMBER_PREFIX = "EXB-{year}-{month:02d}-"
+BOOKING_NUMBER_DIGITS = 5
+DEFAULT_BLOCK_SIZE = 20
+
+def get_block_size():
+    """Numbers reserved per block, site config excursion_booking_number_block"""
+    return max(cint(frappe.conf.get("excursion_booking_number_block")) or DEFAULT_BLOCK_SIZE, 1)
+
+def get_series_prefix(date=None):
+    date = getdate(date)
+    return BOOKING_NUMBER_PREFIX.format(year=date.year, month=date.month)
+
+class BookingNumberAllocator:
+    """
+    Hands out booking numbers from blocks reserved on the naming series
+
+    make_autoname bumps the series row inside the inserting transaction,
+    so every booking insert queues on that row lock until the previous
+    one commits. Here a process reserves a block of numbers on its own
+    short-lived connection, committed at once, and hands them out locally
+    under a thread lock. The visible format and the tabSeries row are the
+    same as make_autoname's. Numbers a process never hands out (restarts,
+    month rollover) or that a failed insert consumed are skipped, and
+    every reservation is logged so such gaps can be accounted for.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.blocks = {}
+
+    def next(self, date=None):
+        prefix = get_series_prefix(date)
+        key = (frappe.local.site, prefix)
+
+        with self.lock:
+            block = self.blocks.get(key)
+            if not block or block[0] > block[1]:
+                self.release_stale(key)
+                block = self.blocks[key] = self.reserve(prefix, get_block_size())
+
+            number = block[0]
+            block[0] += 1
+
+        return f"{prefix}{number:0{BOOKING_NUMBER_DIGITS}d}"
+
+    def reserve(self, prefix, size):
+        """[first, last] of a fresh block, committed on a separate connection"""
+        db = get_reservation_db()
+        try:
+            end = reserve_series_block(db, prefix, size)
+        finally:
+            db.close()
+
+        block = [end - size + 1, end]
+        frappe.logger("safari_excursion.booking_numbers").info(
+            f"Reserved booking numbers {prefix}{block[0]}-{block[1]} on {frappe.local.site}")
+        return block
+
+    def release_stale(self, key):
+        """Log unused numbers of the site's blocks for earlier months, which will never be handed out"""
+        for stale in [k for k in self.blocks if k[0] == key[0] and k != key]:
+            first, last = self.blocks.pop(stale)
+            if first <= last:
+                frappe.logger("safari_excursion.booking_numbers").info(
+                    f"Booking numbers {stale[1]}{first}-{last} on {stale[0]} left unused")
+
+def get_reservation_db():
+    """A connection of its own, so the series row lock ends with the reservation"""
+    from frappe.database import get_db
+
+    db = get_db(
+        socket=frappe.conf.db_socket,
+        host=frappe.conf.db_host,
+        port=frappe.conf.db_port,
+        user=frappe.conf.db_user or frappe.conf.db_name,
+        password=frappe.conf.db_password,
+        cur_db_name=frappe.conf.db_name
+    )
+    db.connect()
+    return db
+
+def reserve_series_block(db, prefix, size):
+    """Advance a naming series by size in one transaction, returning its new current"""
+    # Workers starting a new month race to create its series row, the losers keep the winner's
+    on_duplicate = ("ON CONFLICT (name) DO NOTHING" if frappe.conf.db_type == "postgres"
+                    else "ON DUPLICATE KEY UPDATE name = name")
+    try:
+        db.sql(f"INSERT INTO `tabSeries` (name, current) VALUES (%s, 0) {on_duplicate}", prefix)
+        db.sql("UPDATE `tabSeries` SET current = current + %s WHERE name = %s", (size, prefix))
+        end = cint(db.sql("SELECT current FROM `tabSeries` WHERE name = %s", prefix)[0][0])
+        db.commit()
+        return end
+
+    except Exception:
+        db.rollback()
+        raise
+
+_allocator = BookingNumberAllocator()
+
+def next_booking_number(date=None):
+    """Next booking number, EXB-YYYY-MM-#####, without serialising on the series row
+
+    Falls back to make_autoname if a block can't be reserved.
+    """
+    try:
+        return _allocator.next(date)
+    except Exception as e:
+        frappe.log_error(f"Booking number block reservation error: {str(e)}")
+
+        from frappe.model.naming import make_autoname
+        return make_autoname("EXB-.YYYY.-.MM.-.#####")
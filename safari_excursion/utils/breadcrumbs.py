@@ -0,0 +1,300 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/breadcrumbs.py
+
+import json
+import math
+import pickle
+import struct
+import zlib
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, get_datetime, getdate
+
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.permissions import get_user_guide_name
+
+MANAGER_ROLES = ["Safari Manager", "Excursion Manager", "System Manager"]
+
+# One breadcrumb: epoch seconds, lat/lon in microdegrees, speed in 0.1 km/h
+RECORD = struct.Struct("<IiiH")
+
+BREADCRUMB_KEY = "excursion_breadcrumbs"
+ACTIVE_OPERATIONS_KEY = "excursion_breadcrumb_operations"
+LAST_POSITION_KEY = "excursion_vehicle_positions"
+BREADCRUMB_TTL = 3 * 24 * 3600  # compaction runs daily, this only bounds orphaned keys
+BREADCRUMB_FILE_NAME = "breadcrumbs.bin"
+
+MAX_POINTS_PER_BATCH = 5000
+DEFAULT_TOLERANCE_METERS = 15
+METERS_PER_DEGREE = 111320
+
+def pack_points(points):
+    """Pack validated (ts, lat, lon, speed) points into fixed-width rows"""
+    rows = []
+    for ts, lat, lon, speed in points:
+        rows.append(RECORD.pack(int(ts), int(round(lat * 1e6)), int(round(lon * 1e6)),
+                                min(max(int(round(speed * 10)), 0), 65535)))
+    return b"".join(rows)
+
+def unpack_points(data):
+    """(ts, lat, lon, speed) tuples from packed rows"""
+    return [(ts, lat / 1e6, lon / 1e6, speed / 10) for ts, lat, lon, speed in RECORD.iter_unpack(data)]
+
+def parse_point(point):
+    """(ts, lat, lon, speed) from a [ts, lat, lon, speed] list or dict, or None if invalid"""
+    if isinstance(point, dict):
+        point = [point.get("ts"), point.get("lat"), point.get("lon"), point.get("speed")]
+    if not isinstance(point, (list, tuple)) or len(point) < 3:
+        return None
+
+    ts = point[0]
+    if isinstance(ts, str) and not ts.isdigit():
+        try:
+            ts = get_datetime(ts).timestamp()
+        except (ValueError, TypeError, AttributeError, OverflowError):
+            # An unreadable timestamp rejects the point, not the batch
+            return None
+    ts, lat, lon = cint(flt(ts)), flt(point[1]), flt(point[2])
+    speed = flt(point[3]) if len(point) > 3 else 0
+
+    if ts <= 0 or not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat == 0 and lon == 0):
+        return None
+
+    return ts, lat, lon, speed
+
+def simplify_track(points, tolerance_meters=DEFAULT_TOLERANCE_METERS):
+    """Douglas-Peucker simplification of a time-ordered track
+
+    Distances use an equirectangular projection around the track, which
+    is accurate to well under a meter over excursion distances.
+    """
+    if len(points) < 3 or tolerance_meters <= 0:
+        return list(points)
+
+    lng_scale = math.cos(math.radians(points[0][1])) * METERS_PER_DEGREE
+    xy = [(p[2] * lng_scale, p[1] * METERS_PER_DEGREE) for p in points]
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+
+    # Iterative so long tracks can't hit the recursion limit
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = xy[first], xy[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+
+        farthest, max_distance = None, tolerance_meters
+        for i in range(first + 1, last):
+            x, y = xy[i]
+            if length:
+                distance = abs(dy * x - dx * y + x2 * y1 - y2 * x1) / length
+            else:
+                distance = math.hypot(x - x1, y - y1)
+            if distance > max_distance:
+                farthest, max_distance = i, distance
+
+        if farthest is not None:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+class BreadcrumbStore:
+    """
+    Append-only GPS breadcrumbs per excursion operation
+
+    Each ingest batch is packed into fixed-width binary rows and appended
+    to a Redis list for its operation with one pipelined round trip, so
+    the fleet's points never become documents. Once an operation's day
+    is over, compaction merges its rows, sorted and de-duplicated, into
+    one compressed private file attached to the operation.
+    """
+
+    def __init__(self):
+        self.cache = frappe.cache()
+
+    def get_key(self, excursion_operation):
+        return self.cache.make_key(f"{BREADCRUMB_KEY}:{excursion_operation}")
+
+    def append(self, points_by_operation):
+        """Append parsed points per operation in one pipeline"""
+        pipe = self.cache.pipeline()
+        active_key = self.cache.make_key(ACTIVE_OPERATIONS_KEY)
+        positions_key = self.cache.make_key(LAST_POSITION_KEY)
+
+        for excursion_operation, points in points_by_operation.items():
+            if not points:
+                continue
+
+            key = self.get_key(excursion_operation)
+            pipe.rpush(key, pack_points(points))
+            pipe.expire(key, BREADCRUMB_TTL)
+            pipe.sadd(active_key, excursion_operation)
+
+            ts, lat, lon, speed = max(points)
+            # Pickled like RedisWrapper.hset so hgetall can read it back
+            pipe.hset(positions_key, excursion_operation,
+                      pickle.dumps({"ts": ts, "lat": lat, "lon": lon, "speed": speed}))
+
+        pipe.execute()
+
+    def read_batches(self, excursion_operation):
+        return self.cache.lrange(f"{BREADCRUMB_KEY}:{excursion_operation}", 0, -1) or []
+
+    def read_live(self, excursion_operation):
+        return b"".join(self.read_batches(excursion_operation))
+
+    def read(self, excursion_operation):
+        """All points for an operation, compacted and live, in time order"""
+        data = self.read_compacted(excursion_operation) + self.read_live(excursion_operation)
+        return sorted(set(unpack_points(data)))
+
+    def get_file(self, excursion_operation):
+        return frappe.db.get_value("File", {
+            "attached_to_doctype": "Excursion Operation",
+            "attached_to_name": excursion_operation,
+            "file_name": BREADCRUMB_FILE_NAME
+        })
+
+    def read_compacted(self, excursion_operation):
+        file_name = self.get_file(excursion_operation)
+        if not file_name:
+            return b""
+        return zlib.decompress(frappe.get_doc("File", file_name).get_content())
+
+    def compact(self, excursion_operation):
+        """Merge live rows into the operation's breadcrumb file and drop them from Redis"""
+        batches = self.read_batches(excursion_operation)
+        live = b"".join(batches)
+        if live:
+            points = sorted(set(unpack_points(self.read_compacted(excursion_operation) + live)))
+
+            existing = self.get_file(excursion_operation)
+            if existing:
+                frappe.delete_doc("File", existing, ignore_permissions=True)
+
+            if frappe.db.exists("Excursion Operation", excursion_operation):
+                frappe.get_doc({
+                    "doctype": "File",
+                    "file_name": BREADCRUMB_FILE_NAME,
+                    "attached_to_doctype": "Excursion Operation",
+                    "attached_to_name": excursion_operation,
+                    "is_private": 1,
+                    "content": zlib.compress(pack_points(points))
+                }).insert(ignore_permissions=True)
+
+        frappe.db.after_commit.add(lambda: self.drop_live(excursion_operation, len(batches)))
+
+    def drop_live(self, excursion_operation, batch_count):
+        """Remove compacted batches, keeping any that arrived meanwhile"""
+        key = f"{BREADCRUMB_KEY}:{excursion_operation}"
+        self.cache.ltrim(key, batch_count, -1)
+        if not self.cache.llen(key):
+            self.cache.srem(ACTIVE_OPERATIONS_KEY, excursion_operation)
+            self.cache.hdel(LAST_POSITION_KEY, excursion_operation)
+
+    def get_active_operations(self):
+        return [frappe.safe_decode(name) for name in self.cache.smembers(ACTIVE_OPERATIONS_KEY) or []]
+
+    def get_last_positions(self):
+        """Latest position of every operation currently reporting"""
+        positions = self.cache.hgetall(LAST_POSITION_KEY) or {}
+        return {frappe.safe_decode(name): value for name, value in positions.items()}
+
+def get_ingest_operations(operations):
+    """Operations the current user may post breadcrumbs for"""
+    rows = frappe.get_all("Excursion Operation", filters={"name": ["in", list(operations)], "docstatus": ["<", 2]},
+                          fields=["name", "assigned_guide"])
+
+    if set(MANAGER_ROLES) & set(frappe.get_roles()):
+        return {row.name for row in rows}
+
+    guide = get_user_guide_name()
+    return {row.name for row in rows if guide and row.assigned_guide == guide}
+
+def compact_breadcrumbs():
+    """Daily job: move breadcrumbs of finished operations into files"""
+    store = BreadcrumbStore()
+    active = store.get_active_operations()
+    if not active:
+        return
+
+    dates = dict(frappe.get_all("Excursion Operation", filters={"name": ["in", active]},
+                                fields=["name", "operation_date"], as_list=True))
+    today = getdate()
+
+    for excursion_operation in active:
+        operation_date = dates.get(excursion_operation)
+        if operation_date and getdate(operation_date) >= today:
+            continue
+
+        try:
+            store.compact(excursion_operation)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Breadcrumb compaction error for {excursion_operation}: {str(e)}")
+
+@frappe.whitelist()
+@instrument()
+def ingest_breadcrumbs(points, excursion_operation=None):
+    """Append a batch of GPS points
+
+    points: [[ts, lat, lon, speed], ...] for excursion_operation, or
+    {operation: [[ts, lat, lon, speed], ...]} to post for several at once.
+    """
+    try:
+        if isinstance(points, str):
+            points = json.loads(points)
+        if not isinstance(points, dict):
+            points = {excursion_operation: points}
+
+        if sum(len(batch or []) for batch in points.values()) > MAX_POINTS_PER_BATCH:
+            frappe.throw(_("At most {0} points can be posted per batch").format(MAX_POINTS_PER_BATCH))
+
+        allowed = get_ingest_operations(points)
+        accepted, rejected = {}, 0
+        for operation, batch in points.items():
+            parsed = [parse_point(point) for point in batch or []]
+            valid = [point for point in parsed if point]
+            rejected += len(parsed) - len(valid)
+
+            if operation in allowed:
+                accepted[operation] = valid
+            else:
+                rejected += len(valid)
+
+        BreadcrumbStore().append(accepted)
+
+        return {
+            "status": "success",
+            "accepted": sum(len(batch) for batch in accepted.values()),
+            "rejected": rejected
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Breadcrumb ingest error: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+@frappe.whitelist()
+@instrument()
+def get_operation_track(excursion_operation, tolerance_meters=DEFAULT_TOLERANCE_METERS):
+    """Simplified track of an operation for display"""
+    try:
+        frappe.has_permission("Excursion Operation", "read", excursion_operation, throw=True)
+
+        points = BreadcrumbStore().read(excursion_operation)
+        track = simplify_track(points, flt(tolerance_meters))
+
+        return {
+            "status": "success",
+            "point_count": len(points),
+            "track": [list(point) for point in track]
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Operation track error: {str(e)}")
+        return {"status": "error", "message": str(e)}
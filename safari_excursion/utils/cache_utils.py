@@ -0,0 +1,81 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/cache_utils.py
+
+import frappe
+
+CACHE_VERSION_KEY = "excursion_cache_version"
+
+def get_cache_version(name):
+    """Current version of a worker-level cache, read from Redis once per request
+
+    Worker processes keep compiled structures (indexes, rate cards) in
+    module globals and rebuild them when this version changes.
+    """
+    versions = getattr(frappe.local, "excursion_cache_versions", None)
+    if versions is None:
+        versions = frappe.local.excursion_cache_versions = {}
+
+    if name not in versions:
+        versions[name] = frappe.cache().get_value(f"{CACHE_VERSION_KEY}:{name}")
+
+    return versions[name]
+
+def bump_cache_version(name):
+    """Invalidate a worker-level cache on every worker
+
+    Other workers see the new version once the transaction commits, so
+    they never rebuild from data that could still be rolled back.
+    """
+    version = frappe.generate_hash(length=12)
+
+    def publish():
+        frappe.cache().set_value(f"{CACHE_VERSION_KEY}:{name}", version)
+
+    if getattr(frappe.local, "db", None) and hasattr(frappe.db, "after_commit"):
+        frappe.db.after_commit.add(publish)
+    else:
+        publish()
+
+    versions = getattr(frappe.local, "excursion_cache_versions", None)
+    if versions is not None:
+        versions[name] = version
+
+    return version
+
+class WorkerCache:
+    """
+    Per-process holder for compiled structures tied to a cache version
+
+    The builder is called with the arguments passed to get(), so one
+    cache can hold a structure per key (e.g. a rate card per package).
+
+    Usage:
+        _index = WorkerCache("gazetteer", build_index)
+        index = _index.get()
+    """
+
+    def __init__(self, name, builder, max_entries=512):
+        self.name = name
+        self.builder = builder
+        self.max_entries = max_entries
+        self.entries = {}
+
+    def get(self, *args):
+        # Keyed by site so multi-tenant workers don't share structures
+        site = frappe.local.site
+        version = get_cache_version(self.name)
+        cached = self.entries.get(site)
+
+        if cached is None or cached[0] != version:
+            cached = (version, {})
+            self.entries[site] = cached
+
+        values = cached[1]
+        if args not in values:
+            if len(values) >= self.max_entries:
+                values.clear()
+            values[args] = self.builder(*args)
+
+        return values[args]
+
+    def invalidate(self):
+        bump_cache_version(self.name)
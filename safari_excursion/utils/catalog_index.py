@@ -0,0 +1,316 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/catalog_index.py
+
+import json
+import pickle
+from bisect import bisect_left, bisect_right
+
+import frappe
+from frappe.utils import cint, flt
+
+from safari_excursion.utils.cache_utils import WorkerCache, bump_cache_version
+from safari_excursion.utils.instrumentation import instrument
+
+CATALOG_CACHE = "catalog_index"
+CATALOG_RECORDS_KEY = "excursion_catalog_records"
+CATALOG_LOADED_KEY = "excursion_catalog_loaded"
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Upper bounds (international adult "from" rate) of the price band facet, in PRICE_CURRENCY
+PRICE_CURRENCY = "USD"
+PRICE_BANDS = [(50, "Under 50"), (100, "50 - 100"), (200, "100 - 200"), (500, "200 - 500"), (None, "500+")]
+
+# Facet name: child table the values come from, or None for a package field
+FACET_TABLES = {
+    "category": None,
+    "fitness_level": None,
+    "price_band": None,
+    "weekday": ("Excursion Available Day", "day"),
+    "tags": ("Excursion Tag", "tag_name"),
+    "operating_areas": ("Excursion Operating Area", "area_name"),
+    "destinations": ("Excursion Destination", "location_name")
+}
+RANGE_FIELDS = ["duration_hours", "minimum_age", "maximum_age", "from_price"]
+CARD_FIELDS = ["package_name", "package_code", "excursion_category", "featured_image", "duration_hours",
+               "fitness_level", "is_featured"]
+
+def get_price_band(price):
+    if not price:
+        return None
+    for upper, label in PRICE_BANDS:
+        if upper is None or price < upper:
+            return label
+
+def make_record(package, children, from_price, currency=PRICE_CURRENCY):
+    """Facet values, range values and card fields of one published package
+
+    Price bands and the price range filter are in PRICE_CURRENCY, so a
+    from price in another currency only shows on the card.
+    """
+    comparable_price = from_price if currency == PRICE_CURRENCY else None
+    available_days = [row.day for row in children.get("weekday", []) if cint(row.is_available)]
+
+    return {
+        "name": package.name,
+        "facets": {
+            "category": [package.excursion_category] if package.excursion_category else [],
+            "fitness_level": [package.fitness_level] if package.fitness_level else [],
+            "price_band": [get_price_band(comparable_price)] if comparable_price else [],
+            # A package without day rows runs every day
+            "weekday": available_days or ([] if children.get("weekday") else WEEKDAYS),
+            "tags": [row.tag_name for row in children.get("tags", []) if row.tag_name],
+            "operating_areas": [row.area_name for row in children.get("operating_areas", []) if row.area_name],
+            "destinations": [row.location_name for row in children.get("destinations", []) if row.location_name]
+        },
+        "ranges": {
+            "duration_hours": flt(package.duration_hours),
+            "minimum_age": cint(package.minimum_age),
+            "maximum_age": cint(package.maximum_age) or None,
+            "from_price": comparable_price or None
+        },
+        "card": {
+            **{field: package.get(field) for field in CARD_FIELDS},
+            "name": package.name,
+            "from_price": from_price or None,
+            "currency": currency
+        }
+    }
+
+def get_from_prices(packages):
+    """(rate, currency) of each package's lowest international adult rate, the "from" price shown in listings"""
+    if not packages:
+        return {}
+
+    from_prices = {}
+    for package, rate, currency in frappe.db.sql(f"""
+        SELECT excursion_package, adult_rate, COALESCE(currency, '{PRICE_CURRENCY}')
+        FROM `tabExcursion International Per Person Rate`
+        WHERE excursion_package IN %(packages)s AND adult_rate > 0
+        ORDER BY adult_rate
+    """, {"packages": list(packages)}):
+        # Ordered by rate, so the first row of a package is its lowest, with that row's currency
+        from_prices.setdefault(package, (flt(rate), currency))
+
+    return from_prices
+
+def load_records(names=None):
+    """Catalog records of published packages, with set-based child and rate queries"""
+    filters = {"is_published": 1, "package_status": "Active"}
+    if names is not None:
+        filters["name"] = ["in", list(names)]
+
+    packages = frappe.get_all(
+        "Excursion Package", filters=filters,
+        fields=["name", "package_name", "package_code", "excursion_category", "featured_image", "duration_hours",
+                "fitness_level", "is_featured", "minimum_age", "maximum_age"]
+    )
+    if not packages:
+        return {}
+
+    parents = [package.name for package in packages]
+    children = {}
+    for facet, table in FACET_TABLES.items():
+        if not table:
+            continue
+        for row in frappe.get_all(table[0], filters={"parent": ["in", parents], "parenttype": "Excursion Package"},
+                                  fields=["parent", table[1], "is_available"] if facet == "weekday" else
+                                  ["parent", table[1]]):
+            children.setdefault(row.parent, {}).setdefault(facet, []).append(row)
+
+    from_prices = get_from_prices(parents)
+
+    return {
+        package.name: make_record(package, children.get(package.name, {}),
+                                  *from_prices.get(package.name, (0, PRICE_CURRENCY)))
+        for package in packages
+    }
+
+class CatalogIndex:
+    """
+    Inverted index over published excursion packages for faceted search
+
+    Packages get dense ids in display order (featured first, then by
+    name). Every facet value has a posting bitset, a Python int with bit
+    i set for package i, so filters are ORs within a facet and ANDs across
+    facets, and counts are popcounts. Numeric fields are sorted
+    (value, id) arrays bisected for ranges. Built from the records kept
+    in Redis, so a worker rebuild does no database work.
+    """
+
+    def __init__(self, records):
+        ordered = sorted(records.values(),
+                         key=lambda r: (not r["card"].get("is_featured"), r["card"].get("package_name") or r["name"]))
+
+        self.cards = [record["card"] for record in ordered]
+        self.all = (1 << len(ordered)) - 1
+        self.postings = {facet: {} for facet in FACET_TABLES}
+        self.ranges = {}
+        self.with_value = {}
+
+        for doc_id, record in enumerate(ordered):
+            bit = 1 << doc_id
+            for facet, values in record["facets"].items():
+                postings = self.postings.setdefault(facet, {})
+                for value in set(values):
+                    postings[value] = postings.get(value, 0) | bit
+
+        for field in RANGE_FIELDS:
+            pairs = sorted((record["ranges"][field], doc_id) for doc_id, record in enumerate(ordered)
+                           if record["ranges"].get(field) is not None)
+            self.ranges[field] = ([value for value, _id in pairs], [doc_id for _value, doc_id in pairs])
+            self.with_value[field] = self.to_bits(doc_id for _value, doc_id in pairs)
+
+    @staticmethod
+    def to_bits(doc_ids):
+        bits = 0
+        for doc_id in doc_ids:
+            bits |= 1 << doc_id
+        return bits
+
+    def range_bits(self, field, low=None, high=None, missing=False):
+        """Bitset of packages with low <= field <= high; missing=True also matches packages without a value"""
+        values, ids = self.ranges[field]
+        start = bisect_left(values, flt(low)) if low not in (None, "") else 0
+        end = bisect_right(values, flt(high)) if high not in (None, "") else len(values)
+
+        bits = self.to_bits(ids[start:end])
+        if missing:
+            bits |= self.all & ~self.with_value[field]
+        return bits
+
+    def facet_bits(self, facet, values):
+        postings = self.postings.get(facet, {})
+        bits = 0
+        for value in values:
+            bits |= postings.get(value, 0)
+        return bits
+
+    def search(self, filters=None, start=0, page_length=20):
+        """Matching package cards and facet counts
+
+        filters: facet name -> list of values (any may match), plus
+        min_duration/max_duration, min_price/max_price and age.
+        Each facet's counts apply every filter but its own, so the
+        values shown can widen the current selection.
+        """
+        filters = filters or {}
+
+        facet_filters = {facet: self.facet_bits(facet, values if isinstance(values, list) else [values])
+                         for facet, values in filters.items() if facet in self.postings and values}
+
+        base = self.all
+        if filters.get("min_duration") is not None or filters.get("max_duration") is not None:
+            base &= self.range_bits("duration_hours", filters.get("min_duration"), filters.get("max_duration"))
+        if filters.get("min_price") is not None or filters.get("max_price") is not None:
+            base &= self.range_bits("from_price", filters.get("min_price"), filters.get("max_price"))
+        if filters.get("age") is not None:
+            age = cint(filters["age"])
+            base &= self.range_bits("minimum_age", high=age)
+            base &= self.range_bits("maximum_age", low=age, missing=True)
+
+        matches = base
+        for bits in facet_filters.values():
+            matches &= bits
+
+        counts = {}
+        for facet, postings in self.postings.items():
+            scope = base
+            for other, bits in facet_filters.items():
+                if other != facet:
+                    scope &= bits
+            counts[facet] = {value: (bits & scope).bit_count() for value, bits in postings.items()
+                             if bits & scope}
+
+        return {
+            "total": matches.bit_count(),
+            "packages": self.page(matches, cint(start), cint(page_length)),
+            "facets": counts
+        }
+
+    def page(self, bits, start, page_length):
+        """Cards of the set bits from position start on, lowest id (display order) first"""
+        cards, position = [], 0
+        while bits and len(cards) < page_length:
+            lowest = bits & -bits
+            if position >= start:
+                cards.append(self.cards[lowest.bit_length() - 1])
+            bits ^= lowest
+            position += 1
+        return cards
+
+def get_stored_records():
+    """Catalog records from Redis, loading them from the database on first use"""
+    cache = frappe.cache()
+    if not cache.get_value(CATALOG_LOADED_KEY):
+        return store_records(load_records(), replace=True)
+
+    return {
+        (name.decode() if isinstance(name, bytes) else name): record
+        for name, record in (cache.hgetall(CATALOG_RECORDS_KEY) or {}).items()
+    }
+
+def store_records(records, removed=(), replace=False):
+    cache = frappe.cache()
+    key = cache.make_key(CATALOG_RECORDS_KEY)
+
+    pipe = cache.pipeline()
+    if replace:
+        pipe.delete(key)
+    for name, record in records.items():
+        # Pickled like RedisWrapper.hset so hgetall can read it back
+        pipe.hset(key, name, pickle.dumps(record))
+    for name in removed:
+        pipe.hdel(key, name)
+    pipe.execute()
+
+    if replace:
+        cache.set_value(CATALOG_LOADED_KEY, 1)
+    return records
+
+_catalog_index = WorkerCache(CATALOG_CACHE, lambda: CatalogIndex(get_stored_records()))
+
+def get_catalog_index():
+    return _catalog_index.get()
+
+def reindex_packages(names):
+    """Rewrite the stored records of some packages once the transaction commits"""
+    names = [name for name in names if name]
+    if not names:
+        return
+
+    def update():
+        if not frappe.cache().get_value(CATALOG_LOADED_KEY):
+            # Nothing stored yet, the first search loads everything
+            return
+        records = load_records(names)
+        store_records(records, removed=[name for name in names if name not in records])
+        bump_cache_version(CATALOG_CACHE)
+
+    frappe.db.after_commit.add(update)
+
+def on_package_change(doc, method=None):
+    """Document hook: reindex a saved or deleted package"""
+    reindex_packages([doc.name])
+
+def on_rate_configuration_change(doc, method=None):
+    """Document hook: a package's from price follows its rate configuration"""
+    reindex_packages([doc.excursion_package])
+
+def rebuild_catalog_index():
+    """Reload every record from the database, e.g. after a migration"""
+    store_records(load_records(), replace=True)
+    bump_cache_version(CATALOG_CACHE)
+
+@frappe.whitelist(allow_guest=True)
+@instrument()
+def search_packages(filters=None, start=0, page_length=20):
+    """Faceted search over published packages for the website and agent portal"""
+    try:
+        if isinstance(filters, str):
+            filters = json.loads(filters)
+
+        return {"status": "success", **get_catalog_index().search(filters, start, min(cint(page_length) or 20, 100))}
+
+    except Exception as e:
+        frappe.log_error(f"Catalog search error: {str(e)}")
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,402 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/departure_changes.py
+
+from datetime import datetime, time, timedelta
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, get_datetime, getdate, now_datetime
+
+from safari_excursion.utils.dispatch_board import queue_board_refresh
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.resource_calendar import sync_documents
+from safari_excursion.utils.travel_time import to_minutes
+from safari_excursion.utils.waitlist import get_departure_capacity, get_departure_time_key, get_seats_taken
+
+MANAGER_ROLES = ["Safari Manager", "Excursion Manager", "System Manager"]
+
+DEPARTURE_CHANGE_EVENT = "excursion_departure_change"
+DEPARTURE_CHANGE_KEY = "excursion_departure_change"
+DEPARTURE_CHANGE_TTL = 7 * 24 * 60 * 60
+CHUNK_SIZE = 25
+
+BOOKING_FIELDS = ["name", "docstatus", "booking_number", "excursion_date", "departure_time", "pickup_time",
+                  "estimated_return_time", "total_guests", "payment_status", "total_amount", "deposit_amount",
+                  "transport_booking", "park_booking", "excursion_operation"]
+
+def to_time(minutes):
+    return str(timedelta(minutes=minutes % (24 * 60)))
+
+def get_departure_datetime(excursion_date, departure_time):
+    minutes = to_minutes(departure_time) or 0
+    return datetime.combine(getdate(excursion_date), time()) + timedelta(minutes=minutes)
+
+def get_paid_amount(booking):
+    """What the customer has paid so far, the ceiling for any refund"""
+    if booking.payment_status == "Paid":
+        return flt(booking.total_amount)
+    if booking.payment_status == "Partially Paid":
+        return flt(booking.deposit_amount)
+    return 0
+
+class RefundCalculator:
+    """
+    Cancellation charges and refunds under the Excursion Settings rules
+
+    Inside the free cancellation window, or when charges are waived, the
+    whole paid amount is refunded. Later cancellations are charged the
+    cancellation percentage of the booking total, kept out of what was
+    paid.
+    """
+
+    def __init__(self, cancelled_at, waive_charges=False):
+        settings = frappe.get_cached_doc("Excursion Settings")
+        self.cancelled_at = get_datetime(cancelled_at)
+        self.waive_charges = waive_charges
+        self.free_hours = flt(settings.free_cancellation_hours)
+        self.charge_percentage = flt(settings.cancellation_charge_percentage)
+
+    def calculate(self, booking):
+        """(cancellation_charges, refund_amount) for a booking"""
+        departure = get_departure_datetime(booking.excursion_date, booking.departure_time)
+        hours_before = (departure - self.cancelled_at).total_seconds() / 3600
+
+        charges = 0
+        if not self.waive_charges and hours_before < self.free_hours:
+            charges = flt(booking.total_amount) * self.charge_percentage / 100
+
+        paid = get_paid_amount(booking)
+        return flt(min(charges, paid), 2), flt(max(paid - charges, 0), 2)
+
+class DepartureChange:
+    """
+    Cancel or move every booking of a package departure at once
+
+    The bookings' own status, refund and date columns are written with a
+    handful of set-based updates in the request, as are the resource
+    calendar and dispatch board. What each booking's on_cancel would do
+    one by one (transport, park booking, operation and emails) runs in
+    chunked background jobs that report progress as they go.
+    """
+
+    def __init__(self, excursion_package, excursion_date, departure_time=None):
+        self.excursion_package = excursion_package
+        self.excursion_date = getdate(excursion_date)
+        self.departure_time = departure_time
+        self.job_id = frappe.generate_hash(length=10)
+
+    def get_bookings(self):
+        """Live bookings of the departure, locked against concurrent edits"""
+        filters = {
+            "excursion_package": self.excursion_package,
+            "excursion_date": self.excursion_date,
+            "docstatus": ["<", 2],
+            "booking_status": ["not in", ["Cancelled", "Completed"]]
+        }
+        if self.departure_time:
+            filters["departure_time"] = self.departure_time
+
+        return frappe.get_all("Excursion Booking", filters=filters, fields=BOOKING_FIELDS, for_update=True)
+
+    def cancel(self, reason, waive_charges=None):
+        """Cancel the departure, charges waived by default for weather dependent packages"""
+        bookings = self.get_bookings()
+        if not bookings:
+            return self.summary("cancel", [])
+
+        if waive_charges is None:
+            waive_charges = frappe.db.get_value("Excursion Package", self.excursion_package, "weather_dependent")
+
+        cancelled_at = now_datetime()
+        calculator = RefundCalculator(cancelled_at, cint(waive_charges))
+
+        updates = {}
+        for booking in bookings:
+            charges, refund = calculator.calculate(booking)
+            updates[booking.name] = {
+                "docstatus": 2 if booking.docstatus == 1 else 0,
+                "booking_status": "Cancelled",
+                "cancellation_date": cancelled_at,
+                "cancellation_reason": reason,
+                "cancellation_charges": charges,
+                "refund_amount": refund,
+                "refund_status": "Pending" if refund else None
+            }
+            booking.update(updates[booking.name])
+
+        names = list(updates)
+        frappe.db.bulk_update("Excursion Booking", updates)
+        self.cancel_child_rows([booking.name for booking in bookings if booking.docstatus == 2])
+
+        sync_documents("Excursion Booking", names)
+        for name in names:
+            queue_board_refresh(name, self.excursion_date)
+
+        submitted = [booking.name for booking in bookings if booking.docstatus == 2]
+        self.enqueue(submitted, action="cancel")
+        return self.summary("cancel", bookings, submitted,
+                            refund_amount=sum(flt(update["refund_amount"]) for update in updates.values()))
+
+    def cancel_child_rows(self, names):
+        """Child rows follow their parent's docstatus, as Document.cancel would set them"""
+        if not names:
+            return
+
+        for table_field in frappe.get_meta("Excursion Booking").get_table_fields():
+            frappe.db.set_value(table_field.options, {
+                "parent": ["in", names],
+                "parenttype": "Excursion Booking",
+                "parentfield": table_field.fieldname
+            }, "docstatus", 2, update_modified=False)
+
+    def reschedule(self, new_date, new_departure_time=None, reason=None):
+        """Move the departure, shifting pickup and return times along with the departure time"""
+        new_date = getdate(new_date)
+        if new_date < getdate():
+            frappe.throw(_("Cannot move a departure into the past"))
+
+        bookings = self.get_bookings()
+        if not bookings:
+            return self.summary("reschedule", [])
+
+        self.check_capacity(bookings, new_date, new_departure_time)
+
+        updates, transport_updates, operations = {}, {}, []
+        for booking in bookings:
+            departure_time = new_departure_time or booking.departure_time
+            values = {"excursion_date": new_date, "departure_time": departure_time}
+
+            if new_departure_time:
+                shift = (to_minutes(new_departure_time) or 0) - (to_minutes(booking.departure_time) or 0)
+                for field in ("pickup_time", "estimated_return_time"):
+                    minutes = to_minutes(booking.get(field))
+                    if minutes is not None:
+                        values[field] = to_time(minutes + shift)
+
+            updates[booking.name] = values
+            if booking.transport_booking:
+                transport_updates[booking.transport_booking] = {
+                    "pickup_date": new_date,
+                    "pickup_time": values.get("pickup_time", booking.pickup_time)
+                }
+            if booking.excursion_operation:
+                operations.append(booking.excursion_operation)
+
+        frappe.db.bulk_update("Excursion Booking", updates)
+        if transport_updates:
+            frappe.db.bulk_update("Transport Booking", transport_updates)
+        if operations:
+            operation_values = {"operation_date": new_date}
+            if new_departure_time:
+                operation_values["departure_time"] = new_departure_time
+            frappe.db.set_value("Excursion Operation", {"name": ["in", operations]}, operation_values)
+
+        names = list(updates)
+        sync_documents("Excursion Booking", names)
+        sync_documents("Transport Booking", list(transport_updates))
+        for name in names:
+            queue_board_refresh(name, self.excursion_date, new_date)
+
+        submitted = [booking.name for booking in bookings if booking.docstatus == 1]
+        self.enqueue(submitted, action="reschedule", previous_date=str(self.excursion_date), reason=reason)
+        return self.summary("reschedule", bookings, submitted, new_date=str(new_date))
+
+    def check_capacity(self, bookings, new_date, new_departure_time=None):
+        """Refuse a move that would overbook the departures it lands on"""
+        incoming = {}
+        for booking in bookings:
+            departure_time = get_departure_time_key(new_departure_time or booking.departure_time)
+            if new_date == getdate(booking.excursion_date) and \
+                    departure_time == get_departure_time_key(booking.departure_time):
+                # Already counted where it is
+                continue
+            incoming[departure_time] = incoming.get(departure_time, 0) + cint(booking.total_guests)
+
+        for departure_time, guests in incoming.items():
+            capacity = get_departure_capacity(self.excursion_package, departure_time)
+            free_seats = capacity - get_seats_taken(self.excursion_package, new_date, departure_time)
+            if capacity and guests > free_seats:
+                frappe.throw(_("The {0} departure on {1} has {2} free seats, {3} guests would be moved to it").format(
+                    departure_time, new_date, max(free_seats, 0), guests))
+
+    def enqueue(self, names, action, **kwargs):
+        """Queue the per-booking follow-up work in chunks, once the updates commit"""
+        chunks = [names[i:i + CHUNK_SIZE] for i in range(0, len(names), CHUNK_SIZE)]
+        DepartureChangeProgress(self.job_id).start({
+            "action": action,
+            "excursion_package": self.excursion_package,
+            "excursion_date": str(self.excursion_date),
+            "departure_time": str(self.departure_time or ""),
+            "total": len(names),
+            "chunks": len(chunks),
+            "user": frappe.session.user
+        })
+
+        for chunk in chunks:
+            frappe.enqueue(
+                "safari_excursion.utils.departure_changes.process_departure_chunk",
+                queue="long",
+                enqueue_after_commit=True,
+                # Not job_id, which frappe.enqueue takes as the RQ job id; chunks get their own
+                change_id=self.job_id,
+                action=action,
+                excursion_bookings=chunk,
+                **kwargs
+            )
+
+    def summary(self, action, bookings, submitted=None, **extra):
+        return {
+            "job_id": self.job_id if submitted else None,
+            "action": action,
+            "bookings": len(bookings),
+            "queued": len(submitted or []),
+            **extra
+        }
+
+class DepartureChangeProgress:
+    """
+    Progress of a departure change across its background chunks
+
+    Counters live in Redis so chunks running on different workers add up
+    without touching the database, and every finished chunk is pushed to
+    the user who started the change.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.cache = frappe.cache()
+        self.key = f"{DEPARTURE_CHANGE_KEY}:{job_id}"
+
+    def start(self, meta):
+        self.cache.set_value(self.key, meta, expires_in_sec=DEPARTURE_CHANGE_TTL)
+
+    def advance(self, done, failed):
+        """Add a finished chunk's counts and publish the new totals"""
+        pipe = self.cache.pipeline()
+        pipe.incrby(self.cache.make_key(f"{self.key}:done"), done)
+        pipe.incrby(self.cache.make_key(f"{self.key}:failed"), failed)
+        pipe.expire(self.cache.make_key(f"{self.key}:done"), DEPARTURE_CHANGE_TTL)
+        pipe.expire(self.cache.make_key(f"{self.key}:failed"), DEPARTURE_CHANGE_TTL)
+        pipe.execute()
+
+        status = self.get()
+        if status and status.get("user"):
+            frappe.publish_realtime(DEPARTURE_CHANGE_EVENT, status, user=status["user"])
+        return status
+
+    def get(self):
+        meta = self.cache.get_value(self.key)
+        if not meta:
+            return None
+
+        done = cint(self.cache.get(self.cache.make_key(f"{self.key}:done")))
+        failed = cint(self.cache.get(self.cache.make_key(f"{self.key}:failed")))
+        total = cint(meta.get("total"))
+        return {
+            **meta,
+            "job_id": self.job_id,
+            "done": done,
+            "failed": failed,
+            "progress": round((done + failed) * 100 / total, 1) if total else 100,
+            "finished": done + failed >= total
+        }
+
+def cancel_linked_documents(doc):
+    """What ExcursionBooking.on_cancel and its hooks do for one booking"""
+    from safari_excursion.utils.parks_integration import cancel_excursion_park_booking
+    from safari_excursion.utils.transport_integration import cancel_excursion_transport
+
+    cancel_excursion_transport(doc, "on_cancel")
+    cancel_excursion_park_booking(doc, "on_cancel")
+
+    if doc.excursion_operation:
+        operation_doc = frappe.get_doc("Excursion Operation", doc.excursion_operation)
+        if operation_doc.docstatus == 1:
+            operation_doc.cancel()
+
+    doc.send_cancellation_notifications()
+
+def move_linked_documents(doc, previous_date, reason=None):
+    """Follow a moved booking with its park booking and tell the customer"""
+    from safari_excursion.utils.notifications import send_reschedule_notification
+    from safari_excursion.utils.parks_integration import ExcursionParkFeeCalculator
+    from safari_excursion.utils.park_permits import (ParkPermitConsolidator, is_consolidation_enabled,
+                                                    remove_booking_from_permits)
+
+    if doc.park_booking:
+        if frappe.db.exists("Excursion Park Permit Entry", {"excursion_booking": doc.name}):
+            remove_booking_from_permits(doc.name)
+            if is_consolidation_enabled():
+                park_bookings = ParkPermitConsolidator(doc, ExcursionParkFeeCalculator(doc)).add_booking()
+                doc.db_set("park_booking", park_bookings[0] if park_bookings else None, update_modified=False)
+        elif cint(frappe.db.get_value("Park Booking", doc.park_booking, "docstatus")) < 2:
+            frappe.db.set_value("Park Booking", doc.park_booking, "visit_date", doc.excursion_date)
+
+    send_reschedule_notification(doc, previous_date, reason)
+
+def process_departure_chunk(change_id, action, excursion_bookings, previous_date=None, reason=None):
+    """Background job: follow-up work for one chunk of a departure change"""
+    done = failed = 0
+    for name in excursion_bookings:
+        frappe.db.savepoint("departure_change")
+        try:
+            doc = frappe.get_doc("Excursion Booking", name)
+            if action == "cancel":
+                cancel_linked_documents(doc)
+            else:
+                move_linked_documents(doc, previous_date, reason)
+            done += 1
+        except Exception as e:
+            frappe.db.rollback(save_point="departure_change")
+            frappe.log_error(f"Departure change error for {name}: {str(e)}")
+            failed += 1
+
+    frappe.db.commit()
+    DepartureChangeProgress(change_id).advance(done, failed)
+
+@frappe.whitelist()
+@instrument()
+def cancel_departure(excursion_package, excursion_date, departure_time=None, reason=None, waive_charges=None):
+    """Cancel every booking of a package departure, e.g. for weather"""
+    frappe.only_for(MANAGER_ROLES)
+
+    try:
+        if not reason:
+            frappe.throw(_("A cancellation reason is required"))
+
+        change = DepartureChange(excursion_package, excursion_date, departure_time)
+        waive = None if waive_charges in (None, "") else cint(waive_charges)
+        return {"status": "success", **change.cancel(reason, waive)}
+
+    except Exception as e:
+        # Don't commit bookings changed in bulk without the jobs that follow them up
+        frappe.db.rollback()
+        frappe.log_error(f"Departure cancellation error: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+@frappe.whitelist()
+@instrument()
+def reschedule_departure(excursion_package, excursion_date, new_date, departure_time=None,
+                         new_departure_time=None, reason=None):
+    """Move every booking of a package departure to another date or time"""
+    frappe.only_for(MANAGER_ROLES)
+
+    try:
+        change = DepartureChange(excursion_package, excursion_date, departure_time)
+        return {"status": "success", **change.reschedule(new_date, new_departure_time, reason)}
+
+    except Exception as e:
+        # Don't commit bookings changed in bulk without the jobs that follow them up
+        frappe.db.rollback()
+        frappe.log_error(f"Departure reschedule error: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+@frappe.whitelist()
+@instrument()
+def get_departure_change_status(job_id):
+    """Progress of a departure change's background jobs"""
+    frappe.only_for(MANAGER_ROLES)
+
+    status = DepartureChangeProgress(job_id).get()
+    if not status:
+        return {"status": "error", "message": _("Departure change {0} not found or expired").format(job_id)}
+    return {"status": "success", **status}
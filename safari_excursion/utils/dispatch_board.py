@@ -0,0 +1,242 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/dispatch_board.py
+
+import pickle
+
+import frappe
+from frappe.utils import getdate
+
+from safari_excursion.utils.breadcrumbs import BreadcrumbStore
+from safari_excursion.utils.instrumentation import instrument
+
+DISPATCH_BOARD_EVENT = "excursion_dispatch_board"
+BOARD_KEY = "excursion_dispatch_board"
+BOARD_TTL = 2 * 24 * 3600
+
+# Rows carry customer contact details, so the board is for dispatchers only
+MANAGER_ROLES = ["Safari Manager", "Excursion Manager", "System Manager"]
+
+BOARD_BOOKING_FIELDS = ["name", "booking_number", "excursion_package", "excursion_date", "departure_time",
+                        "total_guests", "customer_name", "customer_phone", "pickup_location", "assigned_guide",
+                        "assigned_vehicle", "booking_status", "excursion_status", "pickup_confirmation_status",
+                        "excursion_operation"]
+
+BOARD_OPERATION_FIELDS = ["name", "operation_status", "actual_departure_time", "actual_return_time",
+                          "pickup_completed", "excursion_started", "excursion_completed", "dropoff_completed"]
+
+def is_on_board(booking):
+    return booking.docstatus < 2 and booking.booking_status != "Cancelled"
+
+def board_value(value):
+    return value if value is None or isinstance(value, (int, float, str)) else str(value)
+
+def get_board_users():
+    """Enabled users with a manager role, who receive the board diffs"""
+    return frappe.db.sql_list("""
+        SELECT DISTINCT `tabUser`.name FROM `tabUser`
+        INNER JOIN `tabHas Role` ON `tabHas Role`.parent = `tabUser`.name AND `tabHas Role`.parenttype = 'User'
+        WHERE `tabUser`.enabled = 1 AND `tabHas Role`.role IN %(roles)s
+    """, {"roles": tuple(MANAGER_ROLES)})
+
+class DispatchBoard:
+    """
+    Live state of one day's departures, held in Redis
+
+    A board is a hash of booking name to row (booking, operation status,
+    pickup progress, guide and vehicle). It is built from the database
+    the first time a dispatcher opens the day and from then on kept
+    current by document hooks and the pickup status patch, which publish
+    only the changed fields of a row to each manager's user room; the
+    doctype room is open to guides, who must not see other customers'
+    contacts. A per-day version counter lets clients spot a missed diff
+    and reload.
+    """
+
+    def __init__(self, excursion_date=None):
+        self.excursion_date = getdate(excursion_date)
+        self.cache = frappe.cache()
+        self.rows_key = f"{BOARD_KEY}:{self.excursion_date}"
+        self.loaded_key = f"{BOARD_KEY}_loaded:{self.excursion_date}"
+        self.version_key = self.cache.make_key(f"{BOARD_KEY}_version:{self.excursion_date}")
+        self.users = None
+
+    def is_loaded(self):
+        return bool(self.cache.get_value(self.loaded_key))
+
+    def get_version(self):
+        return int(self.cache.get(self.version_key) or 0)
+
+    def get_rows(self):
+        """All rows of the day in departure order, building the board when cold"""
+        if not self.is_loaded():
+            self.build()
+
+        rows = self.cache.hgetall(self.rows_key) or {}
+        return sorted(rows.values(), key=lambda row: (row.get("departure_time") or "", row["booking"]))
+
+    def build(self):
+        bookings = frappe.get_all(
+            "Excursion Booking",
+            filters={"excursion_date": self.excursion_date, "docstatus": ["<", 2],
+                     "booking_status": ["!=", "Cancelled"]},
+            fields=BOARD_BOOKING_FIELDS
+        )
+        rows = self.make_rows(bookings)
+
+        key = self.cache.make_key(self.rows_key)
+        pipe = self.cache.pipeline()
+        pipe.delete(key)
+        for name, row in rows.items():
+            # Pickled like RedisWrapper.hset so hgetall can read it back
+            pipe.hset(key, name, pickle.dumps(row))
+        pipe.expire(key, BOARD_TTL)
+        pipe.execute()
+
+        self.cache.set_value(self.loaded_key, 1, expires_in_sec=BOARD_TTL)
+
+    def make_rows(self, bookings):
+        """Board rows for bookings, with one query each for operations and pickups"""
+        names = [booking.name for booking in bookings]
+        operation_names = [booking.excursion_operation for booking in bookings if booking.excursion_operation]
+
+        operations = {}
+        if operation_names:
+            operations = {operation.name: operation for operation in frappe.get_all(
+                "Excursion Operation", filters={"name": ["in", operation_names]}, fields=BOARD_OPERATION_FIELDS
+            )}
+
+        progress = {}
+        if names:
+            for parent, status, count in frappe.db.sql("""
+                SELECT parent, pickup_status, COUNT(*)
+                FROM `tabExcursion Guest Pickup`
+                WHERE parenttype = 'Excursion Booking' AND parent IN %(names)s
+                GROUP BY parent, pickup_status
+            """, {"names": tuple(names)}):
+                counts = progress.setdefault(parent, {"pickups_total": 0, "pickups_completed": 0, "no_shows": 0})
+                counts["pickups_total"] += count
+                if status == "Completed":
+                    counts["pickups_completed"] += count
+                elif status == "No Show":
+                    counts["no_shows"] += count
+
+        rows = {}
+        for booking in bookings:
+            operation = operations.get(booking.excursion_operation) or {}
+            row = {"booking": booking.name}
+            row.update({field: board_value(booking.get(field)) for field in BOARD_BOOKING_FIELDS
+                        if field not in ("name", "excursion_date")})
+            row.update({field: board_value(operation.get(field)) for field in BOARD_OPERATION_FIELDS
+                        if field != "name"})
+            row.update(progress.get(booking.name, {"pickups_total": 0, "pickups_completed": 0, "no_shows": 0}))
+            rows[booking.name] = row
+
+        return rows
+
+    def refresh(self, booking_names):
+        """Reload rows of bookings on this day and publish what changed"""
+        if not self.is_loaded():
+            return
+
+        bookings = frappe.get_all(
+            "Excursion Booking", filters={"name": ["in", list(booking_names)]},
+            fields=BOARD_BOOKING_FIELDS + ["docstatus"]
+        )
+        current = self.make_rows([booking for booking in bookings
+                                  if is_on_board(booking) and getdate(booking.excursion_date) == self.excursion_date])
+
+        for name in booking_names:
+            previous = self.cache.hget(self.rows_key, name)
+            row = current.get(name)
+
+            if row:
+                changes = {field: value for field, value in row.items() if not previous or previous.get(field) != value}
+                if not changes:
+                    continue
+                self.cache.hset(self.rows_key, name, row)
+                self.publish({"booking": name, "changes": changes, "added": not previous})
+            elif previous:
+                self.cache.hdel(self.rows_key, name)
+                self.publish({"booking": name, "removed": True})
+
+    def publish(self, diff):
+        diff["date"] = str(self.excursion_date)
+        diff["version"] = self.cache.incr(self.version_key)
+        self.cache.expire(self.version_key, BOARD_TTL)
+
+        if self.users is None:
+            self.users = get_board_users()
+        for user in self.users:
+            frappe.publish_realtime(DISPATCH_BOARD_EVENT, diff, user=user)
+
+def queue_board_refresh(booking, *excursion_dates):
+    """Refresh a booking's row on the given days once the transaction commits
+
+    Refreshes are collected per request so a save that fires several
+    hooks, or a sync that patches many pickups, publishes one diff per
+    booking.
+    """
+    pending = getattr(frappe.local, "dispatch_board_pending", None)
+    if pending is None:
+        pending = frappe.local.dispatch_board_pending = {}
+        frappe.db.after_commit.add(flush_board_refresh)
+        frappe.db.after_rollback.add(discard_board_refresh)
+
+    for excursion_date in excursion_dates:
+        if excursion_date:
+            pending.setdefault(getdate(excursion_date), set()).add(booking)
+
+def flush_board_refresh():
+    pending = getattr(frappe.local, "dispatch_board_pending", None) or {}
+    frappe.local.dispatch_board_pending = None
+
+    for excursion_date, bookings in pending.items():
+        try:
+            DispatchBoard(excursion_date).refresh(bookings)
+        except Exception as e:
+            # The board must never break the transaction that fed it
+            frappe.log_error(f"Dispatch board refresh error: {str(e)}")
+
+def discard_board_refresh():
+    frappe.local.dispatch_board_pending = None
+
+def refresh_booking_on_board(excursion_booking):
+    """For changes written with db.set_value, which fire no document hooks"""
+    excursion_date = frappe.db.get_value("Excursion Booking", excursion_booking, "excursion_date")
+    queue_board_refresh(excursion_booking, excursion_date)
+
+def on_booking_change(doc, method=None):
+    """Document hook: keep the booking's row current, on its old day too if it moved"""
+    previous = doc.get_doc_before_save() if method == "on_update" else None
+    queue_board_refresh(doc.name, doc.excursion_date, previous.excursion_date if previous else None)
+
+def on_operation_change(doc, method=None):
+    """Document hook: operation status and times show on the booking's row"""
+    if doc.excursion_booking:
+        queue_board_refresh(doc.excursion_booking, doc.operation_date)
+
+@frappe.whitelist()
+@instrument()
+def get_dispatch_board(date=None):
+    """Rows and vehicle positions for a day; diffs follow on the dispatch board event"""
+    frappe.only_for(MANAGER_ROLES)
+
+    try:
+        board = DispatchBoard(date)
+        version = board.get_version()
+        rows = board.get_rows()
+
+        positions = BreadcrumbStore().get_last_positions()
+        operations = {row["excursion_operation"] for row in rows if row.get("excursion_operation")}
+
+        return {
+            "status": "success",
+            "date": str(board.excursion_date),
+            "version": version,
+            "event": DISPATCH_BOARD_EVENT,
+            "rows": rows,
+            "positions": {name: position for name, position in positions.items() if name in operations}
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Dispatch board error: {str(e)}")
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,270 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/driver_sync.py
+
+import hashlib
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import get_datetime, getdate, now_datetime
+
+from safari_excursion.utils.dispatch_board import refresh_booking_on_board
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.permissions import get_user_guide_name
+from safari_excursion.utils.pickup_status import PickupStatusConflict, patch_pickup_status
+
+MANAGER_ROLES = ["Safari Manager", "Excursion Manager", "System Manager"]
+
+MANIFEST_CACHE_PREFIX = "excursion_driver_manifest"
+MANIFEST_VERSION_TTL = 2 * 24 * 3600  # clients older than this get a full manifest
+EVENT_CACHE_PREFIX = "excursion_driver_event"
+EVENT_ID_TTL = 7 * 24 * 3600
+
+BOOKING_FIELDS = ["name", "booking_number", "excursion_package", "departure_time", "duration_hours",
+                  "total_guests", "adult_count", "child_count", "customer_name", "customer_phone",
+                  "pickup_type", "pickup_location", "pickup_time", "dropoff_location", "assigned_vehicle",
+                  "special_requirements", "dietary_requirements", "medical_conditions",
+                  "pickup_confirmation_status", "excursion_status", "excursion_operation"]
+
+PICKUP_FIELDS = ["name", "parent", "pickup_order", "guest_name", "guest_count", "pickup_location_name",
+                 "pickup_address", "landmark", "gps_coordinates", "contact_phone", "estimated_pickup_time",
+                 "actual_pickup_time", "pickup_status", "meeting_instructions", "stop_manifest", "special_notes"]
+
+GUEST_FIELDS = ["name", "parent", "guest_name", "age_category", "phone", "dietary_restrictions", "medical_conditions"]
+
+OPERATION_FIELDS = ["name", "excursion_booking", "operation_status", "actual_departure_time", "actual_return_time",
+                    "pickup_completed", "excursion_started", "excursion_completed", "dropoff_completed"]
+
+# Offline events that stamp the excursion operation: (check field, timestamp field, time field, status)
+OPERATION_EVENTS = {
+    "pickups_completed": ("pickup_completed", "pickup_completion_time", None, None),
+    "departure": ("excursion_started", "excursion_start_time", "actual_departure_time", "In Progress"),
+    "return": ("excursion_completed", "excursion_completion_time", "actual_return_time", None),
+    "dropoff_completed": ("dropoff_completed", "dropoff_completion_time", None, "Completed")
+}
+
+def get_sync_guide(guide=None):
+    """Guide to sync for: the user's own, or any guide for managers"""
+    if guide and set(MANAGER_ROLES) & set(frappe.get_roles()):
+        return guide
+
+    own_guide = get_user_guide_name()
+    if not own_guide:
+        frappe.throw(_("No Safari Guide is linked to your user"), frappe.PermissionError)
+    if guide and guide != own_guide:
+        frappe.throw(_("You can only sync your own manifest"), frappe.PermissionError)
+
+    return own_guide
+
+def compact(row):
+    """Record without empty values, with times and dates as strings"""
+    return {key: value if isinstance(value, (int, float, str)) else str(value)
+            for key, value in row.items() if value not in (None, "")}
+
+def record_hash(record):
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode()).hexdigest()[:12]
+
+class DriverManifest:
+    """
+    Versioned day manifest for a guide
+
+    Bookings, pickups, guests and operations for the day are loaded with
+    one query each and flattened into compact records keyed by name.
+    Every record gets a short hash and the ETag hashes all of them. The
+    record hashes of each version served are kept in Redis for a while,
+    so a client that sends the ETag it last saw only receives records
+    that changed or disappeared since.
+    """
+
+    def __init__(self, guide, excursion_date=None):
+        self.guide = guide
+        self.excursion_date = getdate(excursion_date)
+
+    def load(self):
+        bookings = frappe.get_all(
+            "Excursion Booking",
+            filters={"assigned_guide": self.guide, "excursion_date": self.excursion_date, "docstatus": 1},
+            fields=BOOKING_FIELDS,
+            order_by="departure_time, name"
+        )
+        names = [booking.name for booking in bookings]
+        operations = [booking.excursion_operation for booking in bookings if booking.excursion_operation]
+
+        child_filters = {"parent": ["in", names], "parenttype": "Excursion Booking"}
+        return {
+            "bookings": bookings,
+            "pickups": frappe.get_all("Excursion Guest Pickup", filters=child_filters,
+                                      fields=PICKUP_FIELDS, order_by="parent, pickup_order") if names else [],
+            "guests": frappe.get_all("Excursion Booking Guest", filters=child_filters,
+                                     fields=GUEST_FIELDS, order_by="parent, idx") if names else [],
+            "operations": frappe.get_all("Excursion Operation", filters={"name": ["in", operations]},
+                                         fields=OPERATION_FIELDS) if operations else []
+        }
+
+    def get_cache_key(self, etag):
+        return f"{MANIFEST_CACHE_PREFIX}:{self.guide}:{self.excursion_date}:{etag}"
+
+    def build(self, since=None):
+        """Full manifest, or the delta since a previously served ETag"""
+        records = {section: {row.name: compact(row) for row in rows} for section, rows in self.load().items()}
+        hashes = {section: {name: record_hash(record) for name, record in section_records.items()}
+                  for section, section_records in records.items()}
+        etag = record_hash(hashes)
+
+        cache = frappe.cache()
+        if not cache.get_value(self.get_cache_key(etag)):
+            cache.set_value(self.get_cache_key(etag), hashes, expires_in_sec=MANIFEST_VERSION_TTL)
+
+        manifest = {"etag": etag, "guide": self.guide, "date": str(self.excursion_date)}
+
+        if since and since == etag:
+            manifest["not_modified"] = True
+            return manifest
+
+        previous = cache.get_value(self.get_cache_key(since)) if since else None
+        if not previous:
+            manifest["full"] = True
+            manifest["records"] = {section: list(section_records.values())
+                                   for section, section_records in records.items()}
+            return manifest
+
+        manifest["full"] = False
+        manifest["base"] = since
+        manifest["changed"] = {
+            section: [record for name, record in section_records.items()
+                      if previous.get(section, {}).get(name) != hashes[section][name]]
+            for section, section_records in records.items()
+        }
+        manifest["removed"] = {
+            section: [name for name in previous.get(section, {}) if name not in records[section]]
+            for section in records
+        }
+
+        return manifest
+
+class DriverEventQueue:
+    """
+    Apply a queue of status and timestamp events recorded offline
+
+    Events are applied in the order the device queued them, each in its
+    own savepoint so one bad event doesn't undo the rest. The outcome of
+    every applied event is remembered by its client id after commit, so
+    resending a queue after a dropped response is harmless.
+    """
+
+    def __init__(self, guide, events):
+        self.guide = guide
+        self.events = events or []
+        self.seen = {}
+        self.bookings = {}
+
+    def apply(self):
+        return [self.apply_event(event) for event in self.events]
+
+    def apply_event(self, event):
+        event_id = event.get("id")
+        if not event_id:
+            return {"id": None, "status": "error", "message": _("Event id is required")}
+
+        key = f"{EVENT_CACHE_PREFIX}:{self.guide}:{event_id}"
+        previous = self.seen.get(event_id) or frappe.cache().get_value(key)
+        if previous:
+            return dict(previous, duplicate=True)
+
+        savepoint = f"driver_event_{len(self.seen)}"
+        frappe.db.savepoint(savepoint)
+        try:
+            result = {"id": event_id, "status": "applied", "result": self.dispatch(event)}
+        except PickupStatusConflict as e:
+            frappe.db.rollback(save_point=savepoint)
+            result = {"id": event_id, "status": "conflict", "message": str(e)}
+        except Exception as e:
+            # Not remembered, so the device can retry it
+            frappe.db.rollback(save_point=savepoint)
+            frappe.log_error(f"Driver event error: {str(e)}")
+            return {"id": event_id, "status": "error", "message": str(e)}
+
+        self.seen[event_id] = result
+        frappe.db.after_commit.add(
+            lambda: frappe.cache().set_value(key, result, expires_in_sec=EVENT_ID_TTL)
+        )
+
+        return result
+
+    def get_booking(self, excursion_booking):
+        if excursion_booking not in self.bookings:
+            booking = frappe.db.get_value("Excursion Booking", excursion_booking,
+                                          ["name", "assigned_guide", "excursion_operation"], as_dict=True)
+            if not booking or booking.assigned_guide != self.guide:
+                frappe.throw(_("Booking {0} is not assigned to {1}").format(excursion_booking, self.guide),
+                             frappe.PermissionError)
+            self.bookings[excursion_booking] = booking
+
+        return self.bookings[excursion_booking]
+
+    def dispatch(self, event):
+        booking = self.get_booking(event.get("excursion_booking"))
+        event_type = event.get("type")
+
+        # Guides only read bookings; get_booking already checked this one is assigned to them
+        if event_type == "pickup_status":
+            return patch_pickup_status(booking.name, event.get("status"), event.get("pickup_order"),
+                                       event.get("notes"), event.get("expected_status"),
+                                       event_time=event.get("timestamp"), check_permission=False)
+
+        if event_type == "booking_status":
+            return patch_pickup_status(booking.name, event.get("status"), notes=event.get("notes"),
+                                       expected_status=event.get("expected_status"), check_permission=False)
+
+        if event_type in OPERATION_EVENTS:
+            return self.stamp_operation(booking, event_type, event.get("timestamp"))
+
+        frappe.throw(_("Unknown event type: {0}").format(event_type))
+
+    def stamp_operation(self, booking, event_type, timestamp):
+        if not booking.excursion_operation:
+            frappe.throw(_("Booking {0} has no excursion operation").format(booking.name))
+
+        check_field, timestamp_field, time_field, status = OPERATION_EVENTS[event_type]
+        happened_at = get_datetime(timestamp) if timestamp else now_datetime()
+
+        values = {check_field: 1, timestamp_field: happened_at}
+        if time_field:
+            values[time_field] = happened_at.time()
+        if status:
+            values["operation_status"] = status
+
+        frappe.db.set_value("Excursion Operation", booking.excursion_operation, values)
+        refresh_booking_on_board(booking.name)
+        return {"excursion_operation": booking.excursion_operation, **{k: str(v) for k, v in values.items()}}
+
+def parse_events(events):
+    if isinstance(events, str):
+        events = json.loads(events)
+    return events or []
+
+@frappe.whitelist()
+@instrument()
+def get_driver_manifest(date=None, since=None, guide=None):
+    """Day manifest for the current guide, as a delta when `since` is a known ETag"""
+    try:
+        manifest = DriverManifest(get_sync_guide(guide), date).build(since)
+        return {"status": "success", "manifest": manifest}
+
+    except Exception as e:
+        frappe.log_error(f"Driver manifest error: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+@frappe.whitelist()
+@instrument()
+def sync_driver_events(events, date=None, since=None, guide=None):
+    """Apply a queue of offline events and return the manifest delta in one round trip"""
+    try:
+        guide = get_sync_guide(guide)
+        results = DriverEventQueue(guide, parse_events(events)).apply()
+        manifest = DriverManifest(guide, date).build(since)
+
+        return {"status": "success", "results": results, "manifest": manifest}
+
+    except Exception as e:
+        frappe.log_error(f"Driver sync error: {str(e)}")
+        return {"status": "error", "message": str(e)}
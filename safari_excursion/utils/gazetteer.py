@@ -0,0 +1,180 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/gazetteer.py
+
+import math
+import re
+from collections import OrderedDict
+
+import frappe
+from frappe import _
+
+from safari_excursion.utils.cache_utils import WorkerCache, bump_cache_version
+
+GAZETTEER_CACHE = "gazetteer"
+RESOLVED_CACHE_SIZE = 4096
+
+# Share of a place name's token weight the text must contain to match it
+MIN_COVERAGE = 0.75
+
+# Words too generic to identify a place on their own
+GENERIC_TOKENS = {"the", "and", "of", "at", "in", "hotel", "resort", "lodge", "apartments", "road", "rd", "street", "st"}
+
+# More specific sources win ties ("Bamburi Beach Hotel" over the "Bamburi" area)
+PLACE_TYPE_PRIORITY = {"Hotel": 3, "Resort": 3, "Airbnb": 3, "Airport": 2, "Landmark": 2, "Other": 1, "Area": 0}
+
+def tokenize(text):
+    """Normalized tokens of a place name or free-text location"""
+    tokens = re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).split()
+    significant = [token for token in tokens if token not in GENERIC_TOKENS]
+    return significant or tokens
+
+class Gazetteer:
+    """
+    In-memory token index over known places
+
+    Built from Excursion Gazetteer Place (including alternate names),
+    package pickup locations and Accommodation records. Each name becomes
+    an entry; a free-text location matches the entry whose weighted
+    tokens it covers best, with rarer tokens weighing more.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.postings = {}
+        self.weights = {}
+        self.resolved = OrderedDict()
+
+    def add(self, name, gps_coordinates=None, transport_zone=None, source=None, place_type=None):
+        tokens = frozenset(tokenize(name))
+        if not tokens:
+            return
+
+        self.entries.append(frappe._dict({
+            "place_name": name,
+            "tokens": tokens,
+            "gps_coordinates": gps_coordinates or None,
+            "transport_zone": transport_zone or None,
+            "source": source,
+            "priority": PLACE_TYPE_PRIORITY.get(place_type, 1)
+        }))
+
+    def build(self):
+        """Build postings and token weights once all entries are added"""
+        for i, entry in enumerate(self.entries):
+            for token in entry.tokens:
+                self.postings.setdefault(token, []).append(i)
+
+        total = len(self.entries) or 1
+        self.weights = {token: math.log(total / len(ids)) + 1 for token, ids in self.postings.items()}
+
+        for entry in self.entries:
+            entry.weight = sum(self.weights[token] for token in entry.tokens)
+
+        return self
+
+    def resolve(self, text):
+        """Best matching place for a free-text location, or None"""
+        key = " ".join(tokenize(text))
+        if not key:
+            return None
+
+        if key in self.resolved:
+            self.resolved.move_to_end(key)
+            return self.resolved[key]
+
+        place = self.match(set(key.split()))
+
+        self.resolved[key] = place
+        if len(self.resolved) > RESOLVED_CACHE_SIZE:
+            self.resolved.popitem(last=False)
+
+        return place
+
+    def match(self, tokens):
+        matched = {}
+        for token in tokens:
+            weight = self.weights.get(token)
+            for i in self.postings.get(token, []):
+                matched[i] = matched.get(i, 0) + weight
+
+        best, best_key = None, None
+        for i, weight in matched.items():
+            entry = self.entries[i]
+            coverage = weight / entry.weight
+            if coverage < MIN_COVERAGE:
+                continue
+
+            rank = (round(coverage, 3), entry.priority, weight)
+            if best_key is None or rank > best_key:
+                best, best_key = entry, rank
+
+        if not best:
+            return None
+
+        return frappe._dict({
+            "place_name": best.place_name,
+            "gps_coordinates": best.gps_coordinates,
+            "transport_zone": best.transport_zone,
+            "source": best.source,
+            "score": best_key[0]
+        })
+
+def build_gazetteer():
+    """Load all place sources and build the index"""
+    gazetteer = Gazetteer()
+
+    places = frappe.get_all(
+        "Excursion Gazetteer Place",
+        filters={"is_active": 1},
+        fields=["name", "place_name", "place_type", "alternate_names", "gps_coordinates", "transport_zone"]
+    )
+    for place in places:
+        names = [place.place_name] + [n.strip() for n in (place.alternate_names or "").splitlines() if n.strip()]
+        for name in names:
+            gazetteer.add(name, place.gps_coordinates, place.transport_zone, place.name, place.place_type)
+
+    pickup_locations = frappe.get_all(
+        "Excursion Pickup Location",
+        filters={"parenttype": "Excursion Package"},
+        fields=["location_name", "location_type", "gps_coordinates"]
+    )
+    for location in pickup_locations:
+        gazetteer.add(location.location_name, location.gps_coordinates,
+                      source="Excursion Pickup Location", place_type=location.location_type)
+
+    if frappe.db.table_exists("Accommodation"):
+        accommodations = frappe.get_all("Accommodation", fields=["name", "accommodation_name", "gps_coordinates"])
+        for accommodation in accommodations:
+            gazetteer.add(accommodation.accommodation_name, accommodation.gps_coordinates,
+                          source=accommodation.name, place_type="Hotel")
+
+    return gazetteer.build()
+
+_gazetteer = WorkerCache(GAZETTEER_CACHE, build_gazetteer)
+
+def get_gazetteer():
+    return _gazetteer.get()
+
+def resolve_location(text):
+    """Resolve free-text pickup location to place, coordinates and zone"""
+    if not text:
+        return None
+
+    try:
+        return get_gazetteer().resolve(text)
+    except Exception as e:
+        # Pricing and scheduling must keep working without the gazetteer
+        frappe.log_error(f"Gazetteer lookup error: {str(e)}")
+        return None
+
+def clear_gazetteer_cache(doc=None, method=None):
+    """Rebuild the gazetteer on every worker (also used as a doc event)"""
+    bump_cache_version(GAZETTEER_CACHE)
+
+@frappe.whitelist()
+def resolve_pickup_location(pickup_location):
+    """Resolve a free-text pickup location for the booking form"""
+    place = resolve_location(pickup_location)
+    if not place:
+        return {"status": "error", "message": _("No known place matches {0}").format(pickup_location)}
+
+    return {"status": "success", "place": place}
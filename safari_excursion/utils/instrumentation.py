@@ -0,0 +1,292 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/instrumentation.py
+
+import functools
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+# Instrumentation is opt-in per site: set "excursion_instrumentation": 1 in site_config.json
+CONFIG_KEY = "excursion_instrumentation"
+
+STATS_KEY_PREFIX = "excursion_perf"
+BUCKET_SECONDS = 3600  # one rolling bucket per hour
+RETENTION_HOURS = 48
+SLOW_CALL_MS = 1000
+
+METRICS = ["calls", "errors", "slow_calls", "wall_ms", "db_queries", "db_ms",
+           "cache_hits", "cache_misses", "emails"]
+
+def is_enabled():
+    """Check if instrumentation is switched on for the current site"""
+    return bool(getattr(frappe.local, "conf", None) and cint(frappe.conf.get(CONFIG_KEY)))
+
+class CallStats:
+    """Counters collected while a tracked call is running"""
+
+    __slots__ = ["name", "wall_ms", "db_queries", "db_ms", "cache_hits", "cache_misses", "emails"]
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_ms = 0.0
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.emails = 0
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+def _active_calls():
+    return getattr(frappe.local, "excursion_perf_stack", None)
+
+@contextmanager
+def measure(name):
+    """Collect counters for a block of code without recording them
+
+    Works regardless of the site setting; used by track() and the
+    benchmark suite.
+    """
+    install_probes()
+
+    if _active_calls() is None:
+        frappe.local.excursion_perf_stack = []
+
+    stats = CallStats(name)
+    frappe.local.excursion_perf_stack.append(stats)
+    start = time.perf_counter()
+
+    try:
+        yield stats
+    finally:
+        stats.wall_ms = (time.perf_counter() - start) * 1000
+        frappe.local.excursion_perf_stack.remove(stats)
+
+@contextmanager
+def track(name):
+    """Record wall time, queries, cache usage and emails for a block of code
+
+    Usage:
+        with track("pickup_schedule.optimize"):
+            ...
+    """
+    if not is_enabled():
+        yield None
+        return
+
+    stats = None
+    failed = False
+
+    try:
+        with measure(name) as stats:
+            yield stats
+    except Exception:
+        failed = True
+        raise
+    finally:
+        if stats:
+            try:
+                record_call(stats, failed)
+            except Exception as e:
+                # Stats must never break the call being measured
+                frappe.logger().warning(f"Excursion instrumentation error: {str(e)}")
+
+def instrument(name=None):
+    """Decorator form of track() for whitelisted methods and doc events
+
+    Place it below @frappe.whitelist() so the whitelisted callable is the
+    instrumented wrapper.
+    """
+    def decorator(fn):
+        call_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return fn(*args, **kwargs)
+
+            with track(call_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+# Probes
+# ------
+# Wrappers are installed once per process (sendmail, cache) or once per
+# database connection, and only count while a tracked call is active.
+
+def install_probes():
+    """Install query, cache and email counters if not already present"""
+    db = frappe.local.db
+    if db and not getattr(db, "_excursion_perf_probe", False):
+        db.sql = _wrap_sql(db.sql)
+        db._excursion_perf_probe = True
+
+    cache = frappe.cache()
+    if not getattr(cache, "_excursion_perf_probe", False):
+        cache.get_value = _wrap_cache_get(cache.get_value)
+        cache.hget = _wrap_cache_get(cache.hget)
+        cache._excursion_perf_probe = True
+
+    if not getattr(frappe.sendmail, "_excursion_perf_probe", False):
+        frappe.sendmail = _wrap_sendmail(frappe.sendmail)
+
+def _wrap_sql(sql):
+    @functools.wraps(sql)
+    def wrapper(*args, **kwargs):
+        active = _active_calls()
+        if not active:
+            return sql(*args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return sql(*args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            for stats in active:
+                stats.db_queries += 1
+                stats.db_ms += elapsed
+
+    return wrapper
+
+def _wrap_cache_get(get):
+    @functools.wraps(get)
+    def wrapper(*args, **kwargs):
+        active = _active_calls()
+        if not active:
+            return get(*args, **kwargs)
+
+        # get_value(key, generator) / hget(name, key, generator): a generator
+        # call means the value was missing
+        generated = []
+        generator = kwargs.get("generator")
+        generator_index = 2 if get.__name__ == "hget" else 1
+
+        if generator is None and len(args) > generator_index:
+            generator = args[generator_index]
+
+        if generator:
+            def tracked_generator():
+                generated.append(True)
+                return generator()
+
+            if "generator" in kwargs:
+                kwargs["generator"] = tracked_generator
+            else:
+                args = args[:generator_index] + (tracked_generator,) + args[generator_index + 1:]
+
+        value = get(*args, **kwargs)
+        hit = not generated and value is not None
+
+        for stats in active:
+            if hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+
+        return value
+
+    return wrapper
+
+def _wrap_sendmail(sendmail):
+    @functools.wraps(sendmail)
+    def wrapper(*args, **kwargs):
+        for stats in _active_calls() or []:
+            stats.emails += 1
+        return sendmail(*args, **kwargs)
+
+    wrapper._excursion_perf_probe = True
+    return wrapper
+
+# Stats store
+# -----------
+
+def get_bucket(timestamp=None):
+    """Start of the hourly bucket for a timestamp"""
+    timestamp = timestamp or time.time()
+    return int(timestamp // BUCKET_SECONDS) * BUCKET_SECONDS
+
+def get_bucket_key(bucket):
+    return frappe.cache().make_key(f"{STATS_KEY_PREFIX}:{bucket}")
+
+def record_call(stats, failed=False):
+    """Add one call's counters to the current rolling bucket"""
+    values = {
+        "calls": 1,
+        "errors": 1 if failed else 0,
+        "slow_calls": 1 if stats.wall_ms >= SLOW_CALL_MS else 0,
+        "wall_ms": stats.wall_ms,
+        "db_queries": stats.db_queries,
+        "db_ms": stats.db_ms,
+        "cache_hits": stats.cache_hits,
+        "cache_misses": stats.cache_misses,
+        "emails": stats.emails
+    }
+
+    key = get_bucket_key(get_bucket())
+    pipe = frappe.cache().pipeline()
+    for metric, value in values.items():
+        if value:
+            pipe.hincrbyfloat(key, f"{stats.name}|{metric}", value)
+    pipe.expire(key, RETENTION_HOURS * 3600)
+    pipe.execute()
+
+def get_stats(hours=24):
+    """Aggregate rolling buckets for the last N hours"""
+    hours = min(max(cint(hours) or 24, 1), RETENTION_HOURS)
+    current = get_bucket()
+    keys = [get_bucket_key(current - i * BUCKET_SECONDS) for i in range(hours)]
+
+    pipe = frappe.cache().pipeline()
+    for key in keys:
+        pipe.hgetall(key)
+
+    totals = {}
+    for bucket in pipe.execute():
+        for field, value in (bucket or {}).items():
+            name, metric = frappe.safe_decode(field).rsplit("|", 1)
+            entry = totals.setdefault(name, dict.fromkeys(METRICS, 0))
+            entry[metric] = entry.get(metric, 0) + flt(frappe.safe_decode(value))
+
+    result = []
+    for name, entry in totals.items():
+        calls = entry["calls"] or 1
+        cache_lookups = entry["cache_hits"] + entry["cache_misses"]
+        result.append({
+            "name": name,
+            **{metric: flt(entry[metric], 2) for metric in METRICS},
+            "avg_wall_ms": flt(entry["wall_ms"] / calls, 2),
+            "avg_db_queries": flt(entry["db_queries"] / calls, 2),
+            "avg_db_ms": flt(entry["db_ms"] / calls, 2),
+            "cache_hit_rate": flt(entry["cache_hits"] / cache_lookups * 100, 1) if cache_lookups else 0
+        })
+
+    return sorted(result, key=lambda row: row["wall_ms"], reverse=True)
+
+@frappe.whitelist()
+def get_instrumentation_stats(hours=24):
+    """Get aggregated per-endpoint timings for the desk performance page"""
+    frappe.only_for(["System Manager", "Safari Manager", "Excursion Manager"])
+
+    return {
+        "status": "success",
+        "enabled": is_enabled(),
+        "hours": cint(hours),
+        "stats": get_stats(hours)
+    }
+
+@frappe.whitelist(methods=["POST"])
+def reset_instrumentation_stats():
+    """Clear all rolling instrumentation buckets"""
+    frappe.only_for(["System Manager"])
+
+    current = get_bucket()
+    keys = [get_bucket_key(current - i * BUCKET_SECONDS) for i in range(RETENTION_HOURS)]
+    frappe.cache().delete(*keys)
+
+    return {"status": "success", "message": _("Instrumentation stats cleared")}
@@ -1,9 +1,20 @@
 # ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/multiple_pickup_transport.py
 
+import json
+
 import frappe
 from frappe import _
 from frappe.utils import getdate, get_time, add_to_date, time_diff_in_seconds
 from datetime import datetime, timedelta
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.gazetteer import resolve_location
+from safari_excursion.utils.pickup_clustering import cluster_pickup_locations, format_manifest
+from safari_excursion.utils.pickup_status import patch_pickup_status
+from safari_excursion.utils.travel_time import DEFAULT_BUFFER_MINUTES, DEFAULT_DWELL_MINUTES, get_travel_time_model
+
+# Safari Guest fields needed to build pickup locations (some are optional per site)
+GUEST_PICKUP_FIELDS = ["guest_name", "phone", "email", "current_accommodation",
+                       "accommodation_address", "accommodation_gps"]
 
 class MultiplePickupManager:
     """
@@ -36,8 +47,11 @@ class MultiplePickupManager:
             frappe.msgprint(_("No guest accommodation details found for pickup scheduling"))
             return []
         
+        # Merge guests within walking distance into shared stops
+        pickup_stops = cluster_pickup_locations(guest_locations)
+
         # Optimize pickup route
-        optimized_schedule = self.optimize_pickup_route(guest_locations)
+        optimized_schedule = self.optimize_pickup_route(pickup_stops)
         
         # Create pickup schedule records
         self.create_pickup_records(optimized_schedule)
@@ -45,60 +59,113 @@ class MultiplePickupManager:
         return optimized_schedule
     
     def get_guest_accommodation_details(self):
-        """Get accommodation details for all guests in the booking"""
+        """Get accommodation details for all guests in the booking
+
+        Guests, the party's accommodation booking for the excursion date and
+        the referenced accommodation are prefetched with three set-based
+        queries instead of loading documents per guest.
+        """
+        guest_rows = self.get_pickup_guest_rows()
+        if not guest_rows:
+            return []
+
+        guests = self.prefetch_guests([row.guest for row in guest_rows])
+        accommodation = self.prefetch_accommodation()
         guest_locations = []
-        
-        if not self.excursion_booking.guests:
-            # If no individual guest records, create from booking party
-            if self.excursion_booking.booking_party:
-                booking_party = frappe.get_doc("Booking Party", self.excursion_booking.booking_party)
-                
-                # Primary guest accommodation
-                if booking_party.primary_guest:
-                    guest = frappe.get_doc("Safari Guest", booking_party.primary_guest)
-                    location = self.get_guest_accommodation(guest)
-                    if location:
-                        location['guest_name'] = guest.guest_name
-                        location['contact_phone'] = guest.phone or self.excursion_booking.customer_phone
-                        guest_locations.append(location)
-                
-                # Additional guests (if they have different accommodations)
-                for guest_row in booking_party.guests or []:
-                    guest = frappe.get_doc("Safari Guest", guest_row.guest)
-                    location = self.get_guest_accommodation(guest)
-                    if location and not self.is_duplicate_location(location, guest_locations):
-                        location['guest_name'] = guest.guest_name
-                        location['contact_phone'] = guest.phone or self.excursion_booking.customer_phone
-                        guest_locations.append(location)
-        else:
-            # Use individual guest records from booking
-            for guest_row in self.excursion_booking.guests:
-                if guest_row.guest:
-                    guest = frappe.get_doc("Safari Guest", guest_row.guest)
-                    location = self.get_guest_accommodation(guest)
-                    if location and not self.is_duplicate_location(location, guest_locations):
-                        location['guest_name'] = guest_row.guest_name
-                        location['contact_phone'] = guest_row.phone or self.excursion_booking.customer_phone
-                        guest_locations.append(location)
-        
+
+        for row in guest_rows:
+            guest = guests.get(row.guest)
+            if not guest:
+                continue
+
+            location = self.get_guest_accommodation(guest, accommodation)
+            if not location:
+                continue
+
+            # Free-text locations get coordinates from the gazetteer for clustering and routing
+            if not location.get('gps_coordinates'):
+                place = resolve_location(location['location_name'])
+                if place and place.gps_coordinates:
+                    location['gps_coordinates'] = place.gps_coordinates
+
+            location['guest'] = row.guest
+            location['guest_name'] = row.guest_name or guest.guest_name
+            location['contact_phone'] = row.phone or guest.phone or self.excursion_booking.customer_phone
+            guest_locations.append(location)
+
         return guest_locations
-    
-    def get_guest_accommodation(self, guest):
-        """Get accommodation details for a specific guest"""
-        # Check if guest has current accommodation booking
-        accommodation_booking = frappe.db.get_value(
+
+    def get_pickup_guest_rows(self):
+        """Guests to pick up, from the booking or else from the booking party"""
+        if self.excursion_booking.guests:
+            return [frappe._dict({
+                "guest": row.guest,
+                "guest_name": row.guest_name,
+                "phone": row.phone
+            }) for row in self.excursion_booking.guests if row.guest]
+
+        if not self.excursion_booking.booking_party:
+            return []
+
+        # If no individual guest records, create from booking party
+        booking_party = frappe.get_doc("Booking Party", self.excursion_booking.booking_party)
+        guest_rows = []
+
+        # Primary guest accommodation
+        if booking_party.primary_guest:
+            guest_rows.append(frappe._dict({"guest": booking_party.primary_guest}))
+
+        # Additional guests, merged with others at the same stop later
+        for guest_row in booking_party.guests or []:
+            if guest_row.guest and guest_row.guest != booking_party.primary_guest:
+                guest_rows.append(frappe._dict({"guest": guest_row.guest}))
+
+        return guest_rows
+
+    def prefetch_guests(self, guest_names):
+        """Load all pickup guests in one query, keyed by name"""
+        meta = frappe.get_meta("Safari Guest")
+        fields = ["name"] + [field for field in GUEST_PICKUP_FIELDS if meta.has_field(field)]
+
+        guests = frappe.get_all(
+            "Safari Guest",
+            filters={"name": ["in", list(set(guest_names))]},
+            fields=fields
+        )
+
+        return {guest.name: guest for guest in guests}
+
+    def prefetch_accommodation(self):
+        """Load the party's accommodation for the excursion date in two queries"""
+        if not self.excursion_booking.booking_party:
+            return None
+
+        # Check if the party has a current accommodation booking
+        accommodation_bookings = frappe.get_all(
             "Accommodation Booking",
-            {
+            filters={
                 "booking_party": self.excursion_booking.booking_party,
                 "check_in_date": ["<=", self.excursion_booking.excursion_date],
                 "check_out_date": [">=", self.excursion_booking.excursion_date],
                 "status": ["in", ["Confirmed", "Checked In"]]
             },
-            ["accommodation", "room_type"]
+            fields=["accommodation", "room_type"],
+            limit=1
         )
-        
-        if accommodation_booking:
-            accommodation = frappe.get_doc("Accommodation", accommodation_booking[0])
+
+        if not accommodation_bookings or not accommodation_bookings[0].accommodation:
+            return None
+
+        return frappe.db.get_value(
+            "Accommodation",
+            accommodation_bookings[0].accommodation,
+            ["accommodation_name", "address", "gps_coordinates", "contact_phone"],
+            as_dict=True
+        )
+
+    def get_guest_accommodation(self, guest, accommodation=None):
+        """Get accommodation details for a specific guest"""
+        if accommodation:
             return {
                 "location_type": "Hotel",
                 "location_name": accommodation.accommodation_name,
@@ -106,27 +173,19 @@ class MultiplePickupManager:
                 "gps_coordinates": accommodation.gps_coordinates,
                 "contact_phone": accommodation.contact_phone
             }
-        
+
         # Fallback to guest's preferred accommodation or manually entered location
-        if hasattr(guest, 'current_accommodation') and guest.current_accommodation:
+        if guest.get('current_accommodation'):
             return {
                 "location_type": "Hotel",
                 "location_name": guest.current_accommodation,
-                "address": getattr(guest, 'accommodation_address', ''),
-                "gps_coordinates": getattr(guest, 'accommodation_gps', ''),
+                "address": guest.get('accommodation_address') or '',
+                "gps_coordinates": guest.get('accommodation_gps') or '',
                 "contact_phone": guest.phone
             }
-        
+
         return None
-    
-    def is_duplicate_location(self, new_location, existing_locations):
-        """Check if location already exists in the list"""
-        for existing in existing_locations:
-            if (existing['location_name'].lower() == new_location['location_name'].lower() and
-                existing['address'] == new_location['address']):
-                return True
-        return False
-    
+
     def optimize_pickup_route(self, guest_locations):
         """Optimize pickup route based on location proximity and traffic patterns"""
         if not guest_locations:
@@ -137,21 +196,26 @@ class MultiplePickupManager:
         
         optimized_locations = []
         departure_time = get_time(self.excursion_booking.departure_time)
-        
-        # Calculate pickup times working backwards from departure
-        pickup_buffer = 30  # 30 minutes buffer before departure
-        travel_between_hotels = 15  # Average 15 minutes between hotels
-        pickup_duration = 5  # 5 minutes per pickup
-        
-        # Calculate first pickup time
-        total_pickup_time = len(guest_locations) * pickup_duration + (len(guest_locations) - 1) * travel_between_hotels
-        first_pickup_time = self.subtract_minutes_from_time(departure_time, total_pickup_time + pickup_buffer)
+        travel_times = get_travel_time_model()
         
         # Sort locations (in real implementation, use GPS coordinates)
         sorted_locations = self.sort_locations_by_route(guest_locations)
         
+        # Learned minutes between consecutive pickups (travel plus dwell), falling back to defaults
+        pickup_hour = self.subtract_minutes_from_time(departure_time, DEFAULT_BUFFER_MINUTES).hour
+        segments = [
+            round(travel_times.segment_minutes(current['location_name'], following['location_name'], pickup_hour))
+            for current, following in zip(sorted_locations, sorted_locations[1:])
+        ]
+        pickup_buffer = round(travel_times.departure_buffer(self.get_pickup_buffer()))
+        
+        # Calculate first pickup time working backwards from departure
+        total_pickup_time = sum(segments) + DEFAULT_DWELL_MINUTES
+        first_pickup_time = self.subtract_minutes_from_time(departure_time, total_pickup_time + pickup_buffer)
+        
         current_time = first_pickup_time
         for i, location in enumerate(sorted_locations, 1):
+            segment = segments[i - 1] if i < len(sorted_locations) else 0
             pickup_record = {
                 "guest_name": location['guest_name'],
                 "pickup_order": i,
@@ -160,20 +224,29 @@ class MultiplePickupManager:
                 "pickup_address": location['address'],
                 "gps_coordinates": location.get('gps_coordinates', ''),
                 "contact_phone": location['contact_phone'],
+                "guest_count": location.get('guest_count', 1),
+                "stop_manifest": format_manifest(location.get('manifest') or []),
+                "stop_guests": json.dumps([guest['guest'] for guest in location.get('manifest') or [location]
+                                           if guest.get('guest')]),
                 "estimated_pickup_time": current_time,
                 "pickup_status": "Pending",
                 "meeting_instructions": self.generate_meeting_instructions(location),
-                "travel_time_to_next": travel_between_hotels if i < len(sorted_locations) else 0
+                "travel_time_to_next": max(segment - DEFAULT_DWELL_MINUTES, 0) if segment else 0
             }
             
             optimized_locations.append(pickup_record)
             
             # Calculate next pickup time
             if i < len(sorted_locations):
-                current_time = self.add_minutes_to_time(current_time, pickup_duration + travel_between_hotels)
+                current_time = self.add_minutes_to_time(current_time, segment)
         
         return optimized_locations
     
+    def get_pickup_buffer(self):
+        """Default minutes between the last pickup and departure from Excursion Settings"""
+        buffer_minutes = frappe.db.get_single_value("Excursion Settings", "pickup_time_buffer_minutes")
+        return DEFAULT_BUFFER_MINUTES if buffer_minutes is None else buffer_minutes
+    
     def sort_locations_by_route(self, locations):
         """Sort locations for optimal route (simplified version)"""
         # In a real implementation, this would use GPS coordinates and routing APIs
@@ -235,33 +308,38 @@ class MultiplePickupManager:
         if not self.excursion_booking.guest_pickups:
             return
         
+        guest_ids = [guest for pickup in self.excursion_booking.guest_pickups
+                     for guest in self.get_stop_guest_ids(pickup)]
+        guests = self.prefetch_guests(guest_ids) if guest_ids else {}
+        
         for pickup in self.excursion_booking.guest_pickups:
             try:
-                self.send_pickup_confirmation_to_guest(pickup)
+                self.send_pickup_confirmation_to_guest(pickup, guests)
             except Exception as e:
                 frappe.log_error(f"Pickup confirmation error for {pickup.guest_name}: {str(e)}")
     
-    def send_pickup_confirmation_to_guest(self, pickup):
-        """Send pickup confirmation to individual guest"""
+    def get_stop_guest_ids(self, pickup):
+        """Safari Guests picked up at a stop, as stored when the stops were clustered"""
+        return json.loads(pickup.stop_guests) if pickup.stop_guests else []
+
+    def send_pickup_confirmation_to_guest(self, pickup, guests=None):
+        """Send pickup confirmation to each guest picked up at a stop"""
         if not pickup.contact_phone:
             return
         
-        # Try to get guest email
-        guest_email = None
-        if pickup.guest_name and self.excursion_booking.booking_party:
-            booking_party = frappe.get_doc("Booking Party", self.excursion_booking.booking_party)
-            for guest_row in booking_party.guests or []:
-                guest = frappe.get_doc("Safari Guest", guest_row.guest)
-                if guest.guest_name == pickup.guest_name:
-                    guest_email = guest.email
-                    break
-        
-        if guest_email:
+        guest_ids = self.get_stop_guest_ids(pickup)
+        if guests is None:
+            guests = self.prefetch_guests(guest_ids) if guest_ids else {}
+        
+        for guest in filter(None, (guests.get(name) for name in guest_ids)):
+            if not guest.get("email"):
+                continue
+            
             subject = f"Pickup Confirmation - {self.excursion_booking.excursion_package}"
             
             message = f"""
             <h3>Your Excursion Pickup Details</h3>
-            <p>Dear {pickup.guest_name},</p>
+            <p>Dear {guest.guest_name},</p>
             
             <p>Your pickup for the {self.excursion_booking.excursion_package} excursion has been confirmed:</p>
             
@@ -288,7 +366,7 @@ class MultiplePickupManager:
             """
             
             frappe.sendmail(
-                recipients=[guest_email],
+                recipients=[guest.email],
                 subject=subject,
                 message=message,
                 reference_doctype=self.excursion_booking.doctype,
@@ -318,11 +396,12 @@ class MultiplePickupManager:
         """
         
         for pickup in self.excursion_booking.guest_pickups:
+            manifest = (pickup.stop_manifest or "").replace("\n", "<br>")
             schedule_html += f"""
             <tr>
                 <td>{pickup.pickup_order}</td>
                 <td><strong>{pickup.estimated_pickup_time}</strong></td>
-                <td>{pickup.guest_name}</td>
+                <td>{pickup.guest_name}<br><small>{manifest}</small></td>
                 <td>{pickup.pickup_location_name}<br><small>{pickup.pickup_address}</small></td>
                 <td>{pickup.contact_phone}</td>
                 <td><small>{pickup.meeting_instructions or ''}</small></td>
@@ -345,6 +424,7 @@ class MultiplePickupManager:
         return schedule_html
 
 @frappe.whitelist()
+@instrument()
 def create_pickup_schedule(excursion_booking):
     """Create pickup schedule for excursion booking"""
     try:
@@ -365,25 +445,17 @@ def create_pickup_schedule(excursion_booking):
         }
 
 @frappe.whitelist()
+@instrument()
 def update_pickup_status(excursion_booking, pickup_order, status, notes=None):
     """Update individual pickup status"""
     try:
-        doc = frappe.get_doc("Excursion Booking", excursion_booking)
-        
-        for pickup in doc.guest_pickups:
-            if pickup.pickup_order == int(pickup_order):
-                pickup.pickup_status = status
-                if status == "Completed":
-                    pickup.actual_pickup_time = frappe.utils.now_datetime().time()
-                if notes:
-                    pickup.special_notes = f"{pickup.special_notes or ''}\nStatus Update: {notes}"
-                break
-        
-        doc.save()
+        # Targeted row update, the booking isn't re-validated
+        change = patch_pickup_status(excursion_booking, status, pickup_order=pickup_order, notes=notes)
         
         return {
             "status": "success",
-            "message": "Pickup status updated successfully"
+            "message": "Pickup status updated successfully",
+            "change": change
         }
         
     except Exception as e:
@@ -2,7 +2,9 @@
 
 import frappe
 from frappe import _
+from safari_excursion.utils.instrumentation import instrument
 
+@instrument()
 def send_booking_confirmation(doc, method):
     """Send booking confirmation email to customer"""
     if doc.doctype != "Excursion Booking":
@@ -47,6 +49,7 @@ def send_booking_confirmation(doc, method):
     except Exception as e:
         frappe.log_error(f"Booking confirmation email error: {str(e)}")
 
+@instrument()
 def send_operation_start_notification(doc, method):
     """Send notification when excursion operation starts"""
     if doc.doctype != "Excursion Operation":
@@ -166,6 +169,51 @@ def send_vehicle_assignment_notification(vehicle_name, excursion_booking):
     except Exception as e:
         frappe.log_error(f"Vehicle assignment notification error: {str(e)}")
 
+def send_reschedule_notification(booking, previous_date, reason=None):
+    """Tell the customer and guide that a departure was moved"""
+    try:
+        message = f"""
+        <h3>Excursion Rescheduled</h3>
+        <p>Dear {booking.customer_name},</p>
+        <p>Your excursion {booking.excursion_package} planned for {previous_date} has been moved.</p>
+
+        <table border="1" style="border-collapse: collapse; width: 100%; margin: 20px 0;">
+            <tr><td><strong>Booking Number:</strong></td><td>{booking.booking_number}</td></tr>
+            <tr><td><strong>New Date:</strong></td><td>{booking.excursion_date}</td></tr>
+            <tr><td><strong>Departure Time:</strong></td><td>{booking.departure_time}</td></tr>
+        </table>
+
+        {f'<p><strong>Pickup Time:</strong> {booking.pickup_time}</p>' if booking.pickup_time else ''}
+        {f'<p><strong>Reason:</strong> {reason}</p>' if reason else ''}
+
+        <p>Please contact us if the new date does not suit you.</p>
+        """
+
+        if booking.customer_email:
+            frappe.sendmail(
+                recipients=[booking.customer_email],
+                subject=f"Excursion Rescheduled - {booking.booking_number}",
+                message=message,
+                reference_doctype=booking.doctype,
+                reference_name=booking.name
+            )
+
+        guide_email = frappe.db.get_value("Safari Guide", booking.assigned_guide, "email") if booking.assigned_guide else None
+        if guide_email:
+            frappe.sendmail(
+                recipients=[guide_email],
+                subject=f"Excursion Assignment Rescheduled - {booking.booking_number}",
+                message=f"""
+                <p>The excursion {booking.booking_number} planned for {previous_date} now departs on
+                {booking.excursion_date} at {booking.departure_time}.</p>
+                """,
+                reference_doctype=booking.doctype,
+                reference_name=booking.name
+            )
+
+    except Exception as e:
+        frappe.log_error(f"Reschedule notification error: {str(e)}")
+
 @frappe.whitelist()
 def send_excursion_reminder(excursion_booking):
     """Send reminder notification for upcoming excursion"""
@@ -0,0 +1,223 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/package_cards.py
+
+import hashlib
+import json
+import pickle
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now_datetime
+from werkzeug.wrappers import Response
+
+from safari_excursion.utils.catalog_index import PRICE_CURRENCY, get_from_prices
+from safari_excursion.utils.instrumentation import instrument
+
+# Bump when the artifact layout changes, so stale artifacts are never served
+ARTIFACT_VERSION = 1
+ARTIFACT_KINDS = ("card", "detail")
+ARTIFACT_KEY = "excursion_package_{kind}s:v{version}"
+
+CACHE_CONTROL_MAX_AGE = 60
+CACHE_CONTROL_STALE = 600
+
+def get_artifact_key(kind):
+    return ARTIFACT_KEY.format(kind=kind, version=ARTIFACT_VERSION)
+
+def by_display_order(rows):
+    return sorted(rows, key=lambda row: (cint(row.display_order) or 999, row.idx))
+
+class PackageArtifacts:
+    """
+    Denormalized JSON "card" and "detail" of a published package
+
+    The card is what a listing shows; the detail is everything the
+    package page renders, including gallery, video, brochure, inclusion,
+    exclusion and destination rows. Video embed and thumbnail URLs,
+    display sorting and the from price are all resolved here once, on
+    save, instead of on every page view. Each artifact is stored as its
+    serialized body with an ETag and Last-Modified, so serving it is a
+    cache read and a header comparison.
+    """
+
+    def __init__(self, package):
+        self.package = frappe.get_doc("Excursion Package", package) if isinstance(package, str) else package
+        from_price, self.currency = get_from_prices([self.package.name]).get(self.package.name, (0, PRICE_CURRENCY))
+        self.from_price = flt(from_price) or None
+
+    def make_card(self):
+        package = self.package
+        return {
+            "name": package.name,
+            "package_name": package.package_name,
+            "package_code": package.package_code,
+            "category": package.excursion_category,
+            "featured_image": package.featured_image,
+            "duration_hours": flt(package.duration_hours),
+            "fitness_level": package.fitness_level,
+            "is_featured": cint(package.is_featured),
+            "from_price": self.from_price,
+            "currency": self.currency,
+            "tags": [row.tag_name for row in package.get("package_tags") or [] if row.tag_name],
+            "seo_description": package.seo_description
+        }
+
+    def make_detail(self):
+        package = self.package
+        return {
+            **self.make_card(),
+            "description": package.description,
+            "seo_title": package.seo_title or package.package_name,
+            "max_capacity": cint(package.max_capacity),
+            "minimum_age": cint(package.minimum_age),
+            "maximum_age": cint(package.maximum_age),
+            "special_requirements": package.special_requirements,
+            "cancellation_policy": package.cancellation_policy,
+            "weather_dependent": cint(package.weather_dependent),
+            "pickup_required": cint(package.pickup_required),
+            "departure_times": [
+                {"departure_time": str(row.departure_time), "label": row.get_display_time(),
+                 "available_days": row.available_days or "All Days", "premium_charge": flt(row.premium_charge)}
+                for row in package.get("departure_times") or [] if row.is_active
+            ],
+            "available_days": [row.day for row in package.get("available_days") or [] if row.is_available],
+            "gallery_images": [
+                row.get_image_info()
+                for row in sorted(package.get("gallery_images") or [],
+                                  key=lambda row: (row.get_display_priority(), row.idx))
+            ],
+            "video_links": [
+                {"title": row.video_title, "platform": row.video_platform, "embed_url": row.get_embed_url(),
+                 "thumbnail_url": row.get_thumbnail_url(), "duration": row.get_duration_display(),
+                 "description": row.description}
+                for row in by_display_order(package.get("video_links") or [])
+            ],
+            "brochure_links": [
+                {"title": row.brochure_title, "language": row.language, "file_type": row.file_type,
+                 "download_url": row.get_download_url(), "size": row.get_file_size_display()}
+                for row in package.get("brochure_links") or [] if row.brochure_file
+            ],
+            "inclusions": [
+                {"item": row.inclusion_item, "category": row.inclusion_category,
+                 "is_highlighted": cint(row.is_highlighted), "description": row.description}
+                for row in by_display_order(package.get("inclusions") or [])
+            ],
+            "exclusions": [
+                {"item": row.exclusion_item, "category": row.exclusion_category, "is_important": cint(row.is_important),
+                 "description": row.description, "estimated_cost": flt(row.estimated_cost) or None}
+                for row in by_display_order(package.get("exclusions") or [])
+            ],
+            "destination_locations": [
+                {"name": row.location_name, "type": row.location_type, "duration_hours": flt(row.duration_hours),
+                 "is_main_destination": cint(row.is_main_destination), "description": row.description,
+                 "activities": row.activities}
+                for row in package.get("destination_locations") or []
+            ],
+            "pickup_locations": [
+                {"name": row.location_name, "type": row.location_type, "landmark": row.landmark,
+                 "additional_charge": flt(row.additional_charge)}
+                for row in package.get("pickup_locations") or []
+            ]
+        }
+
+    def render(self):
+        """{kind: (etag, last_modified, body)} of both artifacts"""
+        # Rendered when something it shows changed, a rate change included
+        last_modified = now_datetime().replace(microsecond=0)
+        artifacts = {}
+        for kind, data in (("card", self.make_card()), ("detail", self.make_detail())):
+            body = json.dumps({"version": ARTIFACT_VERSION, "data": data}, default=str, separators=(",", ":"))
+            etag = hashlib.sha1(body.encode()).hexdigest()
+            artifacts[kind] = (etag, last_modified, body)
+        return artifacts
+
+def store_artifacts(package):
+    """Render and store a package's artifacts, or drop them if it isn't public"""
+    cache = frappe.cache()
+    public = frappe.db.exists("Excursion Package", {"name": package, "is_published": 1, "package_status": "Active"})
+
+    pipe = cache.pipeline()
+    if public:
+        artifacts = PackageArtifacts(package).render()
+        for kind, artifact in artifacts.items():
+            pipe.hset(cache.make_key(get_artifact_key(kind)), package, pickle.dumps(artifact))
+    else:
+        artifacts = {}
+        for kind in ARTIFACT_KINDS:
+            pipe.hdel(cache.make_key(get_artifact_key(kind)), package)
+    pipe.execute()
+
+    return artifacts
+
+def get_artifacts(kind, packages):
+    """Stored artifacts of packages in one cache round trip, rendering any missing"""
+    cache = frappe.cache()
+    stored = cache.hmget(cache.make_key(get_artifact_key(kind)), packages) if packages else []
+
+    artifacts = {}
+    for package, value in zip(packages, stored):
+        artifact = pickle.loads(value) if value else store_artifacts(package).get(kind)
+        if artifact:
+            artifacts[package] = artifact
+    return artifacts
+
+def queue_artifact_refresh(packages):
+    """Regenerate artifacts once the saving transaction commits"""
+    packages = [package for package in packages if package]
+
+    def refresh():
+        for package in packages:
+            try:
+                store_artifacts(package)
+            except Exception as e:
+                # A failed render only leaves the artifact to be rebuilt on the next read
+                for kind in ARTIFACT_KINDS:
+                    frappe.cache().hdel(get_artifact_key(kind), package)
+                frappe.log_error(f"Package artifact error for {package}: {str(e)}")
+
+    if packages:
+        frappe.db.after_commit.add(refresh)
+
+def on_package_change(doc, method=None):
+    """Document hook: the package or one of its child rows was saved, or it was deleted"""
+    queue_artifact_refresh([doc.name])
+
+def on_rate_configuration_change(doc, method=None):
+    """Document hook: the from price follows the rate configuration"""
+    queue_artifact_refresh([doc.excursion_package])
+
+def make_response(body, etag, last_modified):
+    """JSON response that browsers and CDNs can revalidate with If-None-Match or If-Modified-Since"""
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_CONTROL_MAX_AGE
+    response.cache_control.stale_while_revalidate = CACHE_CONTROL_STALE
+    return response.make_conditional(frappe.request)
+
+@frappe.whitelist(allow_guest=True, methods=["GET"])
+@instrument()
+def get_package_detail(package):
+    """Pre-rendered detail of a published package"""
+    artifact = get_artifacts("detail", [package]).get(package)
+    if not artifact:
+        raise frappe.DoesNotExistError(_("Excursion Package {0} not found").format(package))
+
+    etag, last_modified, body = artifact
+    return make_response(body, etag, last_modified)
+
+@frappe.whitelist(allow_guest=True, methods=["GET"])
+@instrument()
+def get_package_cards(packages):
+    """Pre-rendered cards of published packages, in the order asked, for listing pages"""
+    if isinstance(packages, str):
+        packages = json.loads(packages) if packages.startswith("[") else packages.split(",")
+    packages = [package.strip() for package in packages if package and package.strip()][:100]
+
+    artifacts = get_artifacts("card", packages)
+    found = [artifacts[package] for package in packages if package in artifacts]
+
+    body = "[" + ",".join(body for _etag, _modified, body in found) + "]"
+    etag = hashlib.sha1("".join(etag for etag, _modified, _body in found).encode()).hexdigest()
+    last_modified = max((modified for _etag, modified, _body in found), default=now_datetime().replace(microsecond=0))
+    return make_response(body, etag, last_modified)
@@ -0,0 +1,215 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/park_permits.py
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, flt, getdate, now_datetime, today
+
+from safari_excursion.utils.instrumentation import instrument
+
+PERMIT_DOCTYPE = "Excursion Park Permit"
+GROUP_BY_VEHICLE = "Park, Date and Vehicle"
+
+def is_consolidation_enabled():
+    settings = frappe.get_cached_doc("Excursion Settings")
+    return cint(settings.enable_parks_integration) and cint(settings.consolidate_park_permits)
+
+def get_permit_key(park, visit_date, vehicle=None):
+    return f"{park}:{getdate(visit_date)}:{vehicle or ''}"
+
+class ParkPermitConsolidator:
+    """
+    One park booking per park and day for all excursions visiting
+
+    Each park visit of a submitted excursion becomes a manifest row on the
+    open permit for its park, date and (optionally) vehicle. The permit
+    keeps a draft Park Booking whose totals are updated in place as
+    excursions are submitted or cancelled, and the daily filing job
+    submits it. Adding a booking replaces its earlier rows, so running it
+    twice for the same submission is harmless.
+    """
+
+    def __init__(self, excursion_booking, park_calculator):
+        self.excursion_booking = excursion_booking
+        self.park_calculator = park_calculator
+        self.by_vehicle = frappe.get_cached_doc("Excursion Settings").park_permit_grouping == GROUP_BY_VEHICLE
+
+    def add_booking(self):
+        """Add the booking's park visits to open permits, returning their park bookings"""
+        booking = self.excursion_booking
+        residence_category = self.park_calculator.get_guest_residence_category()
+        vehicle = booking.assigned_vehicle if self.by_vehicle else None
+
+        park_bookings = []
+        for park_visit in self.park_calculator.get_park_visits():
+            permit = self.get_open_permit(park_visit["park"], booking.excursion_date, vehicle)
+
+            permit.entries = [entry for entry in permit.entries if entry.excursion_booking != booking.name]
+            permit.append("entries", {
+                "excursion_booking": booking.name,
+                "customer_name": booking.customer_name,
+                "departure_time": booking.departure_time,
+                "residence_category": residence_category,
+                "adult_count": cint(booking.adult_count),
+                "child_count": cint(booking.child_count),
+                "visit_duration": flt(park_visit["visit_duration"]),
+                "vehicle": booking.assigned_vehicle,
+                "guide": booking.assigned_guide
+            })
+            permit.save(ignore_permissions=True)
+
+            park_bookings.append(sync_park_booking(permit))
+
+        return park_bookings
+
+    def get_open_permit(self, park, visit_date, vehicle=None):
+        """The open permit for a group, locked, created on first use"""
+        key = get_permit_key(park, visit_date, vehicle)
+
+        name = frappe.db.get_value(PERMIT_DOCTYPE, {"permit_key": key}, "name", for_update=True)
+        if name:
+            return frappe.get_doc(PERMIT_DOCTYPE, name)
+
+        permit = frappe.get_doc({
+            "doctype": PERMIT_DOCTYPE,
+            "permit_key": key,
+            "park": park,
+            "visit_date": visit_date,
+            "vehicle": vehicle,
+            "status": "Open"
+        })
+        frappe.db.savepoint("park_permit_insert")
+        try:
+            permit.insert(ignore_permissions=True)
+        except (frappe.DuplicateEntryError, frappe.UniqueValidationError):
+            # Another submission created it first, use theirs; Postgres needs the failed insert undone first
+            frappe.db.rollback(save_point="park_permit_insert")
+            name = frappe.db.get_value(PERMIT_DOCTYPE, {"permit_key": key}, "name", for_update=True)
+            permit = frappe.get_doc(PERMIT_DOCTYPE, name)
+
+        return permit
+
+def remove_booking_from_permits(excursion_booking):
+    """Take a cancelled booking off its permits
+
+    Open permits drop its rows and shrink their park booking. Rows on
+    filed permits are flagged instead, the filed park booking stands.
+    """
+    permits = frappe.get_all(
+        "Excursion Park Permit Entry",
+        filters={"excursion_booking": excursion_booking, "parenttype": PERMIT_DOCTYPE},
+        pluck="parent",
+        distinct=True
+    )
+
+    for name in permits:
+        frappe.db.get_value(PERMIT_DOCTYPE, name, "name", for_update=True)
+        permit = frappe.get_doc(PERMIT_DOCTYPE, name)
+
+        if permit.status == "Open":
+            permit.entries = [entry for entry in permit.entries if entry.excursion_booking != excursion_booking]
+        else:
+            for entry in permit.entries:
+                if entry.excursion_booking == excursion_booking:
+                    entry.cancelled = 1
+            permit.add_comment("Comment", _("Excursion Booking {0} was cancelled after filing").format(excursion_booking))
+
+        permit.save(ignore_permissions=True)
+        if permit.status == "Open":
+            sync_park_booking(permit)
+
+def get_common_value(entries, field):
+    values = {entry.get(field) for entry in entries}
+    return values.pop() if len(values) == 1 else None
+
+def sync_park_booking(permit):
+    """Create or update the permit's draft Park Booking from its totals"""
+    entries = [entry for entry in permit.entries if not entry.cancelled]
+    vehicle = permit.vehicle or get_common_value(entries, "vehicle")
+    guide = get_common_value(entries, "guide")
+
+    if not permit.park_booking:
+        park_booking = frappe.get_doc({
+            "doctype": "Park Booking",
+            "booking_date": today(),
+            "visit_date": permit.visit_date,
+            "total_adults": permit.total_adults,
+            "total_children": permit.total_children,
+            "total_guests": permit.total_guests,
+            "booking_type": "Excursion",
+            "vehicle": vehicle,
+            "guide": guide,
+            "status": "Draft"
+        })
+        park_booking.append("parks", {
+            "park": permit.park,
+            "visit_duration": max([flt(entry.visit_duration) for entry in entries] or [4]),
+            "include_vehicle_fees": 1 if any(entry.vehicle for entry in entries) else 0
+        })
+        park_booking.insert(ignore_permissions=True)
+
+        permit.db_set("park_booking", park_booking.name, update_modified=False)
+        return park_booking.name
+
+    # Totals only: the draft isn't loaded or revalidated per excursion
+    frappe.db.set_value("Park Booking", permit.park_booking, {
+        "total_adults": permit.total_adults,
+        "total_children": permit.total_children,
+        "total_guests": permit.total_guests,
+        "vehicle": vehicle,
+        "guide": guide
+    })
+    return permit.park_booking
+
+def file_permit(permit):
+    """Submit a permit's park booking and close it to new excursions"""
+    if permit.park_booking and permit.total_guests:
+        park_booking = frappe.get_doc("Park Booking", permit.park_booking)
+        park_booking.status = "Confirmed"
+        park_booking.submit()
+        status = "Filed"
+    else:
+        if permit.park_booking:
+            frappe.delete_doc("Park Booking", permit.park_booking, ignore_permissions=True)
+            permit.db_set("park_booking", None, update_modified=False)
+        status = "Cancelled"
+
+    # Free the key so late excursions for the group start a new permit
+    permit.db_set({
+        "status": status,
+        "filed_on": now_datetime(),
+        "permit_key": f"{permit.permit_key}:{permit.name}"
+    })
+
+def file_park_permits():
+    """Daily job: file open permits for visits up to tomorrow"""
+    permits = frappe.get_all(
+        PERMIT_DOCTYPE,
+        filters={"status": "Open", "visit_date": ["<=", add_days(getdate(), 1)]},
+        pluck="name"
+    )
+
+    for name in permits:
+        try:
+            file_permit(frappe.get_doc(PERMIT_DOCTYPE, name))
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Park permit filing error for {name}: {str(e)}")
+
+@frappe.whitelist()
+@instrument()
+def file_park_permit(permit):
+    """File a permit ahead of the daily job"""
+    frappe.only_for(["Safari Manager", "Excursion Manager", "System Manager"])
+
+    try:
+        doc = frappe.get_doc(PERMIT_DOCTYPE, permit)
+        if doc.status != "Open":
+            frappe.throw(_("Permit {0} is already {1}").format(permit, doc.status))
+
+        file_permit(doc)
+        return {"status": "success", "park_booking": doc.park_booking}
+
+    except Exception as e:
+        frappe.log_error(f"Park permit filing error: {str(e)}")
+        return {"status": "error", "message": str(e)}
@@ -3,6 +3,8 @@
 import frappe
 from frappe import _
 from frappe.utils import flt, getdate
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.park_permits import ParkPermitConsolidator, is_consolidation_enabled, remove_booking_from_permits
 
 class ExcursionParkFeeCalculator:
     """
@@ -261,6 +263,11 @@ class ExcursionParkFeeCalculator:
         if not self.has_park_visits():
             return None
         
+        if is_consolidation_enabled():
+            # Shared per park and day, the booking links the first park's permit
+            park_bookings = ParkPermitConsolidator(self.excursion_booking, self).add_booking()
+            return park_bookings[0] if park_bookings else None
+        
         try:
             # Create park booking
             park_booking = frappe.get_doc({
@@ -299,6 +306,7 @@ class ExcursionParkFeeCalculator:
             frappe.log_error(f"Error creating park booking: {str(e)}")
             return None
 
+@instrument()
 def create_excursion_park_booking(doc, method):
     """Hook function to create park booking when excursion is submitted"""
     if doc.doctype == "Excursion Booking":
@@ -310,9 +318,15 @@ def create_excursion_park_booking(doc, method):
                 doc.db_set("park_booking", park_booking, update_modified=False)
                 frappe.msgprint(_("Park booking {0} created successfully").format(park_booking))
 
+@instrument()
 def cancel_excursion_park_booking(doc, method):
     """Hook function to cancel park booking when excursion is cancelled"""
     if doc.doctype == "Excursion Booking" and doc.park_booking:
+        if frappe.db.exists("Excursion Park Permit Entry", {"excursion_booking": doc.name}):
+            # A consolidated park booking is shared, only this excursion leaves it
+            remove_booking_from_permits(doc.name)
+            return
+        
         try:
             park_booking = frappe.get_doc("Park Booking", doc.park_booking)
             if park_booking.docstatus == 1:
@@ -322,6 +336,7 @@ def cancel_excursion_park_booking(doc, method):
             frappe.log_error(f"Error cancelling park booking: {str(e)}")
 
 @frappe.whitelist()
+@instrument()
 def get_excursion_park_fees(excursion_booking):
     """Get park fee breakdown for an excursion booking"""
     try:
@@ -343,6 +358,7 @@ def get_excursion_park_fees(excursion_booking):
         }
 
 @frappe.whitelist()
+@instrument()
 def update_excursion_pricing_with_park_fees(excursion_booking):
     """Update excursion pricing to include park fees"""
     try:
@@ -0,0 +1,161 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/pickup_clustering.py
+
+import math
+import re
+
+import frappe
+from frappe.utils import cint, flt
+
+DEFAULT_MERGE_RADIUS_METERS = 150
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE_LAT = 111320
+
+# Words that don't tell two properties apart ("Voyager Beach Resort" == "The Voyager")
+NAME_STOPWORDS = {"the", "hotel", "resort", "resorts", "lodge", "and", "spa", "beach",
+                  "apartments", "villa", "villas", "guest", "house", "camp", "inn", "suites"}
+
+def get_merge_radius():
+    """Walking radius for shared stops from Excursion Settings"""
+    radius = frappe.db.get_single_value("Excursion Settings", "pickup_merge_radius_meters")
+    return DEFAULT_MERGE_RADIUS_METERS if radius is None else cint(radius)
+
+def parse_coordinates(gps_coordinates):
+    """Parse a "lat,lng" string, returning None when missing or invalid"""
+    if not gps_coordinates:
+        return None
+
+    parts = str(gps_coordinates).replace(";", ",").split(",")
+    if len(parts) != 2:
+        return None
+
+    try:
+        lat, lng = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or (lat == 0 and lng == 0):
+        return None
+
+    return lat, lng
+
+def haversine_meters(a, b):
+    """Great-circle distance between two (lat, lng) points in meters"""
+    lat1, lng1 = math.radians(a[0]), math.radians(a[1])
+    lat2, lng2 = math.radians(b[0]), math.radians(b[1])
+
+    h = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(h))
+
+def normalize_location_name(name):
+    """Reduce a property name to comparable tokens"""
+    tokens = re.sub(r"[^a-z0-9 ]+", " ", (name or "").lower()).split()
+    significant = [token for token in tokens if token not in NAME_STOPWORDS]
+    return " ".join(significant or tokens)
+
+class PickupStopClusterer:
+    """
+    Merge guest pickup locations into shared stops
+
+    Located guests are bucketed into a fixed grid whose cells are one
+    merge radius wide, so each guest is only compared with stops in its
+    own and the eight neighbouring cells. Guests within the radius of a
+    stop's anchor join that stop. Guests without coordinates fall back to
+    normalized property name matching.
+    """
+
+    def __init__(self, radius_meters=None):
+        self.radius = flt(get_merge_radius() if radius_meters is None else radius_meters)
+        self.stops = []
+        self.grid = {}
+        self.names = {}
+
+    def cell_size(self, lat):
+        """Grid cell size in degrees at a latitude"""
+        lat_size = self.radius / METERS_PER_DEGREE_LAT
+        lng_size = lat_size / max(math.cos(math.radians(lat)), 0.01)
+        return lat_size, lng_size
+
+    def get_cell(self, point):
+        lat_size, lng_size = self.cell_size(point[0])
+        return int(math.floor(point[0] / lat_size)), int(math.floor(point[1] / lng_size))
+
+    def find_nearby_stop(self, point):
+        """Closest stop within the merge radius, looking only at neighbouring cells"""
+        row, col = self.get_cell(point)
+        best, best_distance = None, None
+
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                for stop in self.grid.get((row + d_row, col + d_col), []):
+                    distance = haversine_meters(point, stop["point"])
+                    if distance <= self.radius and (best_distance is None or distance < best_distance):
+                        best, best_distance = stop, distance
+
+        return best
+
+    def add(self, location):
+        point = parse_coordinates(location.get("gps_coordinates"))
+        name_key = normalize_location_name(location.get("location_name"))
+        stop = None
+
+        if point and self.radius > 0:
+            stop = self.find_nearby_stop(point)
+        if not stop and name_key:
+            # Name matching only when one side has no coordinates to compare
+            candidate = self.names.get(name_key)
+            if candidate and not (point and candidate["point"]):
+                stop = candidate
+
+        if stop:
+            stop["guests"].append(location)
+            return
+
+        stop = {"location": location, "point": point, "guests": [location]}
+        self.stops.append(stop)
+
+        if point and self.radius > 0:
+            self.grid.setdefault(self.get_cell(point), []).append(stop)
+        if name_key and name_key not in self.names:
+            self.names[name_key] = stop
+
+    def cluster(self, locations):
+        for location in locations:
+            self.add(location)
+
+        return [self.build_stop(stop) for stop in self.stops]
+
+    def build_stop(self, stop):
+        """Shared stop in the pickup location shape, with a combined manifest"""
+        guests = stop["guests"]
+        location = dict(stop["location"])
+
+        location["guest_count"] = len(guests)
+        location["manifest"] = [{
+            "guest": guest.get("guest"),
+            "guest_name": guest.get("guest_name"),
+            "contact_phone": guest.get("contact_phone"),
+            "location_name": guest.get("location_name")
+        } for guest in guests]
+
+        if len(guests) > 1:
+            location["guest_name"] = f"{guests[0].get('guest_name')} +{len(guests) - 1}"
+
+        return location
+
+def cluster_pickup_locations(locations, radius_meters=None):
+    """Merge guest pickup locations within walking distance into shared stops"""
+    return PickupStopClusterer(radius_meters).cluster(locations)
+
+def format_manifest(manifest):
+    """Plain text manifest for the pickup record and driver schedule"""
+    lines = []
+    for guest in manifest:
+        line = guest.get("guest_name") or ""
+        if guest.get("contact_phone"):
+            line += f" ({guest['contact_phone']})"
+        if guest.get("location_name"):
+            line += f" - {guest['location_name']}"
+        lines.append(line)
+
+    return "\n".join(lines)
@@ -0,0 +1,223 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/pickup_status.py
+
+import frappe
+from frappe import _
+from frappe.utils import cint, get_datetime, now_datetime
+
+from safari_excursion.utils.dispatch_board import queue_board_refresh
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.permissions import can_modify_excursion_booking
+
+PICKUP_STATUS_EVENT = "excursion_pickup_status"
+
+# Booking level statuses in the order a pickup progresses through them
+BOOKING_PICKUP_STATUSES = ["Pending", "Confirmed", "Guest Located", "In Transit", "Completed"]
+
+# Guest pickup row statuses
+GUEST_PICKUP_STATUSES = ["Pending", "Confirmed", "En Route", "Arrived", "Guest Located", "Completed", "No Show"]
+
+# Booking status implied by the furthest row status, once every row has reached it
+ROW_TO_BOOKING_STATUS = {
+    "Confirmed": "Confirmed",
+    "En Route": "Confirmed",
+    "Arrived": "Guest Located",
+    "Guest Located": "Guest Located",
+    "Completed": "In Transit",
+    "No Show": "In Transit"
+}
+
+# Excursion status set alongside a booking pickup status
+EXCURSION_STATUS_FOR = {
+    "In Transit": "In Progress",
+    "Completed": "Completed"
+}
+
+class PickupStatusConflict(frappe.ValidationError):
+    pass
+
+class PickupStatusPatch:
+    """
+    Targeted pickup status update for drivers and dispatch
+
+    Locks the booking row, checks the caller's expected status or
+    modified timestamp, then updates only the pickup row and the booking
+    status columns. The booking document is never loaded or saved, so
+    validate (pricing, booking deadline) doesn't run on status taps.
+    """
+
+    def __init__(self, excursion_booking, status, pickup_order=None, notes=None,
+                 expected_status=None, expected_modified=None, event_time=None, check_permission=True):
+        self.excursion_booking = excursion_booking
+        self.status = status
+        self.pickup_order = cint(pickup_order) if pickup_order not in (None, "") else None
+        self.notes = notes
+        self.expected_status = expected_status
+        self.expected_modified = expected_modified
+        # When the status actually changed, for events queued offline
+        self.event_time = get_datetime(event_time) if event_time else None
+        # Off for callers that authorised the change themselves, e.g. a guide's own assignment
+        self.check_permission = check_permission
+
+    def apply(self):
+        booking = frappe.db.get_value(
+            "Excursion Booking", self.excursion_booking,
+            ["name", "modified", "docstatus", "excursion_date", "pickup_confirmation_status", "excursion_status",
+             "transport_notes", "owner", "assigned_guide", "booking_status"],
+            as_dict=True, for_update=True
+        )
+        if not booking:
+            frappe.throw(_("Excursion Booking {0} not found").format(self.excursion_booking), frappe.DoesNotExistError)
+
+        if self.check_permission:
+            self.check_write_permission(booking)
+
+        if booking.docstatus == 2:
+            frappe.throw(_("Cannot update pickup status of a cancelled booking"))
+
+        if self.expected_modified and str(booking.modified) != str(self.expected_modified):
+            raise PickupStatusConflict(_("Booking was changed by someone else, reload and try again"))
+
+        if self.pickup_order is None:
+            pickup = None
+            booking_status = self.patch_booking(booking)
+        else:
+            pickup = self.patch_pickup_row(booking)
+            booking_status = self.get_derived_booking_status(booking)
+
+        values = {}
+        if booking_status and booking_status != booking.pickup_confirmation_status:
+            values["pickup_confirmation_status"] = booking_status
+            if booking_status in EXCURSION_STATUS_FOR:
+                values["excursion_status"] = EXCURSION_STATUS_FOR[booking_status]
+        if self.pickup_order is None and self.notes:
+            values["transport_notes"] = (f"{booking.transport_notes}\n\nStatus Update: {self.notes}"
+                                         if booking.transport_notes else self.notes)
+
+        # Always touch modified so other clients' optimistic checks see this change
+        frappe.db.set_value("Excursion Booking", booking.name, values or {"modified": now_datetime()})
+        modified = frappe.db.get_value("Excursion Booking", booking.name, "modified")
+
+        change = {
+            "excursion_booking": booking.name,
+            "pickup_confirmation_status": values.get("pickup_confirmation_status", booking.pickup_confirmation_status),
+            "excursion_status": values.get("excursion_status", booking.excursion_status),
+            "pickup": pickup,
+            "modified": str(modified),
+            "updated_by": frappe.session.user
+        }
+
+        # The document room checks read permission on join, the change names guests and pickup points
+        frappe.publish_realtime(PICKUP_STATUS_EVENT, change, doctype="Excursion Booking", docname=booking.name,
+                                after_commit=True)
+        # No document hooks run for set_value, so feed the dispatch board directly
+        queue_board_refresh(booking.name, booking.excursion_date)
+
+        if "pickup_confirmation_status" in values:
+            frappe.enqueue(
+                "safari_excursion.utils.pickup_status.send_pickup_status_notification",
+                queue="short",
+                enqueue_after_commit=True,
+                excursion_booking=booking.name,
+                old_status=booking.pickup_confirmation_status,
+                new_status=values["pickup_confirmation_status"]
+            )
+
+        return change
+
+    def check_write_permission(self, booking):
+        """The app's modify rule (managers, the assigned guide, the owner of an unconfirmed booking)
+
+        It reads only the selected columns, so the document isn't loaded.
+        """
+        if not can_modify_excursion_booking(booking):
+            frappe.throw(_("Not permitted to update pickup status of {0}").format(booking.name),
+                         frappe.PermissionError)
+
+    def patch_booking(self, booking):
+        if self.status not in BOOKING_PICKUP_STATUSES:
+            frappe.throw(_("Invalid pickup status: {0}").format(self.status))
+
+        if self.expected_status and booking.pickup_confirmation_status != self.expected_status:
+            raise PickupStatusConflict(_("Pickup status is already {0}").format(booking.pickup_confirmation_status))
+
+        return self.status
+
+    def patch_pickup_row(self, booking):
+        if self.status not in GUEST_PICKUP_STATUSES:
+            frappe.throw(_("Invalid pickup status: {0}").format(self.status))
+
+        row = frappe.db.get_value(
+            "Excursion Guest Pickup",
+            {"parent": booking.name, "parenttype": "Excursion Booking", "pickup_order": self.pickup_order},
+            ["name", "pickup_order", "guest_name", "pickup_location_name", "pickup_status", "special_notes"],
+            as_dict=True, for_update=True
+        )
+        if not row:
+            frappe.throw(_("Pickup {0} not found on booking {1}").format(self.pickup_order, booking.name))
+
+        if self.expected_status and row.pickup_status != self.expected_status:
+            raise PickupStatusConflict(_("Pickup {0} is already {1}").format(self.pickup_order, row.pickup_status))
+
+        values = {"pickup_status": self.status}
+        if self.status == "Completed":
+            values["actual_pickup_time"] = (self.event_time or now_datetime()).time()
+        if self.notes:
+            values["special_notes"] = f"{row.special_notes or ''}\nStatus Update: {self.notes}"
+
+        frappe.db.set_value("Excursion Guest Pickup", row.name, values)
+
+        row.update(values)
+        row.pop("special_notes", None)
+        return row
+
+    def get_derived_booking_status(self, booking):
+        """Booking status all pickup rows have reached, never moving it backwards"""
+        statuses = frappe.get_all(
+            "Excursion Guest Pickup",
+            filters={"parent": booking.name, "parenttype": "Excursion Booking"},
+            pluck="pickup_status"
+        )
+
+        reached = [BOOKING_PICKUP_STATUSES.index(ROW_TO_BOOKING_STATUS.get(status, "Pending")) for status in statuses]
+        derived = BOOKING_PICKUP_STATUSES[min(reached)] if reached else None
+
+        current = booking.pickup_confirmation_status
+        if derived and current in BOOKING_PICKUP_STATUSES and \
+                BOOKING_PICKUP_STATUSES.index(derived) <= BOOKING_PICKUP_STATUSES.index(current):
+            return None
+
+        return derived
+
+def patch_pickup_status(excursion_booking, status, pickup_order=None, notes=None,
+                        expected_status=None, expected_modified=None, event_time=None, check_permission=True):
+    """Update a guest pickup row or the booking pickup status in place
+
+    Raises PickupStatusConflict when the expected status or modified
+    timestamp no longer matches.
+    """
+    return PickupStatusPatch(excursion_booking, status, pickup_order, notes,
+                             expected_status, expected_modified, event_time, check_permission).apply()
+
+def send_pickup_status_notification(excursion_booking, old_status, new_status):
+    """Background job: guest notifications for a pickup status change"""
+    doc = frappe.get_doc("Excursion Booking", excursion_booking)
+    doc.send_status_update_notification(old_status, new_status)
+
+@frappe.whitelist()
+@instrument()
+def update_pickup_status(excursion_booking, status, pickup_order=None, notes=None,
+                         expected_status=None, expected_modified=None):
+    """Lightweight pickup status endpoint for driver and dispatch screens"""
+    try:
+        change = patch_pickup_status(excursion_booking, status, pickup_order, notes,
+                                     expected_status, expected_modified)
+        return {"status": "success", "change": change}
+
+    except PickupStatusConflict as e:
+        frappe.db.rollback()
+        return {"status": "conflict", "message": str(e)}
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Pickup status patch error: {str(e)}")
+        return {"status": "error", "message": str(e)}
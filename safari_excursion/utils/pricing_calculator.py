@@ -1,8 +1,21 @@
 # ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/pricing_calculator.py
 
+from datetime import date
+
 import frappe
 from frappe import _
-from frappe.utils import flt, getdate
+from frappe.utils import cint, flt, getdate
+from safari_excursion.safari_excursion.utils.rate_card import encode_price_bands, get_rate_card
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.pricing_rules import get_pricing_pipeline
+from safari_excursion.utils.transport_zones import get_transport_charge, get_zone_matcher
+
+# Age assumed for children in quotes, where no guest details exist yet
+DEFAULT_CHILD_AGE = 8
+
+def get_default_currency():
+    """Packages carry no currency of their own, so they are priced in the settings default"""
+    return frappe.db.get_single_value("Excursion Settings", "default_currency") or "USD"
 
 class ExcursionPricingCalculator:
     """
@@ -13,6 +26,10 @@ class ExcursionPricingCalculator:
     - Seasonal pricing adjustments
     - Group discounts
     - Additional charges
+    
+    Child defaults, group discount tiers, time premiums and transport
+    zones come from the pricing rule pipeline compiled from Excursion
+    Settings, so batch pricing reuses one compiled pipeline.
     """
     
     def __init__(self, excursion_booking):
@@ -21,9 +38,15 @@ class ExcursionPricingCalculator:
             self.excursion_booking = frappe.get_doc("Excursion Booking", excursion_booking)
         
         self.package = frappe.get_doc("Excursion Package", self.excursion_booking.excursion_package)
+        self.pipeline = get_pricing_pipeline()
+        self.park_fees = None
     
-    def calculate_total_price(self):
-        """Calculate the total price for the excursion booking"""
+    def calculate_total_price(self, season=False):
+        """Calculate the total price for the excursion booking
+        
+        A season row can be passed in (None for no season);
+        by default the row covering the excursion date is used.
+        """
         pricing_details = {
             "base_amount": 0,
             "child_discount": 0,
@@ -38,7 +61,7 @@ class ExcursionPricingCalculator:
         pricing_details["base_amount"] = base_prices["total_base"]
         
         # Apply seasonal pricing if applicable
-        seasonal_price = self.get_seasonal_price()
+        seasonal_price = self.get_seasonal_price(season)
         if seasonal_price:
             pricing_details["seasonal_adjustment"] = seasonal_price - base_prices["adult_price"]
             pricing_details["base_amount"] = (seasonal_price * self.excursion_booking.adult_count + 
@@ -47,13 +70,12 @@ class ExcursionPricingCalculator:
         # Calculate child discount
         pricing_details["child_discount"] = base_prices["child_discount"]
         
-        # Calculate group discount
-        if self.package.group_discount_applicable:
-            group_discount = self.calculate_group_discount(pricing_details["base_amount"])
-            pricing_details["group_discount"] = group_discount
+        # Group discount, time premium and transport charges in one pass over the rules
+        rule_totals = self.apply_pricing_rules(pricing_details["base_amount"])
+        pricing_details["group_discount"] = rule_totals["group_discount"]
         
         # Calculate additional charges
-        additional_charges = self.calculate_additional_charges()
+        additional_charges = self.calculate_additional_charges(rule_totals)
         pricing_details["additional_charges"] = additional_charges
         
         # Calculate total
@@ -72,7 +94,7 @@ class ExcursionPricingCalculator:
         child_count = self.excursion_booking.child_count or 0
         
         adult_price = flt(self.package.base_price_adult)
-        child_price = flt(self.package.base_price_child) or (adult_price * 0.7)  # Default child price is 70% of adult
+        child_price = flt(self.package.base_price_child) or self.pipeline.child_price(adult_price)
         
         adult_total = adult_price * adult_count
         child_total = child_price * child_count
@@ -87,59 +109,104 @@ class ExcursionPricingCalculator:
             "child_discount": child_discount
         }
     
-    def get_seasonal_price(self):
-        """Get seasonal price if applicable"""
-        excursion_date = getdate(self.excursion_booking.excursion_date)
+    def get_season_rows(self):
+        """Active seasons of the package, from its seasonal availability table"""
+        return [season for season in self.package.get("seasonal_availability") or []
+                if season.is_active and season.start_date and season.end_date]
+    
+    def get_active_season(self, excursion_date=None):
+        """First active season covering the date, in table order"""
+        excursion_date = getdate(excursion_date or self.excursion_booking.excursion_date)
         
-        if not self.package.seasonal_pricing:
-            return None
-            
-        for season in self.package.seasonal_pricing:
-            start_date = getdate(season.start_date)
-            end_date = getdate(season.end_date)
-            
-            if start_date <= excursion_date <= end_date:
-                if season.price_type == "Fixed":
-                    return flt(season.adult_price)
-                elif season.price_type == "Percentage":
-                    adjustment = flt(self.package.base_price_adult) * (flt(season.percentage_change) / 100)
-                    return flt(self.package.base_price_adult) + adjustment
+        for season in self.get_season_rows():
+            if getdate(season.start_date) <= excursion_date <= getdate(season.end_date):
+                return season
         
         return None
     
-    def calculate_group_discount(self, base_amount):
-        """Calculate group discount if applicable"""
-        if not self.package.group_discount_applicable:
-            return 0
-            
-        total_guests = self.excursion_booking.total_guests
-        minimum_group_size = self.package.minimum_group_size or 5
+    def get_seasonal_price(self, season=False):
+        """Get seasonal price if applicable"""
+        if season is False:
+            season = self.get_active_season()
         
-        if total_guests < minimum_group_size:
-            return 0
+        if not season:
+            return None
         
-        # Get group discount settings from system
-        group_discount_settings = self.get_group_discount_settings()
+        # Season rows without a price type only label the band
+        if season.get("price_type") == "Fixed":
+            return flt(season.adult_price)
+        elif season.get("price_type") == "Percentage":
+            adjustment = flt(self.package.base_price_adult) * (flt(season.percentage_change) / 100)
+            return flt(self.package.base_price_adult) + adjustment
         
-        discount_percentage = 0
-        for tier in group_discount_settings:
-            if total_guests >= tier.get("minimum_size", 0):
-                discount_percentage = tier.get("discount_percentage", 0)
+        return None
+    
+    def get_price_curve(self, from_date, to_date):
+        """Price bands for a date range
+        
+        Each active season is priced once, then every day is assigned to
+        the first season covering it and consecutive days with the same
+        season are merged into one band.
+        """
+        from_date, to_date = getdate(from_date), getdate(to_date)
+        rows = self.get_season_rows()
+        currency = get_default_currency()
+        
+        # Paint later rows first so earlier rows win where seasons overlap
+        active = [0] * ((to_date - from_date).days + 1)
+        for i in range(len(rows), 0, -1):
+            start = max(getdate(rows[i - 1].start_date), from_date)
+            end = min(getdate(rows[i - 1].end_date), to_date)
+            for offset in range((start - from_date).days, (end - from_date).days + 1):
+                active[offset] = i
+        
+        variants = {i: self.calculate_total_price(rows[i - 1] if i else None) for i in set(active)}
+        
+        curve = []
+        for start, end, i in encode_price_bands(from_date, active):
+            curve.append({
+                "from_date": start,
+                "to_date": end,
+                "days": (end - start).days + 1,
+                "season": rows[i - 1].season_name if i else None,
+                "holiday": None,
+                "currency": currency,
+                "total": variants[i]["total_amount"],
+                "pricing": variants[i]
+            })
         
-        return base_amount * (discount_percentage / 100)
+        return curve
+    
+    def get_rule_context(self, base_amount=0):
+        """Booking values the pricing rules read"""
+        return frappe._dict({
+            "adult_price": flt(self.package.base_price_adult),
+            "base_amount": base_amount,
+            "total_guests": self.excursion_booking.total_guests or 0,
+            "group_discount_applicable": self.package.group_discount_applicable,
+            "minimum_group_size": self.package.minimum_group_size,
+            "departure_time": self.excursion_booking.departure_time,
+            "pickup_required": self.excursion_booking.pickup_required,
+            "pickup_location": self.excursion_booking.pickup_location
+        })
+    
+    def apply_pricing_rules(self, base_amount=0):
+        """Totals per pricing field from the compiled rules"""
+        return self.pipeline.apply(self.get_rule_context(base_amount))
+    
+    def apply_rule(self, name, base_amount=0):
+        rule = self.pipeline.get_rule(name)
+        return rule(self.get_rule_context(base_amount))[1] if rule else 0
+    
+    def calculate_group_discount(self, base_amount):
+        """Calculate group discount if applicable"""
+        return self.apply_rule("group_discount", base_amount)
     
     def get_group_discount_settings(self):
-        """Get group discount tiers from settings or default"""
-        # This could be configurable in a settings doctype
-        # For now, using default tiers
-        return [
-            {"minimum_size": 5, "discount_percentage": 5},
-            {"minimum_size": 10, "discount_percentage": 10},
-            {"minimum_size": 15, "discount_percentage": 15},
-            {"minimum_size": 20, "discount_percentage": 20}
-        ]
+        """Get group discount tiers from Excursion Settings"""
+        return self.pipeline.get_group_discount_tiers()
     
-    def calculate_additional_charges(self):
+    def calculate_additional_charges(self, rule_totals=None):
         """Calculate additional charges based on requirements"""
         additional_charges = 0
         
@@ -151,17 +218,21 @@ class ExcursionPricingCalculator:
         if self.excursion_booking.special_requirements:
             additional_charges += self.calculate_equipment_charges()
         
-        # Transport charges for distant pickup locations
-        if self.excursion_booking.pickup_required:
-            additional_charges += self.calculate_transport_charges()
-        
-        # Premium time charges (early morning, late evening)
-        additional_charges += self.calculate_time_premium_charges()
+        # Transport charges for distant pickups and early/late premiums
+        if rule_totals is None:
+            rule_totals = self.apply_pricing_rules()
+        additional_charges += rule_totals["additional_charges"]
         
         return additional_charges
     
     def calculate_park_fees(self):
         """Calculate park fees for excursions visiting national/marine parks"""
+        # Park fees don't depend on the season, price them once per calculator
+        if self.park_fees is None:
+            self.park_fees = self.get_park_fees()
+        return self.park_fees
+    
+    def get_park_fees(self):
         try:
             from safari_excursion.utils.parks_integration import ExcursionParkFeeCalculator
             
@@ -184,61 +255,31 @@ class ExcursionPricingCalculator:
     
     def calculate_transport_charges(self):
         """Calculate additional transport charges for distant pickups"""
-        # Check if pickup location requires additional transport charges
-        pickup_location = self.excursion_booking.pickup_location or ""
-        
-        # Get distance-based transport charges from settings
-        transport_zones = self.get_transport_zones()
-        
-        for zone in transport_zones:
-            if any(keyword in pickup_location.lower() for keyword in zone.get("keywords", [])):
-                return zone.get("additional_charge", 0)
-        
-        return 0
+        # Zones are configured in Excursion Settings and compiled once per worker
+        return get_transport_charge(self.excursion_booking.pickup_location or "")
     
     def get_transport_zones(self):
         """Get transport zones and charges"""
-        # This could be configurable in a settings doctype
-        return [
-            {
-                "name": "Airport Zone",
-                "keywords": ["airport", "jomo kenyatta", "jkia"],
-                "additional_charge": 2000
-            },
-            {
-                "name": "Distant Hotels",
-                "keywords": ["karen", "langata", "westlands"],
-                "additional_charge": 1000
-            },
-            {
-                "name": "City Center",
-                "keywords": ["cbd", "city center", "downtown"],
-                "additional_charge": 500
-            }
-        ]
+        return [dict(zone) for zone in get_zone_matcher().zones]
     
     def calculate_time_premium_charges(self):
         """Calculate premium charges for early/late departures"""
-        from frappe.utils import get_time
-        
-        departure_time = get_time(self.excursion_booking.departure_time)
-        
-        # Early morning premium (before 6 AM)
-        if departure_time < get_time("06:00:00"):
-            return flt(self.package.base_price_adult) * 0.1  # 10% premium
-        
-        # Late evening premium (after 7 PM)
-        if departure_time > get_time("19:00:00"):
-            return flt(self.package.base_price_adult) * 0.15  # 15% premium
-        
-        return 0
+        return self.apply_rule("time_premium")
     
     @staticmethod
     def get_pricing_preview(excursion_package, adult_count, child_count, excursion_date, departure_time=None):
         """Get pricing preview without creating a booking"""
+        temp_booking = ExcursionPricingCalculator.get_preview_booking(
+            excursion_package, adult_count, child_count, excursion_date, departure_time
+        )
         
-        # Create a temporary booking object for calculation
-        temp_booking = frappe._dict({
+        calculator = ExcursionPricingCalculator(temp_booking)
+        return calculator.calculate_total_price()
+    
+    @staticmethod
+    def get_preview_booking(excursion_package, adult_count, child_count, excursion_date, departure_time=None):
+        """Temporary booking object for calculation"""
+        return frappe._dict({
             "excursion_package": excursion_package,
             "adult_count": adult_count,
             "child_count": child_count,
@@ -249,11 +290,48 @@ class ExcursionPricingCalculator:
             "pickup_location": "",
             "special_requirements": ""
         })
+
+def get_price_curve(excursion_package, adult_count=2, child_count=0, year=None,
+                    residence_type="International", departure_time=None):
+    """Price bands for every day of a year for a party
+    
+    Packages with an Excursion Rate Configuration are priced from their
+    compiled rate card, as bookings are; others from the package prices
+    and seasonal availability.
+    """
+    adult_count, child_count = cint(adult_count), cint(child_count)
+    year = cint(year) or getdate().year
+    from_date, to_date = date(year, 1, 1), date(year, 12, 31)
+    
+    rate_card = get_rate_card(excursion_package)
+    if rate_card.config:
+        return rate_card.price_curve(from_date, to_date, residence_type, adult_count,
+                                     [DEFAULT_CHILD_AGE] * child_count)
+    
+    temp_booking = ExcursionPricingCalculator.get_preview_booking(
+        excursion_package, adult_count, child_count, from_date, departure_time
+    )
+    return ExcursionPricingCalculator(temp_booking).get_price_curve(from_date, to_date)
+
+@frappe.whitelist()
+@instrument()
+def get_excursion_price_curve(excursion_package, adult_count=2, child_count=0, year=None, residence_type="International"):
+    """Full-year price bands for season charts"""
+    try:
+        return {
+            "status": "success",
+            "price_curve": get_price_curve(excursion_package, adult_count, child_count, year, residence_type)
+        }
         
-        calculator = ExcursionPricingCalculator(temp_booking)
-        return calculator.calculate_total_price()
+    except Exception as e:
+        frappe.log_error(f"Price curve error: {str(e)}")
+        return {
+            "status": "error",
+            "message": str(e)
+        }
 
 @frappe.whitelist()
+@instrument()
 def get_excursion_pricing_preview(excursion_package, adult_count, child_count, excursion_date, departure_time=None):
     """Whitelisted method to get pricing preview from client side"""
     try:
@@ -280,6 +358,7 @@ def get_excursion_pricing_preview(excursion_package, adult_count, child_count, e
         }
 
 @frappe.whitelist()
+@instrument()
 def calculate_booking_pricing(excursion_booking):
     """Recalculate pricing for an existing booking"""
     try:
@@ -350,38 +429,13 @@ class ExcursionQuoteGenerator:
         
         return scenarios
     
-    def generate_seasonal_comparison(self, adult_count=2, child_count=0):
-        """Generate pricing comparison across different seasons"""
-        seasonal_prices = []
-        
-        if not self.package.seasonal_pricing:
-            return seasonal_prices
-        
-        for season in self.package.seasonal_pricing:
-            # Use middle date of season for calculation
-            from frappe.utils import add_days, date_diff
-            start_date = frappe.utils.getdate(season.start_date)
-            end_date = frappe.utils.getdate(season.end_date)
-            middle_date = add_days(start_date, date_diff(end_date, start_date) // 2)
-            
-            pricing = ExcursionPricingCalculator.get_pricing_preview(
-                self.package.name,
-                adult_count,
-                child_count,
-                middle_date
-            )
-            
-            seasonal_prices.append({
-                "season_name": season.season_name,
-                "start_date": season.start_date,
-                "end_date": season.end_date,
-                "pricing": pricing
-            })
-        
-        return seasonal_prices
+    def generate_seasonal_comparison(self, adult_count=2, child_count=0, year=None, residence_type="International"):
+        """Generate pricing comparison across the seasons of a year as price bands"""
+        return get_price_curve(self.package.name, adult_count, child_count, year, residence_type)
 
 @frappe.whitelist()
-def generate_excursion_quote(excursion_package, adult_count=2, child_count=0):
+@instrument()
+def generate_excursion_quote(excursion_package, adult_count=2, child_count=0, residence_type="International"):
     """Generate comprehensive quote for excursion package"""
     try:
         quote_generator = ExcursionQuoteGenerator(excursion_package)
@@ -399,7 +453,7 @@ def generate_excursion_quote(excursion_package, adult_count=2, child_count=0):
         
         # Seasonal comparison
         seasonal_comparison = quote_generator.generate_seasonal_comparison(
-            int(adult_count), int(child_count)
+            int(adult_count), int(child_count), residence_type=residence_type
         )
         
         return {
@@ -408,7 +462,7 @@ def generate_excursion_quote(excursion_package, adult_count=2, child_count=0):
                 "package_details": {
                     "name": quote_generator.package.package_name,
                     "duration": quote_generator.package.duration_hours,
-                    "currency": quote_generator.package.currency
+                    "currency": get_default_currency()
                 },
                 "base_pricing": base_pricing,
                 "group_scenarios": group_scenarios,
@@ -0,0 +1,141 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/pricing_rules.py
+
+from bisect import bisect_right
+
+import frappe
+from frappe.utils import cint, flt
+
+from safari_excursion.utils.cache_utils import WorkerCache, bump_cache_version
+from safari_excursion.utils.transport_zones import get_transport_charge
+from safari_excursion.utils.travel_time import to_minutes
+
+PRICING_RULE_CACHE = "pricing_rules"
+
+# Values used before pricing was configurable, kept for unset settings
+LEGACY_CHILD_PRICE_PERCENTAGE = 70
+LEGACY_MINIMUM_GROUP_SIZE = 5
+LEGACY_GROUP_DISCOUNT_TIERS = [
+    {"minimum_group_size": 5, "discount_percentage": 5},
+    {"minimum_group_size": 10, "discount_percentage": 10},
+    {"minimum_group_size": 15, "discount_percentage": 15},
+    {"minimum_group_size": 20, "discount_percentage": 20}
+]
+
+class PricingRulePipeline:
+    """
+    Pricing rules compiled from Excursion Settings
+
+    Each enabled rule becomes a function of the booking context that
+    returns the pricing field it affects and an amount. Tiers are sorted
+    arrays searched with bisect and time cutoffs are parsed to minutes
+    once, so a disabled rule costs nothing and an enabled one does no
+    settings or database work per call.
+    """
+
+    def __init__(self, settings):
+        child_discount = settings.get("child_discount_percentage")
+        self.child_price_percentage = (
+            LEGACY_CHILD_PRICE_PERCENTAGE if child_discount is None else 100 - flt(child_discount)
+        )
+
+        self.tier_sizes, self.tier_discounts = [], []
+        if cint(settings.get("enable_group_discounts")):
+            tiers = settings.get("group_discount_tiers") or LEGACY_GROUP_DISCOUNT_TIERS
+            for tier in sorted(tiers, key=lambda tier: cint(tier.get("minimum_group_size"))):
+                self.tier_sizes.append(cint(tier.get("minimum_group_size")))
+                self.tier_discounts.append(flt(tier.get("discount_percentage")))
+
+        self.time_premiums_enabled = cint(settings.get("enable_time_premiums"))
+        self.early_cutoff = to_minutes(settings.get("early_morning_cutoff"))
+        self.early_premium = flt(settings.get("early_morning_premium"))
+        self.late_cutoff = to_minutes(settings.get("late_evening_cutoff"))
+        self.late_premium = flt(settings.get("late_evening_premium"))
+
+        self.rules = [rule for rule in (
+            self.compile_group_discount_rule(),
+            self.compile_time_premium_rule(),
+            self.compile_transport_rule()
+        ) if rule]
+
+    def child_price(self, adult_price):
+        """Child price when the package doesn't set one"""
+        return flt(adult_price) * self.child_price_percentage / 100
+
+    def group_discount_percentage(self, total_guests):
+        """Discount of the largest tier the group qualifies for"""
+        i = bisect_right(self.tier_sizes, cint(total_guests)) - 1
+        return self.tier_discounts[i] if i >= 0 else 0
+
+    def get_group_discount_tiers(self):
+        return [{"minimum_size": size, "discount_percentage": discount}
+                for size, discount in zip(self.tier_sizes, self.tier_discounts)]
+
+    def compile_group_discount_rule(self):
+        if not self.tier_sizes:
+            return None
+
+        def group_discount(context):
+            if not context.group_discount_applicable:
+                return "group_discount", 0
+            if cint(context.total_guests) < (cint(context.minimum_group_size) or LEGACY_MINIMUM_GROUP_SIZE):
+                return "group_discount", 0
+
+            return "group_discount", flt(context.base_amount) * self.group_discount_percentage(context.total_guests) / 100
+
+        return group_discount
+
+    def compile_time_premium_rule(self):
+        if not self.time_premiums_enabled:
+            return None
+
+        def time_premium(context):
+            departure = to_minutes(context.departure_time)
+            if departure is None:
+                return "additional_charges", 0
+
+            if self.early_cutoff is not None and departure < self.early_cutoff:
+                return "additional_charges", flt(context.adult_price) * self.early_premium / 100
+            if self.late_cutoff is not None and departure > self.late_cutoff:
+                return "additional_charges", flt(context.adult_price) * self.late_premium / 100
+
+            return "additional_charges", 0
+
+        return time_premium
+
+    def compile_transport_rule(self):
+        def transport_charge(context):
+            if not context.pickup_required:
+                return "additional_charges", 0
+
+            # Zones are compiled and cached separately by transport_zones
+            return "additional_charges", get_transport_charge(context.pickup_location or "")
+
+        return transport_charge
+
+    def apply(self, context):
+        """Run the rules in order and total the amounts per pricing field"""
+        totals = {"group_discount": 0, "additional_charges": 0}
+        for rule in self.rules:
+            field, amount = rule(context)
+            totals[field] += amount
+
+        return totals
+
+    def get_rule(self, name):
+        """A single compiled rule by function name, or None when disabled"""
+        for rule in self.rules:
+            if rule.__name__ == name:
+                return rule
+        return None
+
+def build_pricing_pipeline():
+    return PricingRulePipeline(frappe.get_single("Excursion Settings").as_dict())
+
+_pricing_pipeline = WorkerCache(PRICING_RULE_CACHE, build_pricing_pipeline)
+
+def get_pricing_pipeline():
+    """Compiled pricing rules, cached per worker until settings change"""
+    return _pricing_pipeline.get()
+
+def clear_pricing_rule_cache():
+    bump_cache_version(PRICING_RULE_CACHE)
@@ -0,0 +1,229 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/profitability.py
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, add_months
+from safari_excursion.utils.instrumentation import instrument
+
+# Estimated operating costs per excursion hour (until guide/vehicle rate cards exist)
+GUIDE_COST_PER_HOUR = 20
+VEHICLE_COST_PER_HOUR = 15
+FUEL_COST_PER_HOUR = 5
+
+# Dimensions management can group margins by
+GROUP_BY_FIELDS = {
+    "Package": "excursion_package",
+    "Guide": "assigned_guide",
+    "Vehicle": "assigned_vehicle"
+}
+
+COST_FIELDS = ["guide_cost", "vehicle_cost", "fuel_cost", "equipment_cost", "park_fees", "other_costs"]
+
+PROFITABILITY_CACHE_TTL = 15 * 60  # 15 minutes
+
+class ExcursionProfitabilityEngine:
+    """
+    Set-based profitability calculation for excursion bookings
+
+    Bookings, their operations and park fees for a date range are loaded
+    with one join plus one aggregate query, and cost/margin columns are
+    computed for all bookings at once instead of loading a booking and an
+    operation document per booking.
+    """
+
+    def __init__(self, from_date=None, to_date=None, bookings=None, filters=None):
+        self.from_date = getdate(from_date) if from_date else None
+        self.to_date = getdate(to_date) if to_date else None
+        self.bookings = bookings
+        self.filters = filters or {}
+
+    def get_rows(self):
+        """Load booking, operation and park fee columns for all matching bookings"""
+        conditions, values = self.get_conditions()
+
+        rows = frappe.db.sql("""
+            SELECT
+                eb.name as booking,
+                eb.excursion_date,
+                eb.excursion_package,
+                eb.assigned_guide,
+                eb.assigned_vehicle,
+                eb.park_booking,
+                eb.currency,
+                COALESCE(eb.duration_hours, 0) as duration_hours,
+                COALESCE(eb.total_guests, 0) as total_guests,
+                COALESCE(eb.total_amount, 0) as revenue,
+                COALESCE(eo.additional_costs, 0) as other_costs,
+                COALESCE(eo.fuel_consumption, 0) as fuel_consumption,
+                COALESCE(eo.tips_received, 0) as tips_received
+            FROM `tabExcursion Booking` eb
+            LEFT JOIN `tabExcursion Operation` eo ON eo.name = eb.excursion_operation
+            WHERE {conditions}
+            ORDER BY eb.excursion_date, eb.name
+        """.format(conditions=conditions), values, as_dict=True)
+
+        park_fees = self.get_park_fees([row.park_booking for row in rows if row.park_booking])
+        for row in rows:
+            row.park_fees = park_fees.get(row.park_booking, 0)
+
+        return rows
+
+    def get_conditions(self):
+        """Build WHERE conditions and query values"""
+        conditions = ["1=1"]
+        values = {}
+
+        if self.bookings is not None:
+            conditions.append("eb.name IN %(bookings)s")
+            values["bookings"] = tuple(self.bookings) or ("",)
+        else:
+            # Range queries only consider live bookings
+            conditions.append("eb.docstatus = 1")
+            conditions.append("eb.booking_status != 'Cancelled'")
+
+        if self.from_date:
+            conditions.append("eb.excursion_date >= %(from_date)s")
+            values["from_date"] = self.from_date
+
+        if self.to_date:
+            conditions.append("eb.excursion_date <= %(to_date)s")
+            values["to_date"] = self.to_date
+
+        for fieldname in GROUP_BY_FIELDS.values():
+            if self.filters.get(fieldname):
+                conditions.append(f"eb.{fieldname} = %({fieldname})s")
+                values[fieldname] = self.filters[fieldname]
+
+        return " AND ".join(conditions), values
+
+    def get_park_fees(self, park_bookings):
+        """Get total park fees per park booking in a single aggregate query"""
+        if not park_bookings or not frappe.db.table_exists("Park Fee Calculation"):
+            return {}
+
+        fees = frappe.db.sql("""
+            SELECT park_booking, SUM(total_fee) as total_fee
+            FROM `tabPark Fee Calculation`
+            WHERE park_booking IN %(park_bookings)s
+            GROUP BY park_booking
+        """, {"park_bookings": tuple(set(park_bookings))}, as_dict=True)
+
+        return {fee.park_booking: flt(fee.total_fee) for fee in fees}
+
+    def calculate(self, rows=None):
+        """Compute cost, profit and margin columns for all rows at once"""
+        rows = self.get_rows() if rows is None else rows
+
+        hours = [flt(row.duration_hours) for row in rows]
+        guide_rate = [GUIDE_COST_PER_HOUR if row.assigned_guide else 0 for row in rows]
+        vehicle_rate = [VEHICLE_COST_PER_HOUR if row.assigned_vehicle else 0 for row in rows]
+
+        columns = {
+            "guide_cost": [h * rate for h, rate in zip(hours, guide_rate)],
+            "vehicle_cost": [h * rate for h, rate in zip(hours, vehicle_rate)],
+            "fuel_cost": [h * FUEL_COST_PER_HOUR for h in hours],
+            "equipment_cost": [0] * len(rows),
+            "park_fees": [flt(row.park_fees) for row in rows],
+            "other_costs": [flt(row.other_costs) for row in rows]
+        }
+        total_costs = [sum(costs) for costs in zip(*(columns[field] for field in COST_FIELDS))]
+        revenue = [flt(row.revenue) for row in rows]
+        profit = [r - c for r, c in zip(revenue, total_costs)]
+
+        for i, row in enumerate(rows):
+            for field in COST_FIELDS:
+                row[field] = columns[field][i]
+            row.total_costs = total_costs[i]
+            row.profit = profit[i]
+            row.profit_margin = (profit[i] / revenue[i] * 100) if revenue[i] > 0 else 0
+
+        return rows
+
+    def summarize(self, group_by="Package", rows=None):
+        """Aggregate booking margins by month and the selected dimension"""
+        if group_by not in GROUP_BY_FIELDS:
+            frappe.throw(_("Cannot group profitability by {0}").format(group_by))
+
+        group_field = GROUP_BY_FIELDS[group_by]
+        rows = self.calculate() if rows is None else rows
+        summary = {}
+
+        for row in rows:
+            month = getdate(row.excursion_date).replace(day=1)
+            key = (month, row.get(group_field) or "")
+
+            if key not in summary:
+                summary[key] = frappe._dict({
+                    "month": month,
+                    "group_value": key[1],
+                    "bookings": 0,
+                    "total_guests": 0,
+                    "revenue": 0,
+                    "tips_received": 0,
+                    "fuel_consumption": 0,
+                    "total_costs": 0,
+                    "profit": 0
+                })
+                for field in COST_FIELDS:
+                    summary[key][field] = 0
+
+            group = summary[key]
+            group.bookings += 1
+            group.total_guests += row.total_guests
+            for field in COST_FIELDS + ["revenue", "tips_received", "fuel_consumption", "total_costs", "profit"]:
+                group[field] += flt(row[field])
+
+        result = sorted(summary.values(), key=lambda g: (g.month, g.group_value))
+        for group in result:
+            group.profit_margin = (group.profit / group.revenue * 100) if group.revenue > 0 else 0
+
+        return result
+
+def get_booking_profitability(excursion_booking):
+    """Profitability analysis for a single booking using the batch engine"""
+    rows = ExcursionProfitabilityEngine(bookings=[excursion_booking]).calculate()
+    if not rows:
+        frappe.throw(_("Excursion Booking {0} not found").format(excursion_booking))
+
+    row = rows[0]
+    costs = {field: row[field] for field in COST_FIELDS}
+    costs["total_costs"] = row.total_costs
+
+    return {
+        "revenue": row.revenue,
+        "costs": costs,
+        "profit": row.profit,
+        "profit_margin": row.profit_margin
+    }
+
+@frappe.whitelist()
+@instrument()
+def get_profitability_summary(from_date=None, to_date=None, group_by="Package"):
+    """Get cached monthly margins by package, guide or vehicle"""
+    frappe.only_for(["Safari Manager", "Excursion Manager", "System Manager"])
+
+    try:
+        to_date = getdate(to_date) if to_date else getdate()
+        from_date = getdate(from_date) if from_date else add_months(to_date, -1)
+
+        cache_key = f"excursion_profitability:{from_date}:{to_date}:{group_by}"
+        summary = frappe.cache().get_value(cache_key)
+
+        if summary is None:
+            engine = ExcursionProfitabilityEngine(from_date, to_date)
+            summary = engine.summarize(group_by)
+            frappe.cache().set_value(cache_key, summary, expires_in_sec=PROFITABILITY_CACHE_TTL)
+
+        return {
+            "status": "success",
+            "from_date": from_date,
+            "to_date": to_date,
+            "group_by": group_by,
+            "summary": summary
+        }
+
+    except frappe.PermissionError:
+        raise
+    except Exception as e:
+        frappe.log_error(f"Profitability summary error: {str(e)}")
+        return {"status": "error", "message": str(e)}
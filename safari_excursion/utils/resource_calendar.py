@@ -0,0 +1,208 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/resource_calendar.py
+
+from datetime import datetime, time, timedelta
+
+import frappe
+from frappe.utils import flt, getdate, now
+
+from safari_excursion.utils.cache_utils import WorkerCache
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.travel_time import to_minutes
+
+CALENDAR_DOCTYPE = "Excursion Resource Booking"
+RESOURCE_SOURCES_HOOK = "excursion_resource_sources"
+RESOURCE_REGISTRY_CACHE = "resource_registry"
+
+CALENDAR_FIELDS = ["name", "creation", "modified", "owner", "modified_by", "resource_type", "resource",
+                   "from_datetime", "to_datetime", "source_doctype", "source_name", "source_app"]
+
+class ResourceSource:
+    """
+    A doctype whose documents occupy guides or vehicles
+
+    Declared by any installed app under the excursion_resource_sources
+    hook, e.g.
+
+        excursion_resource_sources = [{
+            "doctype": "Transport Booking",
+            "resources": {"Vehicle": "vehicle"},
+            "start_date": "pickup_date",
+            "status_field": "status",
+            "active_statuses": ["Confirmed", "In Progress"],
+            "mirror_field": "is_excursion_transport"
+        }]
+
+    plus optional end_date, start_time and duration_hours fields. Without
+    a start time a document occupies its resources for whole days. A
+    document with its mirror_field set only repeats resources another
+    source already holds (an excursion's own transport booking) and is
+    left out. The declaring app routes the doctype's document events to
+    sync_resource_calendar. Fields the doctype doesn't have are dropped
+    when the registry is built, so sources can target optional fields.
+    """
+
+    def __init__(self, spec, app, meta):
+        self.doctype = spec["doctype"]
+        self.app = app
+        self.resources = {resource_type: field for resource_type, field in spec["resources"].items()
+                          if meta.has_field(field)}
+
+        def field(key):
+            return spec.get(key) if spec.get(key) and meta.has_field(spec[key]) else None
+
+        self.start_date = field("start_date")
+        self.end_date = field("end_date")
+        self.start_time = field("start_time")
+        self.duration_hours = field("duration_hours")
+        self.status_field = field("status_field")
+        self.active_statuses = spec.get("active_statuses") or []
+        self.mirror_field = field("mirror_field")
+
+        self.fields = ["name", "docstatus"] + list(self.resources.values()) + [
+            f for f in (self.start_date, self.end_date, self.start_time, self.duration_hours, self.status_field,
+                      self.mirror_field) if f
+        ]
+
+    def get_interval(self, doc):
+        """(from, to) a document occupies its resources for, or None when inactive"""
+        if doc.get("docstatus") == 2 or (self.mirror_field and doc.get(self.mirror_field)):
+            return None
+        if self.status_field and self.active_statuses and doc.get(self.status_field) not in self.active_statuses:
+            return None
+
+        start_date = doc.get(self.start_date)
+        if not start_date:
+            return None
+        start_date = getdate(start_date)
+        end_date = getdate(doc.get(self.end_date)) if self.end_date and doc.get(self.end_date) else start_date
+        day_end = datetime.combine(end_date + timedelta(days=1), time())
+
+        start_minutes = to_minutes(doc.get(self.start_time)) if self.start_time else None
+        if start_minutes is None:
+            return datetime.combine(start_date, time()), day_end
+
+        start = datetime.combine(start_date, time()) + timedelta(minutes=start_minutes)
+        hours = flt(doc.get(self.duration_hours)) if self.duration_hours else 0
+        return start, (start + timedelta(hours=hours) if hours > 0 else max(day_end, start))
+
+    def get_rows(self, doc):
+        """Calendar rows for a document, one per assigned resource"""
+        interval = self.get_interval(doc)
+        if not interval:
+            return []
+
+        timestamp = now()
+        return [
+            (frappe.generate_hash(length=12), timestamp, timestamp, "Administrator", "Administrator",
+             resource_type, doc.get(field), interval[0], interval[1], self.doctype, doc.get("name"), self.app)
+            for resource_type, field in self.resources.items() if doc.get(field)
+        ]
+
+def build_resource_registry():
+    registry = {}
+    for app in frappe.get_installed_apps():
+        for spec in frappe.get_hooks(RESOURCE_SOURCES_HOOK, app_name=app) or []:
+            if spec["doctype"] in registry or not frappe.db.exists("DocType", spec["doctype"]):
+                continue
+
+            source = ResourceSource(spec, app, frappe.get_meta(spec["doctype"]))
+            if source.resources and source.start_date:
+                registry[source.doctype] = source
+
+    return registry
+
+_resource_registry = WorkerCache(RESOURCE_REGISTRY_CACHE, build_resource_registry)
+
+def get_resource_registry():
+    """Resource sources of all installed apps, resolved once per process"""
+    return _resource_registry.get()
+
+def write_calendar_rows(source, docs):
+    rows = [row for doc in docs for row in source.get_rows(doc)]
+    if rows:
+        frappe.db.bulk_insert(CALENDAR_DOCTYPE, CALENDAR_FIELDS, rows)
+
+def sync_documents(doctype, names):
+    """Rewrite the calendar rows of documents, e.g. after db.set_value changes"""
+    source = get_resource_registry().get(doctype)
+    if not source or not names:
+        return
+
+    frappe.db.delete(CALENDAR_DOCTYPE, {"source_doctype": doctype, "source_name": ["in", list(names)]})
+    write_calendar_rows(source, frappe.get_all(doctype, filters={"name": ["in", list(names)]}, fields=source.fields))
+
+def sync_resource_calendar(doc, method=None):
+    """Document hook for every resource source, in this app or a sibling"""
+    source = get_resource_registry().get(doc.doctype)
+    if not source:
+        return
+
+    frappe.db.delete(CALENDAR_DOCTYPE, {"source_doctype": doc.doctype, "source_name": doc.name})
+    if method != "on_trash":
+        write_calendar_rows(source, [doc])
+
+def rebuild_resource_calendar(from_date=None):
+    """Rebuild calendar rows of every source from a date on (default: yesterday)
+
+    Whole documents are rewritten: those dated from then on, and those
+    whose rows still reach past it, so rows of documents since moved
+    earlier or deleted are dropped too.
+    """
+    from_date = getdate(from_date) if from_date else getdate() - timedelta(days=1)
+
+    for doctype, source in get_resource_registry().items():
+        date_field = source.end_date or source.start_date
+        names = set(frappe.get_all(doctype, filters={date_field: [">=", from_date]}, pluck="name"))
+        names.update(frappe.get_all(
+            CALENDAR_DOCTYPE, filters={"source_doctype": doctype, "to_datetime": [">", from_date]},
+            pluck="source_name", distinct=True
+        ))
+
+        sync_documents(doctype, names)
+
+def day_window(date):
+    start = datetime.combine(getdate(date), time())
+    return start, start + timedelta(days=1)
+
+def get_busy_resources(resource_type, from_datetime, to_datetime, exclude=None):
+    """Resources of a type with any booking overlapping the window, across all apps
+
+    exclude: (doctype, name) of the document being checked, so it doesn't
+    conflict with itself.
+    """
+    conditions, values = "", {"resource_type": resource_type, "from": from_datetime, "to": to_datetime}
+    if exclude:
+        conditions = "AND NOT (source_doctype = %(exclude_doctype)s AND source_name = %(exclude_name)s)"
+        values.update({"exclude_doctype": exclude[0], "exclude_name": exclude[1]})
+
+    return set(frappe.db.sql_list(f"""
+        SELECT DISTINCT resource FROM `tabExcursion Resource Booking`
+        WHERE resource_type = %(resource_type)s AND from_datetime < %(to)s AND to_datetime > %(from)s
+            {conditions}
+    """, values))
+
+def is_resource_available(resource_type, resource, from_datetime, to_datetime, exclude=None):
+    return resource not in get_busy_resources(resource_type, from_datetime, to_datetime, exclude)
+
+@frappe.whitelist()
+@instrument()
+def get_resource_calendar(resource_type, from_date, to_date=None):
+    """Busy intervals of all guides or vehicles between two dates"""
+    try:
+        frappe.has_permission(CALENDAR_DOCTYPE, "read", throw=True)
+
+        from_datetime = day_window(from_date)[0]
+        to_datetime = day_window(to_date or from_date)[1]
+
+        intervals = frappe.db.sql("""
+            SELECT resource, from_datetime, to_datetime, source_doctype, source_name, source_app
+            FROM `tabExcursion Resource Booking`
+            WHERE resource_type = %(resource_type)s AND from_datetime < %(to)s AND to_datetime > %(from)s
+            ORDER BY resource, from_datetime
+        """, {"resource_type": resource_type, "from": from_datetime, "to": to_datetime}, as_dict=True)
+
+        return {"status": "success", "intervals": intervals}
+
+    except Exception as e:
+        frappe.log_error(f"Resource calendar error: {str(e)}")
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,435 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/rostering.py
+
+import json
+import re
+from datetime import timedelta
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, flt, getdate
+
+from safari_excursion.utils.dispatch_board import queue_board_refresh
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.resource_calendar import day_window, is_resource_available, sync_documents
+from safari_excursion.utils.travel_time import to_minutes
+
+MANAGER_ROLES = ["Safari Manager", "Excursion Manager", "System Manager"]
+
+ROSTER_CACHE_PREFIX = "excursion_roster_proposal"
+ROSTER_TTL = 24 * 3600
+MAX_HORIZON_DAYS = 14
+
+# Cost weights: a language mismatch outweighs any fairness gain, a
+# matching specialization or a better rating only breaks near-ties
+LANGUAGE_MISMATCH_COST = 50
+SPECIALIZATION_BONUS = 5
+RATING_WEIGHT = 1
+WEEK_LOAD_WEIGHT = 2
+DAY_LOAD_WEIGHT = 3
+
+TURNAROUND_MINUTES = 30
+MAX_SEARCH_PASSES = 20
+
+def get_daily_cap():
+    return cint(frappe.db.get_single_value("Excursion Settings", "max_daily_assignments_per_guide")) or 2
+
+def get_booking_window(departure_time, duration_hours):
+    """(start, end) minutes of a booking's day a guide is taken, turnaround included"""
+    start = to_minutes(departure_time)
+    if start is None:
+        return None
+    return start, start + int(flt(duration_hours) * 60) + TURNAROUND_MINUTES
+
+def split_words(value):
+    """Lowercased words of a free-text field, plural 's' dropped"""
+    return {word.rstrip("s") for word in re.findall(r"[a-z]+", (value or "").lower()) if len(word) > 2}
+
+def split_languages(value):
+    return {language.strip().lower() for language in re.split(r"[,;/\n]+", value or "") if language.strip()}
+
+class GuideRoster:
+    """
+    Guide assignments for open bookings over a planning horizon
+
+    Guides, bookings and existing assignments are loaded once into index
+    arrays. Every (booking, guide) pair gets a match cost from language,
+    specialization and rating; loads are charged quadratically per week
+    and per day, so the cheapest roster also spreads work evenly. A
+    greedy pass places the most constrained bookings first, then local
+    search moves and swaps bookings between guides while the total cost
+    drops. Daily caps, overlapping departures and guides booked on
+    safaris are hard constraints. Existing assignments are kept as they
+    are and count toward the loads.
+
+    excursion_bookings limits which unassigned bookings are planned, e.g.
+    to confirmed ones, so drafts and waitlist holds don't take up guides.
+    """
+
+    def __init__(self, from_date=None, days=7, excursion_bookings=None):
+        self.from_date = getdate(from_date)
+        self.days = min(max(cint(days), 1), MAX_HORIZON_DAYS)
+        self.to_date = add_days(self.from_date, self.days - 1)
+        self.planned = set(excursion_bookings) if excursion_bookings is not None else None
+
+        settings = frappe.get_single("Excursion Settings")
+        self.daily_cap = get_daily_cap()
+        self.language_matching = cint(settings.guide_language_matching)
+
+    def load(self):
+        guides = frappe.get_all(
+            "Safari Guide",
+            filters={"is_active": 1, "availability_status": "Available"},
+            fields=["name", "guide_name", "rating", "specialization", "languages_spoken"],
+            order_by="name"
+        )
+        self.guides = [guide.name for guide in guides]
+        self.guide_languages = [split_languages(guide.languages_spoken) for guide in guides]
+        self.guide_index = {name: g for g, name in enumerate(self.guides)}
+
+        bookings = frappe.db.sql("""
+            SELECT eb.name, eb.excursion_date, eb.departure_time, eb.duration_hours, eb.assigned_guide,
+                eb.preferred_language, ep.excursion_category
+            FROM `tabExcursion Booking` eb
+            LEFT JOIN `tabExcursion Package` ep ON ep.name = eb.excursion_package
+            WHERE eb.docstatus < 2 AND eb.booking_status != 'Cancelled'
+                AND eb.excursion_date BETWEEN %(from_date)s AND %(to_date)s
+            ORDER BY eb.excursion_date, eb.departure_time, eb.name
+        """, {"from_date": self.from_date, "to_date": self.to_date}, as_dict=True)
+
+        G = len(self.guides)
+        self.day_load = [[0] * self.days for g in range(G)]
+        self.week_load = [0] * G
+        self.busy = [[[] for d in range(self.days)] for g in range(G)]
+        self.blocked = [[False] * self.days for g in range(G)]
+        self.load_other_bookings()
+
+        self.bookings, self.day, self.window, self.language, self.cost = [], [], [], [], []
+        for booking in bookings:
+            d = (getdate(booking.excursion_date) - self.from_date).days
+            window = self.get_window(booking)
+            g = self.guide_index.get(booking.assigned_guide)
+
+            if booking.assigned_guide:
+                if g is not None:
+                    self.add(g, d, window)
+                continue
+            if self.planned is not None and booking.name not in self.planned:
+                continue
+
+            self.bookings.append(booking.name)
+            self.day.append(d)
+            self.window.append(window)
+            self.language.append((booking.preferred_language or "").lower() if self.language_matching else "")
+            self.cost.append([None if self.blocked[g][d] else self.get_match_cost(booking, guide)
+                              for g, guide in enumerate(guides)])
+
+        self.initial_week_load = list(self.week_load)
+        self.assignment = [None] * len(self.bookings)
+
+    def load_other_bookings(self):
+        """Block days guides are busy with other apps' bookings, from the resource calendar"""
+        if not self.guides:
+            return
+
+        for guide, from_datetime, to_datetime in frappe.db.sql("""
+            SELECT resource, from_datetime, to_datetime FROM `tabExcursion Resource Booking`
+            WHERE resource_type = 'Safari Guide' AND source_doctype != 'Excursion Booking'
+                AND from_datetime < %(to)s AND to_datetime > %(from)s
+        """, {"from": day_window(self.from_date)[0], "to": day_window(self.to_date)[1]}):
+            g = self.guide_index.get(guide)
+            if g is None:
+                continue
+
+            # to_datetime is exclusive, a booking ending at midnight doesn't block the next day
+            first = max((getdate(from_datetime) - self.from_date).days, 0)
+            last = min((getdate(to_datetime - timedelta(seconds=1)) - self.from_date).days, self.days - 1)
+            for d in range(first, last + 1):
+                self.blocked[g][d] = True
+
+    def get_window(self, booking):
+        return get_booking_window(booking.departure_time, booking.duration_hours)
+
+    def get_match_cost(self, booking, guide):
+        cost = -RATING_WEIGHT * flt(guide.rating)
+
+        if self.language_matching and booking.preferred_language and \
+                booking.preferred_language.lower() not in self.guide_languages[self.guide_index[guide.name]]:
+            cost += LANGUAGE_MISMATCH_COST
+
+        if split_words(booking.excursion_category) & split_words(guide.specialization):
+            cost -= SPECIALIZATION_BONUS
+
+        return cost
+
+    def add(self, g, d, window):
+        self.day_load[g][d] += 1
+        self.week_load[g] += 1
+        if window:
+            self.busy[g][d].append(window)
+
+    def remove(self, g, d, window):
+        self.day_load[g][d] -= 1
+        self.week_load[g] -= 1
+        if window:
+            self.busy[g][d].remove(window)
+
+    def can_take(self, g, b, ignore=None):
+        """Whether guide g can take booking b, optionally as if booking `ignore` were off their day"""
+        d, window = self.day[b], self.window[b]
+        if self.cost[b][g] is None:
+            return False
+
+        load = self.day_load[g][d] - (1 if ignore is not None and self.assignment[ignore] == g else 0)
+        if load >= self.daily_cap:
+            return False
+
+        if window:
+            skip = self.window[ignore] if ignore is not None and self.assignment[ignore] == g else None
+            for other in self.busy[g][d]:
+                if other is skip:
+                    skip = None
+                    continue
+                if window[0] < other[1] and other[0] < window[1]:
+                    return False
+
+        return True
+
+    def added_cost(self, g, b, week_load=None, day_load=None):
+        """Cost of giving booking b to guide g on top of their current load"""
+        week = self.week_load[g] if week_load is None else week_load
+        day = self.day_load[g][self.day[b]] if day_load is None else day_load
+        return self.cost[b][g] + WEEK_LOAD_WEIGHT * (2 * week + 1) + DAY_LOAD_WEIGHT * (2 * day + 1)
+
+    def solve(self):
+        self.load()
+        if self.guides and self.bookings:
+            self.greedy()
+            self.improve()
+        return self.get_proposal()
+
+    def greedy(self):
+        """Most constrained bookings first, each to the guide it adds least cost to"""
+        options = [sum(1 for cost in costs if cost is not None) for costs in self.cost]
+        order = sorted(range(len(self.bookings)), key=lambda b: (options[b], self.day[b], self.window[b] or (0, 0)))
+
+        for b in order:
+            best, best_cost = None, None
+            for g in range(len(self.guides)):
+                if self.can_take(g, b):
+                    cost = self.added_cost(g, b)
+                    if best_cost is None or cost < best_cost:
+                        best, best_cost = g, cost
+
+            if best is not None:
+                self.assignment[b] = best
+                self.add(best, self.day[b], self.window[b])
+
+    def improve(self):
+        """Local search: move or swap bookings between guides while the total cost drops"""
+        by_day = {}
+        for b, d in enumerate(self.day):
+            by_day.setdefault(d, []).append(b)
+
+        for search_pass in range(MAX_SEARCH_PASSES):
+            improved = False
+
+            for b in range(len(self.bookings)):
+                improved |= self.try_move(b)
+
+            for bookings in by_day.values():
+                for i, b1 in enumerate(bookings):
+                    for b2 in bookings[i + 1:]:
+                        improved |= self.try_swap(b1, b2)
+
+            if not improved:
+                break
+
+    def try_move(self, b):
+        current, d, window = self.assignment[b], self.day[b], self.window[b]
+        if current is None:
+            # Capacity freed by earlier moves may fit a booking greedy couldn't place
+            for g in range(len(self.guides)):
+                if self.can_take(g, b):
+                    self.assignment[b] = g
+                    self.add(g, d, window)
+                    return True
+            return False
+
+        saving = self.added_cost(current, b, self.week_load[current] - 1, self.day_load[current][d] - 1)
+        best, best_delta = None, -1e-9
+        for g in range(len(self.guides)):
+            if g != current and self.can_take(g, b):
+                delta = self.added_cost(g, b) - saving
+                if delta < best_delta:
+                    best, best_delta = g, delta
+
+        if best is None:
+            return False
+
+        self.remove(current, d, window)
+        self.assignment[b] = best
+        self.add(best, d, window)
+        return True
+
+    def try_swap(self, b1, b2):
+        g1, g2 = self.assignment[b1], self.assignment[b2]
+        if g1 is None or g2 is None or g1 == g2:
+            return False
+
+        # Loads don't change on a same-day swap, only match costs
+        delta = self.cost[b1][g2] + self.cost[b2][g1] - self.cost[b1][g1] - self.cost[b2][g2] \
+            if self.cost[b1][g2] is not None and self.cost[b2][g1] is not None else 0
+        if delta >= -1e-9 or not self.can_take(g2, b1, ignore=b2) or not self.can_take(g1, b2, ignore=b1):
+            return False
+
+        d = self.day[b1]
+        self.remove(g1, d, self.window[b1])
+        self.remove(g2, d, self.window[b2])
+        self.assignment[b1], self.assignment[b2] = g2, g1
+        self.add(g2, d, self.window[b1])
+        self.add(g1, d, self.window[b2])
+        return True
+
+    def get_proposal(self):
+        assignments, unassigned, mismatches = [], [], 0
+        for b, g in enumerate(self.assignment):
+            excursion_date = str(add_days(self.from_date, self.day[b]))
+            if g is None:
+                unassigned.append({"excursion_booking": self.bookings[b], "excursion_date": excursion_date})
+                continue
+
+            language_mismatch = bool(self.language[b]) and self.language[b] not in self.guide_languages[g]
+            mismatches += 1 if language_mismatch else 0
+            assignments.append({
+                "excursion_booking": self.bookings[b],
+                "excursion_date": excursion_date,
+                "guide": self.guides[g],
+                "language_mismatch": language_mismatch
+            })
+
+        return {
+            "from_date": str(self.from_date),
+            "to_date": str(self.to_date),
+            "daily_cap": self.daily_cap,
+            "assignments": assignments,
+            "unassigned": unassigned,
+            "language_mismatches": mismatches,
+            "guide_load": {guide: {"existing": self.initial_week_load[g], "proposed": self.week_load[g]}
+                           for g, guide in enumerate(self.guides)}
+        }
+
+def get_cache_key(proposal_id):
+    return f"{ROSTER_CACHE_PREFIX}:{proposal_id}"
+
+def guide_still_fits(guide, booking, daily_cap):
+    """Whether a proposed guide can still take a booking, as things stand now
+
+    A proposal may be approved hours after it was planned, so the guide's
+    daily cap and the resource calendar (their other excursions and other
+    apps' bookings) are checked again.
+    """
+    assigned = frappe.db.count("Excursion Booking", {
+        "assigned_guide": guide,
+        "excursion_date": booking.excursion_date,
+        "docstatus": ["<", 2],
+        "booking_status": ["!=", "Cancelled"]
+    })
+    if assigned >= daily_cap:
+        return False
+
+    day_start, day_end = day_window(booking.excursion_date)
+    window = get_booking_window(booking.departure_time, booking.duration_hours)
+    if window:
+        from_datetime, to_datetime = day_start + timedelta(minutes=window[0]), day_start + timedelta(minutes=window[1])
+    else:
+        from_datetime, to_datetime = day_start, day_end
+
+    return is_resource_available("Safari Guide", guide, from_datetime, to_datetime,
+                                 exclude=("Excursion Booking", booking.name))
+
+def approve_roster(proposal, excursion_bookings=None):
+    """Apply a proposal's assignments, skipping bookings assigned meanwhile
+    and guides who no longer fit
+
+    Written with set_value on the booking and its operation, so submitted
+    bookings don't go through a full save per assignment.
+    """
+    selected = set(excursion_bookings) if excursion_bookings else None
+    assignments = [row for row in proposal["assignments"]
+                   if selected is None or row["excursion_booking"] in selected]
+
+    current = {row.name: row for row in frappe.get_all(
+        "Excursion Booking",
+        filters={"name": ["in", [row["excursion_booking"] for row in assignments]]},
+        fields=["name", "assigned_guide", "excursion_date", "departure_time", "duration_hours", "excursion_operation",
+                "docstatus", "booking_status"]
+    )} if assignments else {}
+    daily_cap = get_daily_cap()
+
+    approved, skipped = [], []
+    for row in assignments:
+        booking = current.get(row["excursion_booking"])
+        if not booking or booking.assigned_guide or booking.docstatus == 2 or booking.booking_status == "Cancelled" \
+                or str(booking.excursion_date) != row["excursion_date"] \
+                or not guide_still_fits(row["guide"], booking, daily_cap):
+            skipped.append(row["excursion_booking"])
+            continue
+
+        frappe.db.set_value("Excursion Booking", booking.name, "assigned_guide", row["guide"])
+        if booking.excursion_operation:
+            frappe.db.set_value("Excursion Operation", booking.excursion_operation, "assigned_guide", row["guide"])
+        # On the calendar at once, so the next row's check sees this assignment
+        sync_documents("Excursion Booking", [booking.name])
+        queue_board_refresh(booking.name, booking.excursion_date)
+
+        frappe.enqueue(
+            "safari_excursion.utils.rostering.send_roster_notification",
+            queue="short",
+            enqueue_after_commit=True,
+            excursion_booking=booking.name
+        )
+        approved.append(booking.name)
+
+    return {"approved": approved, "skipped": skipped}
+
+def send_roster_notification(excursion_booking):
+    """Background job: assignment email for an approved roster entry"""
+    frappe.get_doc("Excursion Booking", excursion_booking).send_guide_notification()
+
+@frappe.whitelist()
+@instrument()
+def propose_guide_roster(from_date=None, days=7):
+    """Plan guide assignments for unassigned bookings and keep the proposal for approval"""
+    frappe.only_for(MANAGER_ROLES)
+
+    try:
+        proposal = GuideRoster(from_date, days).solve()
+        proposal["proposal_id"] = frappe.generate_hash(length=10)
+        frappe.cache().set_value(get_cache_key(proposal["proposal_id"]), proposal, expires_in_sec=ROSTER_TTL)
+
+        return {"status": "success", "proposal": proposal}
+
+    except Exception as e:
+        frappe.log_error(f"Guide roster error: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+@frappe.whitelist()
+@instrument()
+def approve_guide_roster(proposal_id, excursion_bookings=None):
+    """Apply a proposed roster, or only the listed bookings of it"""
+    frappe.only_for(MANAGER_ROLES)
+
+    try:
+        proposal = frappe.cache().get_value(get_cache_key(proposal_id))
+        if not proposal:
+            frappe.throw(_("Roster proposal {0} has expired, plan the roster again").format(proposal_id))
+
+        if isinstance(excursion_bookings, str):
+            excursion_bookings = json.loads(excursion_bookings)
+
+        result = approve_roster(proposal, excursion_bookings)
+        return {"status": "success", **result}
+
+    except Exception as e:
+        frappe.log_error(f"Guide roster approval error: {str(e)}")
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,110 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/test_rostering.py
+
+from frappe.tests.utils import FrappeTestCase
+
+from safari_excursion.utils.rostering import DAY_LOAD_WEIGHT, WEEK_LOAD_WEIGHT, GuideRoster
+
+def make_roster(costs, days, windows=None, daily_cap=2):
+    """Roster over in-memory arrays: costs[b][g] (None when blocked), a day index per booking"""
+    roster = GuideRoster.__new__(GuideRoster)
+    guide_count = len(costs[0])
+
+    roster.guides = [f"Guide {g}" for g in range(guide_count)]
+    roster.guide_languages = [set() for g in range(guide_count)]
+    roster.daily_cap = daily_cap
+    roster.days = max(days) + 1
+
+    roster.day_load = [[0] * roster.days for g in range(guide_count)]
+    roster.week_load = [0] * guide_count
+    roster.busy = [[[] for d in range(roster.days)] for g in range(guide_count)]
+
+    roster.bookings = [f"Booking {b}" for b in range(len(costs))]
+    roster.day = list(days)
+    roster.window = list(windows or [None] * len(costs))
+    roster.language = [""] * len(costs)
+    roster.cost = costs
+    roster.assignment = [None] * len(costs)
+    return roster
+
+def assign(roster, b, g):
+    roster.assignment[b] = g
+    roster.add(g, roster.day[b], roster.window[b])
+
+def total_cost(roster):
+    """Match costs plus the quadratic load charges the solver minimises"""
+    cost = sum(roster.cost[b][g] for b, g in enumerate(roster.assignment) if g is not None)
+    cost += WEEK_LOAD_WEIGHT * sum(load ** 2 for load in roster.week_load)
+    cost += DAY_LOAD_WEIGHT * sum(load ** 2 for loads in roster.day_load for load in loads)
+    return cost
+
+class TestGuideRoster(FrappeTestCase):
+    def test_greedy_respects_daily_cap(self):
+        roster = make_roster([[0], [0], [0]], days=[0, 0, 0], daily_cap=2)
+        roster.greedy()
+
+        self.assertEqual(sum(1 for g in roster.assignment if g is not None), 2)
+        self.assertEqual(roster.day_load[0][0], 2)
+
+    def test_greedy_keeps_overlapping_departures_apart(self):
+        # Guide 0 matches both better, but can't run two departures at once
+        roster = make_roster([[-10, 0], [-10, 0]], days=[0, 0], windows=[(480, 720), (600, 840)])
+        roster.greedy()
+
+        self.assertCountEqual(roster.assignment, [0, 1])
+
+    def test_blocked_guide_is_never_assigned(self):
+        roster = make_roster([[None, 0], [None, 0]], days=[0, 1])
+        roster.greedy()
+        roster.improve()
+
+        self.assertEqual(roster.assignment, [1, 1])
+
+    def test_try_move_spreads_load(self):
+        roster = make_roster([[0, 0], [0, 0]], days=[0, 1])
+        assign(roster, 0, 0)
+        assign(roster, 1, 0)
+        before = total_cost(roster)
+
+        self.assertTrue(roster.try_move(1))
+        self.assertEqual(roster.week_load, [1, 1])
+        self.assertLess(total_cost(roster), before)
+
+    def test_try_move_places_unassigned_booking(self):
+        roster = make_roster([[0]], days=[0], daily_cap=1)
+        self.assertTrue(roster.try_move(0))
+        self.assertEqual(roster.assignment, [0])
+
+    def test_try_swap_improves_match(self):
+        roster = make_roster([[0, -20], [-20, 0]], days=[0, 0])
+        assign(roster, 0, 0)
+        assign(roster, 1, 1)
+
+        self.assertTrue(roster.try_swap(0, 1))
+        self.assertEqual(roster.assignment, [1, 0])
+        self.assertFalse(roster.try_swap(0, 1))
+
+    def test_try_swap_refuses_overlap(self):
+        # Booking 1 would land on guide 0 over their other departure
+        roster = make_roster([[0, -20, 0], [-20, 0, 0], [0, None, None]], days=[0, 0, 0],
+                             windows=[(480, 600), (540, 660), (600, 700)], daily_cap=3)
+        assign(roster, 0, 0)
+        assign(roster, 1, 1)
+        assign(roster, 2, 0)
+
+        self.assertFalse(roster.try_swap(0, 1))
+        self.assertEqual(roster.assignment, [0, 1, 0])
+
+    def test_improve_never_raises_cost(self):
+        costs = [[(b * 7 + g * 3) % 11 - 5 for g in range(3)] for b in range(8)]
+        days = [b % 3 for b in range(8)]
+        windows = [(480 + (b % 2) * 300, 720 + (b % 2) * 300) for b in range(8)]
+        roster = make_roster(costs, days, windows)
+
+        roster.greedy()
+        greedy_cost = total_cost(roster)
+        roster.improve()
+
+        self.assertLessEqual(total_cost(roster), greedy_cost)
+        for g in range(3):
+            for d in range(3):
+                self.assertLessEqual(roster.day_load[g][d], roster.daily_cap)
@@ -3,6 +3,9 @@
 import frappe
 from frappe import _
 from frappe.utils import getdate, add_to_date, get_time
+from safari_excursion.utils.dispatch_board import queue_board_refresh
+from safari_excursion.utils.instrumentation import instrument
+from safari_excursion.utils.pickup_status import patch_pickup_status
 
 class ExcursionTransportManager:
     """
@@ -135,6 +138,7 @@ class ExcursionTransportManager:
             "estimated_arrival": transport_doc.estimated_arrival_time
         }
 
+@instrument()
 def create_excursion_transport(doc, method):
     """Hook function to create transport booking when excursion booking is submitted"""
     if doc.doctype == "Excursion Booking" and doc.pickup_required:
@@ -144,6 +148,7 @@ def create_excursion_transport(doc, method):
         if transport_booking:
             doc.db_set("transport_booking", transport_booking, update_modified=False)
 
+@instrument()
 def cancel_excursion_transport(doc, method):
     """Hook function to cancel transport booking when excursion booking is cancelled"""
     if doc.doctype == "Excursion Booking" and doc.transport_booking:
@@ -153,8 +158,7 @@ def cancel_excursion_transport(doc, method):
 @frappe.whitelist()
 def update_pickup_status(excursion_booking, status, notes=None):
     """Update pickup status from transport booking"""
-    doc = frappe.get_doc("Excursion Booking", excursion_booking)
-    doc.update_pickup_status(status, notes)
+    patch_pickup_status(excursion_booking, status, notes=notes)
     return {"status": "success", "message": _("Pickup status updated successfully")}
 
 @frappe.whitelist()
@@ -279,6 +283,7 @@ class ExcursionTransportAutomation:
                 if current_time >= departure_datetime:
                     frappe.db.set_value("Excursion Booking", excursion.name, 
                                       "excursion_status", "In Progress")
+                    queue_board_refresh(excursion.name, getdate())
             
             # Mark excursions as "Completed" if estimated return time has passed
             completed_excursions = frappe.get_all(
@@ -296,6 +301,7 @@ class ExcursionTransportAutomation:
                     if current_time >= return_datetime:
                         frappe.db.set_value("Excursion Booking", excursion.name, 
                                           "excursion_status", "Completed")
+                        queue_board_refresh(excursion.name, getdate())
             
             frappe.db.commit()
             
@@ -0,0 +1,227 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/transport_zones.py
+
+from collections import deque
+
+import frappe
+from frappe.utils import cint, flt
+
+from safari_excursion.utils.cache_utils import WorkerCache, bump_cache_version
+from safari_excursion.utils.gazetteer import resolve_location
+from safari_excursion.utils.pickup_clustering import haversine_meters, parse_coordinates
+
+TRANSPORT_ZONE_CACHE = "transport_zones"
+
+# Zones used before they were configurable, kept for sites with an empty zone table
+LEGACY_TRANSPORT_ZONES = [
+    {
+        "name": "Airport Zone",
+        "keywords": ["airport", "jomo kenyatta", "jkia"],
+        "additional_charge": 2000
+    },
+    {
+        "name": "Distant Hotels",
+        "keywords": ["karen", "langata", "westlands"],
+        "additional_charge": 1000
+    },
+    {
+        "name": "City Center",
+        "keywords": ["cbd", "city center", "downtown"],
+        "additional_charge": 500
+    }
+]
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over zone keywords
+
+    Finds every keyword contained in a text in one pass over the text,
+    regardless of how many zones and keywords are configured.
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+
+    def add(self, keyword, value):
+        state = 0
+        for char in keyword:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(set())
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+
+        self.output[state].add(value)
+
+    def build(self):
+        """Compute failure links breadth-first"""
+        queue = deque(self.goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+        return self
+
+    def search(self, text):
+        """Values of all keywords found in the text"""
+        found = set()
+        state = 0
+
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state]:
+                found |= self.output[state]
+
+        return found
+
+class Geofence:
+    """Radius or polygon area a zone covers"""
+
+    def __init__(self, center=None, radius_km=0, polygon=None):
+        self.center = center
+        self.radius_meters = flt(radius_km) * 1000
+        self.polygon = polygon
+
+    def contains(self, point):
+        if self.center:
+            return haversine_meters(self.center, point) <= self.radius_meters
+
+        # Ray casting over (lat, lng) vertices
+        inside = False
+        lat, lng = point
+        vertices = self.polygon
+        for (lat1, lng1), (lat2, lng2) in zip(vertices, vertices[1:] + vertices[:1]):
+            if (lng1 > lng) != (lng2 > lng):
+                crossing = lat1 + (lng - lng1) * (lat2 - lat1) / (lng2 - lng1)
+                if lat < crossing:
+                    inside = not inside
+
+        return inside
+
+def parse_geofence(zone):
+    """Geofence for a zone row, or None when not configured or invalid"""
+    if zone.get("geofence_type") == "Radius":
+        center = parse_coordinates(zone.get("geofence_center"))
+        if center and flt(zone.get("geofence_radius_km")) > 0:
+            return Geofence(center=center, radius_km=zone.get("geofence_radius_km"))
+
+    elif zone.get("geofence_type") == "Polygon":
+        points = [parse_coordinates(line) for line in (zone.get("geofence_polygon") or "").splitlines() if line.strip()]
+        if len(points) >= 3 and all(points):
+            return Geofence(polygon=points)
+
+    return None
+
+def parse_keywords(keywords):
+    """Keywords from a comma or newline separated field"""
+    if isinstance(keywords, (list, tuple)):
+        return [k.strip().lower() for k in keywords if k and k.strip()]
+
+    return [k.strip().lower() for k in (keywords or "").replace("\n", ",").split(",") if k.strip()]
+
+class TransportZoneMatcher:
+    """
+    Transport zone lookup compiled from Excursion Settings
+
+    Keywords from all zones go into one automaton; zones with a geofence
+    are also matched by coordinates. Among all matching zones the one
+    with the highest priority wins, then the first in table order.
+    """
+
+    def __init__(self, zones, enabled=True):
+        self.enabled = enabled
+        self.zones = []
+        self.zones_by_name = {}
+        self.geofences = []
+        self.automaton = KeywordAutomaton()
+
+        for i, zone in enumerate(zones):
+            compiled = frappe._dict({
+                "index": i,
+                "name": zone.get("name"),
+                "additional_charge": flt(zone.get("additional_charge")),
+                "priority": cint(zone.get("priority"))
+            })
+            self.zones.append(compiled)
+            self.zones_by_name[compiled.name] = compiled
+
+            for keyword in parse_keywords(zone.get("keywords")):
+                self.automaton.add(keyword, i)
+
+            geofence = parse_geofence(zone)
+            if geofence:
+                self.geofences.append((i, geofence))
+
+        self.automaton.build()
+
+    def match(self, pickup_location=None, gps_coordinates=None):
+        """Highest priority zone for a pickup location, or None"""
+        if not self.enabled or not self.zones:
+            return None
+
+        candidates = self.automaton.search((pickup_location or "").lower())
+
+        point = parse_coordinates(gps_coordinates)
+        if pickup_location:
+            # Known places carry their own zone and coordinates
+            place = resolve_location(pickup_location)
+            if place:
+                if place.transport_zone in self.zones_by_name:
+                    candidates.add(self.zones_by_name[place.transport_zone].index)
+                point = point or parse_coordinates(place.gps_coordinates)
+
+        if point:
+            candidates.update(i for i, geofence in self.geofences if geofence.contains(point))
+
+        if not candidates:
+            return None
+
+        return max((self.zones[i] for i in candidates), key=lambda zone: (zone.priority, -zone.index))
+
+    def get_charge(self, pickup_location=None, gps_coordinates=None):
+        zone = self.match(pickup_location, gps_coordinates)
+        return zone.additional_charge if zone else 0
+
+def build_zone_matcher():
+    settings = frappe.get_single("Excursion Settings")
+
+    if settings.transport_zones:
+        zones = [{
+            "name": zone.zone_name,
+            "keywords": zone.keywords,
+            "additional_charge": zone.additional_charge,
+            "priority": zone.priority,
+            "geofence_type": zone.geofence_type,
+            "geofence_center": zone.geofence_center,
+            "geofence_radius_km": zone.geofence_radius_km,
+            "geofence_polygon": zone.geofence_polygon
+        } for zone in settings.transport_zones]
+    else:
+        zones = LEGACY_TRANSPORT_ZONES
+
+    return TransportZoneMatcher(zones, enabled=cint(settings.enable_transport_zones))
+
+_zone_matcher = WorkerCache(TRANSPORT_ZONE_CACHE, build_zone_matcher)
+
+def get_zone_matcher():
+    return _zone_matcher.get()
+
+def get_transport_charge(pickup_location=None, gps_coordinates=None):
+    """Additional transport charge for a pickup location"""
+    return get_zone_matcher().get_charge(pickup_location, gps_coordinates)
+
+def clear_transport_zone_cache():
+    bump_cache_version(TRANSPORT_ZONE_CACHE)
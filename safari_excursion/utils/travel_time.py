@@ -0,0 +1,225 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/travel_time.py
+
+import json
+from datetime import timedelta
+from statistics import median
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, get_time, getdate, now_datetime
+
+from safari_excursion.utils.pickup_clustering import normalize_location_name
+
+MODEL_DOCTYPE = "Excursion Travel Time Model"
+MODEL_CACHE_KEY = "excursion_travel_time_model"
+MODEL_VERSION = 1
+
+# Defaults used when no history is available
+DEFAULT_TRAVEL_MINUTES = 15
+DEFAULT_DWELL_MINUTES = 5
+DEFAULT_BUFFER_MINUTES = 30
+
+# Observations outside this range are data entry mistakes, not travel times
+MAX_SEGMENT_MINUTES = 180
+
+# Time-of-day bands as (name, first hour of the band)
+TIME_BANDS = [("night", 0), ("early", 5), ("morning", 7), ("midday", 10), ("evening", 16), ("night", 21)]
+
+def get_time_band(hour):
+    """Time-of-day band for an hour"""
+    band = TIME_BANDS[0][0]
+    for name, start_hour in TIME_BANDS:
+        if hour >= start_hour:
+            band = name
+    return band
+
+def to_minutes(value):
+    """Minutes since midnight for a Time value from the database"""
+    if value in (None, ""):
+        return None
+    if isinstance(value, timedelta):
+        return value.total_seconds() / 60
+
+    value = get_time(value)
+    return value.hour * 60 + value.minute + value.second / 60
+
+class TravelTimeLearner:
+    """
+    Learn pickup segment and departure buffer times from history
+
+    For every booking with recorded pickup times, the time between two
+    consecutive actual pickups is one observation for that location pair
+    (travel plus dwell at the first stop) in the time band of the first
+    pickup. The gap between the last pickup and the operation's actual
+    departure is one departure buffer observation. Medians are kept so a
+    few very late pickups don't skew the estimate.
+    """
+
+    def __init__(self, lookback_days=90, min_samples=3):
+        self.lookback_days = cint(lookback_days) or 90
+        self.min_samples = cint(min_samples) or 3
+
+    def get_pickups(self):
+        """Load completed pickups for the lookback window in one query"""
+        return frappe.db.sql("""
+            SELECT
+                gp.parent as booking,
+                gp.pickup_order,
+                gp.pickup_location_name,
+                gp.actual_pickup_time,
+                eo.actual_departure_time
+            FROM `tabExcursion Guest Pickup` gp
+            INNER JOIN `tabExcursion Booking` eb ON eb.name = gp.parent
+            LEFT JOIN `tabExcursion Operation` eo ON eo.name = eb.excursion_operation
+            WHERE gp.parenttype = 'Excursion Booking'
+                AND eb.docstatus = 1
+                AND eb.excursion_date >= %(from_date)s
+                AND gp.actual_pickup_time IS NOT NULL
+            ORDER BY gp.parent, gp.pickup_order
+        """, {"from_date": add_days(getdate(), -self.lookback_days)}, as_dict=True)
+
+    def learn(self):
+        """Build the compact model dict from pickup history"""
+        pickups = self.get_pickups()
+
+        locations = []
+        location_ids = {}
+        segments = {}
+        band_samples = {}
+        buffer_samples = []
+
+        def location_id(name):
+            key = normalize_location_name(name)
+            if key not in location_ids:
+                location_ids[key] = len(locations)
+                locations.append(key)
+            return location_ids[key]
+
+        for booking_pickups in self.group_by_booking(pickups):
+            for current, following in zip(booking_pickups, booking_pickups[1:]):
+                start, end = to_minutes(current.actual_pickup_time), to_minutes(following.actual_pickup_time)
+                minutes = end - start
+                if not 0 < minutes <= MAX_SEGMENT_MINUTES:
+                    continue
+
+                band = get_time_band(int(start // 60))
+                key = f"{location_id(current.pickup_location_name)},{location_id(following.pickup_location_name)},{band}"
+                segments.setdefault(key, []).append(minutes)
+                band_samples.setdefault(band, []).append(minutes)
+
+            last = booking_pickups[-1]
+            if last.actual_departure_time is not None:
+                minutes = to_minutes(last.actual_departure_time) - to_minutes(last.actual_pickup_time)
+                if 0 <= minutes <= MAX_SEGMENT_MINUTES:
+                    buffer_samples.append(minutes)
+
+        return {
+            "version": MODEL_VERSION,
+            "locations": locations,
+            "segments": {
+                key: [round(median(samples), 1), len(samples)]
+                for key, samples in segments.items() if len(samples) >= self.min_samples
+            },
+            "bands": {
+                band: round(median(samples), 1)
+                for band, samples in band_samples.items() if len(samples) >= self.min_samples
+            },
+            "departure_buffer": round(median(buffer_samples), 1) if len(buffer_samples) >= self.min_samples else None,
+            "sample_count": len(pickups)
+        }
+
+    def group_by_booking(self, pickups):
+        """Split the ordered pickup rows into one list per booking"""
+        current, rows = None, []
+        for pickup in pickups:
+            if pickup.booking != current and rows:
+                yield rows
+                rows = []
+            current = pickup.booking
+            rows.append(pickup)
+
+        if rows:
+            yield rows
+
+def learn_travel_times():
+    """Nightly job: rebuild the travel time model from completed pickups"""
+    try:
+        settings = frappe.get_single(MODEL_DOCTYPE)
+        model = TravelTimeLearner(settings.lookback_days, settings.min_samples).learn()
+
+        # Written directly so the nightly job doesn't create a version entry per run
+        frappe.db.set_single_value(MODEL_DOCTYPE, {
+            "model_data": json.dumps(model, separators=(",", ":")),
+            "trained_on": now_datetime(),
+            "sample_count": model["sample_count"],
+            "location_count": len(model["locations"]),
+            "segment_count": len(model["segments"])
+        })
+        clear_travel_time_cache()
+
+        return model
+
+    except Exception as e:
+        frappe.log_error(f"Travel time learning error: {str(e)}")
+
+class TravelTimeModel:
+    """Read side of the learned travel times used by the pickup scheduler"""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.location_ids = {name: i for i, name in enumerate(data.get("locations") or [])}
+        self.segments = data.get("segments") or {}
+        self.bands = data.get("bands") or {}
+        self.learned_buffer = data.get("departure_buffer")
+
+    def segment_minutes(self, from_location, to_location, hour):
+        """Minutes from one pickup to the next, learned or default"""
+        band = get_time_band(hour)
+        from_id = self.location_ids.get(normalize_location_name(from_location))
+        to_id = self.location_ids.get(normalize_location_name(to_location))
+
+        if from_id is not None and to_id is not None:
+            segment = self.segments.get(f"{from_id},{to_id},{band}")
+            if segment:
+                return segment[0]
+
+        if band in self.bands:
+            return self.bands[band]
+
+        return DEFAULT_TRAVEL_MINUTES + DEFAULT_DWELL_MINUTES
+
+    def departure_buffer(self, default=None):
+        """Minutes between the last pickup and departure"""
+        if self.learned_buffer is not None:
+            return self.learned_buffer
+        return DEFAULT_BUFFER_MINUTES if default is None else default
+
+def get_travel_time_model():
+    """Cached travel time model, empty when nothing has been learned yet"""
+    def load():
+        model_data = frappe.db.get_single_value(MODEL_DOCTYPE, "model_data")
+        try:
+            return json.loads(model_data) if model_data else {}
+        except ValueError:
+            return {}
+
+    return TravelTimeModel(frappe.cache().get_value(MODEL_CACHE_KEY, load))
+
+def clear_travel_time_cache():
+    frappe.cache().delete_value(MODEL_CACHE_KEY)
+
+@frappe.whitelist()
+def train_travel_time_model():
+    """Retrain the travel time model on demand"""
+    frappe.only_for(["Safari Manager", "Excursion Manager", "System Manager"])
+
+    model = learn_travel_times()
+    if model is None:
+        return {"status": "error", "message": _("Travel time learning failed, see Error Log")}
+
+    return {
+        "status": "success",
+        "message": _("Learned {0} location pair estimates from {1} pickups").format(
+            len(model["segments"]), model["sample_count"]
+        )
+    }
@@ -2,6 +2,7 @@
 
 import frappe
 from frappe import _
+from safari_excursion.utils.resource_calendar import day_window, get_busy_resources
 
 def has_app_permission():
     """Check if user has permission to access the Safari Excursion app
@@ -88,28 +89,9 @@ def get_available_guides_for_date(date, departure_time=None):
         ]
     )
     
-    # Filter out guides with conflicting assignments
-    available_guides = []
-    
-    for guide in guides:
-        # Check for conflicting excursion assignments
-        conflicts = frappe.db.count("Excursion Booking", {
-            "excursion_date": date,
-            "assigned_guide": guide.name,
-            "booking_status": ["in", ["Confirmed", "In Progress"]]
-        })
-        
-        if conflicts == 0:
-            # Check for conflicting safari assignments (from safari_operations)
-            safari_conflicts = frappe.db.count("Safari Booking", {
-                "start_date": ["<=", date],
-                "end_date": [">=", date],
-                "guide": guide.name,
-                "status": ["in", ["Confirmed", "In Progress"]]
-            }) if frappe.db.exists("DocType", "Safari Booking") else 0
-            
-            if safari_conflicts == 0:
-                available_guides.append(guide)
+    # One range query over the resource calendar covers bookings of every app
+    busy = get_busy_resources("Safari Guide", *day_window(date))
+    available_guides = [guide for guide in guides if guide.name not in busy]
     
     return available_guides
 
@@ -137,27 +119,9 @@ def get_available_vehicles_for_date(date, min_capacity=1):
         order_by="capacity"
     )
     
-    # Filter out vehicles with conflicting assignments
-    available_vehicles = []
-    
-    for vehicle in vehicles:
-        # Check for conflicting excursion assignments
-        conflicts = frappe.db.count("Excursion Booking", {
-            "excursion_date": date,
-            "assigned_vehicle": vehicle.name,
-            "booking_status": ["in", ["Confirmed", "In Progress"]]
-        })
-        
-        if conflicts == 0:
-            # Check for conflicting transport bookings
-            transport_conflicts = frappe.db.count("Transport Booking", {
-                "pickup_date": date,
-                "vehicle": vehicle.name,
-                "status": ["in", ["Confirmed", "In Progress"]]
-            }) if frappe.db.exists("DocType", "Transport Booking") else 0
-            
-            if transport_conflicts == 0:
-                available_vehicles.append(vehicle)
+    # One range query over the resource calendar covers bookings of every app
+    busy = get_busy_resources("Vehicle", *day_window(date))
+    available_vehicles = [vehicle for vehicle in vehicles if vehicle.name not in busy]
     
     return available_vehicles
 
@@ -254,50 +218,10 @@ def calculate_excursion_profitability(excursion_booking):
     Returns:
         dict: Profitability analysis
     """
-    booking = frappe.get_doc("Excursion Booking", excursion_booking)
-    
-    # Base costs
-    costs = {
-        "guide_cost": 0,
-        "vehicle_cost": 0,
-        "fuel_cost": 0,
-        "equipment_cost": 0,
-        "park_fees": 0,
-        "other_costs": 0,
-        "total_costs": 0
-    }
-    
-    # Calculate guide cost (assume daily rate or percentage)
-    if booking.assigned_guide:
-        # This could be enhanced to get actual guide rates
-        costs["guide_cost"] = booking.duration_hours * 20  # $20 per hour example
-    
-    # Calculate vehicle cost
-    if booking.assigned_vehicle:
-        # This could be enhanced to get actual vehicle rates
-        costs["vehicle_cost"] = booking.duration_hours * 15  # $15 per hour example
-    
-    # Estimate fuel cost based on distance/duration
-    costs["fuel_cost"] = booking.duration_hours * 5  # $5 per hour example
-    
-    # Get additional costs from operation if available
-    if booking.excursion_operation:
-        operation = frappe.get_doc("Excursion Operation", booking.excursion_operation)
-        costs["other_costs"] = operation.additional_costs or 0
+    # Shares the set-based engine used for date range reporting
+    from safari_excursion.utils.profitability import get_booking_profitability
     
-    costs["total_costs"] = sum(costs.values())
-    
-    # Calculate profitability
-    revenue = booking.total_amount or 0
-    profit = revenue - costs["total_costs"]
-    profit_margin = (profit / revenue * 100) if revenue > 0 else 0
-    
-    return {
-        "revenue": revenue,
-        "costs": costs,
-        "profit": profit,
-        "profit_margin": profit_margin
-    }
+    return get_booking_profitability(excursion_booking)
 
 @frappe.whitelist()
 def get_excursion_analytics(days_back=30):
@@ -0,0 +1,323 @@
+# ~/frappe-bench/apps/safari_excursion/safari_excursion/utils/waitlist.py
+
+import heapq
+from bisect import bisect_right
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, cint, get_time, getdate, now_datetime
+
+from safari_excursion.utils.instrumentation import instrument
+
+WAITLIST_DOCTYPE = "Excursion Waitlist Entry"
+TIER_RANK = {"Premium": 2, "Preferred": 1, "Standard": 0}
+
+def get_departure_time_key(departure_time):
+    return get_time(departure_time).strftime("%H:%M:%S") if departure_time not in (None, "") else ""
+
+def get_waitlist_key(excursion_package, excursion_date, departure_time):
+    return f"{excursion_package}:{getdate(excursion_date)}:{get_departure_time_key(departure_time)}"
+
+def is_promotion_enabled():
+    return cint(frappe.get_cached_doc("Excursion Settings").enable_waitlist_promotion)
+
+def get_departure_capacity(excursion_package, departure_time):
+    """Seats of a departure: its own max capacity, else the package's"""
+    departure_key = get_departure_time_key(departure_time)
+    for row in frappe.get_all(
+        "Excursion Departure Time",
+        filters={"parent": excursion_package, "parenttype": "Excursion Package"},
+        fields=["departure_time", "max_capacity"]
+    ):
+        if get_departure_time_key(row.departure_time) == departure_key and cint(row.max_capacity):
+            return cint(row.max_capacity)
+
+    return cint(frappe.db.get_value("Excursion Package", excursion_package, "max_capacity"))
+
+def get_seats_taken(excursion_package, excursion_date, departure_time):
+    """Guests on live bookings of a departure, held drafts included"""
+    return cint(frappe.db.sql("""
+        SELECT SUM(total_guests) FROM `tabExcursion Booking`
+        WHERE excursion_package = %s AND excursion_date = %s AND departure_time = %s
+            AND docstatus < 2 AND booking_status != 'Cancelled'
+    """, (excursion_package, getdate(excursion_date), get_departure_time_key(departure_time)))[0][0])
+
+class WaitlistQueue:
+    """
+    Priority queue of parties waiting for one departure
+
+    Waiting parties are bucketed by agent tier, then by party size, each
+    bucket a heap in arrival order. A promotion pass best-fits the free
+    seats: within the highest tier that has a party that fits, it offers
+    the largest such party (earliest arrival first among equal sizes) its
+    seats as a draft booking held for the configured hours, and repeats
+    until no waiting party fits. A bisect over a tier's sorted sizes finds
+    the best fit, so after the O(n) load filling k parties costs
+    O(k log n) rather than a scan of every entry per seat released.
+    """
+
+    def __init__(self, excursion_package, excursion_date, departure_time):
+        self.excursion_package = excursion_package
+        self.excursion_date = getdate(excursion_date)
+        self.departure_time = get_departure_time_key(departure_time)
+        self.key = get_waitlist_key(excursion_package, excursion_date, departure_time)
+
+    def get_free_seats(self):
+        capacity = get_departure_capacity(self.excursion_package, self.departure_time)
+        return capacity - get_seats_taken(self.excursion_package, self.excursion_date, self.departure_time)
+
+    def load(self):
+        """{tier rank: (sorted party sizes, {size: heap of (arrival, name)})}, locked so concurrent passes don't offer twice"""
+        entries = frappe.get_all(
+            WAITLIST_DOCTYPE,
+            filters={"waitlist_key": self.key, "status": "Waiting"},
+            fields=["name", "tier", "creation", "party_size"],
+            for_update=True
+        )
+
+        tiers = {}
+        for entry in entries:
+            sizes, buckets = tiers.setdefault(TIER_RANK.get(entry.tier, 0), ([], {}))
+            buckets.setdefault(cint(entry.party_size), []).append((entry.creation, entry.name))
+
+        for sizes, buckets in tiers.values():
+            sizes.extend(sorted(buckets))
+            for heap in buckets.values():
+                heapq.heapify(heap)
+        return tiers
+
+    def pop_best_fit(self, tiers, free_seats):
+        """(party size, name) of the largest party that fits in the highest tier that has one"""
+        for rank in sorted(tiers, reverse=True):
+            sizes, buckets = tiers[rank]
+            i = bisect_right(sizes, free_seats) - 1
+            if i < 0 or sizes[i] <= 0:
+                continue
+
+            party_size = sizes[i]
+            _arrival, name = heapq.heappop(buckets[party_size])
+            if not buckets[party_size]:
+                del buckets[party_size]
+                sizes.pop(i)
+            return party_size, name
+
+        return None
+
+    def promote(self):
+        """Offer released seats to waiting parties, returning the entries offered"""
+        if self.excursion_date < getdate():
+            return []
+
+        tiers = self.load()
+        free_seats = self.get_free_seats() if tiers else 0
+
+        offered = []
+        while free_seats > 0:
+            best = self.pop_best_fit(tiers, free_seats)
+            if not best:
+                break
+
+            party_size, name = best
+            if self.offer(name):
+                free_seats -= party_size
+                offered.append(name)
+
+        return offered
+
+    def offer(self, name):
+        """Hold seats for an entry with a draft booking"""
+        entry = frappe.get_doc(WAITLIST_DOCTYPE, name)
+        hold_hours = cint(frappe.get_cached_doc("Excursion Settings").waitlist_hold_hours) or 24
+
+        frappe.db.savepoint("waitlist_offer")
+        try:
+            booking = frappe.get_doc({
+                "doctype": "Excursion Booking",
+                "booking_status": "Draft",
+                "customer": entry.customer,
+                "customer_name": entry.customer_name,
+                "customer_phone": entry.customer_phone,
+                "customer_email": entry.customer_email,
+                "excursion_package": entry.excursion_package,
+                "excursion_date": entry.excursion_date,
+                "departure_time": entry.departure_time,
+                "adult_count": entry.adult_count,
+                "child_count": cint(entry.child_count),
+                "total_guests": entry.party_size,
+                "residence_type": entry.residence_type,
+                "agent": entry.agent,
+                "booking_source": "Agent" if entry.agent else None,
+                "pickup_type": "Central Pickup Point",
+                "pickup_required": 0
+            })
+            booking.insert(ignore_permissions=True)
+
+        except Exception as e:
+            frappe.db.rollback(save_point="waitlist_offer")
+            frappe.log_error(f"Waitlist offer error for {name}: {str(e)}")
+            return False
+
+        offered_on = now_datetime()
+        entry.db_set({
+            "status": "Offered",
+            "excursion_booking": booking.name,
+            "offered_on": offered_on,
+            "hold_until": add_to_date(offered_on, hours=hold_hours)
+        })
+
+        frappe.enqueue(
+            "safari_excursion.utils.waitlist.send_waitlist_offer",
+            queue="short",
+            enqueue_after_commit=True,
+            waitlist_entry=name
+        )
+        return True
+
+def queue_waitlist_promotion(excursion_package, excursion_date, departure_time):
+    """Run a promotion pass for a departure once the transaction commits, if anyone waits"""
+    if not excursion_date or getdate(excursion_date) < getdate() or not is_promotion_enabled():
+        return
+
+    key = get_waitlist_key(excursion_package, excursion_date, departure_time)
+    queued = getattr(frappe.local, "waitlist_promotions_queued", None)
+    if queued is None:
+        queued = frappe.local.waitlist_promotions_queued = set()
+    if key in queued or not frappe.db.exists(WAITLIST_DOCTYPE, {"waitlist_key": key, "status": "Waiting"}):
+        return
+
+    queued.add(key)
+    frappe.enqueue(
+        "safari_excursion.utils.waitlist.promote_departure",
+        queue="short",
+        enqueue_after_commit=True,
+        excursion_package=excursion_package,
+        excursion_date=str(getdate(excursion_date)),
+        departure_time=get_departure_time_key(departure_time)
+    )
+
+def promote_departure(excursion_package, excursion_date, departure_time):
+    """Background job: promotion pass for one departure"""
+    WaitlistQueue(excursion_package, excursion_date, departure_time).promote()
+
+def on_booking_release(doc, method=None):
+    """Document hook: seats of a cancelled or deleted booking go to the waitlist"""
+    if method == "on_trash":
+        # Unlink before the delete's link check; a still held offer was dropped by the agent
+        for entry in frappe.get_all(WAITLIST_DOCTYPE, filters={"excursion_booking": doc.name},
+                                    fields=["name", "status"]):
+            values = {"excursion_booking": None}
+            if entry.status == "Offered":
+                values["status"] = "Cancelled"
+            frappe.db.set_value(WAITLIST_DOCTYPE, entry.name, values)
+
+    queue_waitlist_promotion(doc.excursion_package, doc.excursion_date, doc.departure_time)
+
+def on_booking_submit(doc, method=None):
+    """Document hook: a submitted offer booking takes its entry off the waitlist"""
+    frappe.db.set_value(WAITLIST_DOCTYPE, {"excursion_booking": doc.name, "status": "Offered"}, "status", "Booked")
+
+def on_package_update(doc, method=None):
+    """Document hook: promote every waiting departure of the package when its capacity changes"""
+    previous = doc.get_doc_before_save()
+    if not previous:
+        return
+
+    def capacities(package):
+        return (cint(package.max_capacity),
+                sorted((get_departure_time_key(row.departure_time), cint(row.max_capacity))
+                       for row in package.get("departure_times") or []))
+
+    if capacities(doc) == capacities(previous):
+        return
+
+    departures = frappe.get_all(
+        WAITLIST_DOCTYPE,
+        filters={"excursion_package": doc.name, "status": "Waiting", "excursion_date": [">=", getdate()]},
+        fields=["excursion_date", "departure_time"],
+        distinct=True
+    )
+    for departure in departures:
+        queue_waitlist_promotion(doc.name, departure.excursion_date, departure.departure_time)
+
+def expire_waitlist_holds():
+    """Hourly job: release lapsed holds and close entries for past departures"""
+    lapsed = frappe.get_all(
+        WAITLIST_DOCTYPE,
+        filters={"status": "Offered", "hold_until": ["<", now_datetime()]},
+        fields=["name", "excursion_booking"]
+    )
+
+    for entry in lapsed:
+        try:
+            frappe.db.set_value(WAITLIST_DOCTYPE, entry.name, "status", "Expired")
+            if entry.excursion_booking and frappe.db.get_value(
+                    "Excursion Booking", entry.excursion_booking, "docstatus") == 0:
+                # Deleting the draft frees its seats for the next party in line
+                frappe.delete_doc("Excursion Booking", entry.excursion_booking, ignore_permissions=True)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Waitlist hold expiry error for {entry.name}: {str(e)}")
+
+    frappe.db.set_value(WAITLIST_DOCTYPE, {"status": "Waiting", "excursion_date": ["<", getdate()]},
+                        "status", "Expired")
+
+def send_waitlist_offer(waitlist_entry):
+    """Background job: tell the customer seats are held for them"""
+    try:
+        entry = frappe.get_doc(WAITLIST_DOCTYPE, waitlist_entry)
+        if not entry.customer_email:
+            return
+
+        frappe.sendmail(
+            recipients=[entry.customer_email],
+            subject=f"Seats Available - {entry.excursion_package} on {entry.excursion_date}",
+            message=f"""
+            <p>Dear {entry.customer_name},</p>
+            <p>Seats have opened up on {entry.excursion_package} on {entry.excursion_date}
+            at {entry.departure_time} for your party of {entry.party_size}.</p>
+            <p>We are holding them for you until {entry.hold_until} under booking {entry.excursion_booking}.
+            Please contact us to confirm.</p>
+            """,
+            reference_doctype=WAITLIST_DOCTYPE,
+            reference_name=entry.name
+        )
+
+    except Exception as e:
+        frappe.log_error(f"Waitlist offer notification error: {str(e)}")
+
+@frappe.whitelist()
+@instrument()
+def get_waitlist(excursion_package, excursion_date, departure_time):
+    """Waiting parties of a departure in promotion order, with its free seats"""
+    try:
+        frappe.has_permission(WAITLIST_DOCTYPE, "read", throw=True)
+
+        queue = WaitlistQueue(excursion_package, excursion_date, departure_time)
+        entries = frappe.get_all(
+            WAITLIST_DOCTYPE,
+            filters={"waitlist_key": queue.key, "status": ["in", ["Waiting", "Offered"]]},
+            fields=["name", "status", "tier", "creation", "customer_name", "party_size", "agent",
+                    "excursion_booking", "hold_until"]
+        )
+        entries.sort(key=lambda e: (e.status != "Offered", -TIER_RANK.get(e.tier, 0), -cint(e.party_size), e.creation))
+
+        return {"status": "success", "free_seats": queue.get_free_seats(), "entries": entries}
+
+    except Exception as e:
+        frappe.log_error(f"Waitlist error: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+@frappe.whitelist()
+@instrument()
+def promote_waitlist(excursion_package, excursion_date, departure_time):
+    """Run a promotion pass for a departure now"""
+    frappe.only_for(["Safari Manager", "Excursion Manager", "System Manager"])
+
+    try:
+        offered = WaitlistQueue(excursion_package, excursion_date, departure_time).promote()
+        return {"status": "success", "offered": offered}
+
+    except Exception as e:
+        frappe.log_error(f"Waitlist promotion error: {str(e)}")
+        return {"status": "error", "message": str(e)}